@@ -7,6 +7,7 @@ from .nebulatk import (
     Slider,
     Scrollbar,
     Container,
+    prewarm,
 )
 
 from . import fonts_manager
@@ -26,6 +27,7 @@ __all__ = [
     "Slider",
     "Scrollbar",
     "Container",
+    "prewarm",
     "colors_manager",
     "image_manager",
     "bounds_manager",
@@ -227,6 +227,13 @@ class Animation:
         self.current_values = current_values
         self.target_values = target_values
 
+    def _compositor_only(self, attributes):
+        """Whether the attributes are all applied by compositing the widget."""
+        compositor_properties = getattr(self.widget, "_COMPOSITOR_PROPERTIES", ())
+        return bool(attributes) and all(
+            attr in compositor_properties for attr in attributes
+        )
+
     def _owner_window(self):
         master = getattr(self.widget, "master", None)
         return getattr(master, "_window", master)
@@ -340,7 +347,8 @@ class Animation:
 
             # Force an update by calling place which will update the visual representation
             self.widget.place(new_x, new_y)
-        else:
+        elif not self._compositor_only(updated_values):
+            # Compositor properties request their own frame when set.
             self.widget.update()
         self.current_values = updated_values
         self.step += direction
@@ -390,7 +398,7 @@ class Animation:
                     # Force a final visual update
                     if "x" in self.target_values or "y" in self.target_values:
                         self.widget.place(self.widget.x, self.widget.y)
-                    else:
+                    elif not self._compositor_only(self.target_values):
                         self.widget.update()
 
                 self._run_on_ui_thread(_apply_final_values)
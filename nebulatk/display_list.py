@@ -0,0 +1,526 @@
+"""Retained, flattened form of the widget tree replayed by the image renderer.
+
+Each DisplayLevel holds the ops of one coordinate space in back-to-front order.
+A widget's body op is followed by the ops of its descendants, so a widget and
+its subtree always occupy a contiguous slice (``op.span`` ops long). Container
+layers and cached container content get their own nested level, referenced by
+a single LAYER or SUBTREE op in the enclosing level. So do widgets with a
+compositor transform: their cached level is drawn displaced, scaled or faded
+without being rendered again.
+"""
+
+import math
+
+BODY = "body"
+LAYER = "layer"
+SUBTREE = "subtree"
+
+# Largest opaque bodies per level that are used to cull ops behind them.
+MAX_OCCLUDERS = 16
+
+
+class DrawOp:
+    """A widget's entry in a display level, with its geometry resolved."""
+
+    __slots__ = (
+        "widget",
+        "kind",
+        "level",
+        "parent",
+        "x",
+        "y",
+        "width",
+        "height",
+        "appearance",
+        "raster",
+        "span",
+        "child_widgets",
+        "child_level",
+        "index",
+        "opaque",
+        "bounds",
+        "cull_version",
+        "visible_rect",
+        "occluded_area",
+        "transform",
+    )
+
+    def __init__(self, widget, kind, level, parent, x, y, width, height, appearance):
+        self.widget = widget
+        self.kind = kind
+        self.level = level
+        self.parent = parent
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.appearance = appearance
+        # None until the renderer resolves it; False when the body draws nothing.
+        self.raster = None
+        self.span = 1
+        self.child_widgets = ()
+        self.child_level = None
+        self.index = 0
+        self.opaque = None
+        self.bounds = None
+        self.cull_version = -1
+        self.visible_rect = None
+        self.occluded_area = 0
+        # widget_appearance.LayerTransform applied to child_level, or None.
+        self.transform = None
+
+
+class DisplayLevel:
+    """Ops drawn back-to-front into one coordinate space."""
+
+    __slots__ = (
+        "kind",
+        "ops",
+        "clip",
+        "owner",
+        "occluders",
+        "cull_version",
+        "damage",
+        "extent",
+    )
+
+    def __init__(self, kind, clip=None, owner=None):
+        self.kind = kind
+        self.ops = []
+        self.clip = clip
+        self.owner = owner
+        self.occluders = []
+        self.cull_version = 0
+        # Local rects changed since the renderer last looked; None means all.
+        self.damage = []
+        # Local rect covering everything drawn, cached by the renderer; None
+        # until known and False when nothing is drawn.
+        self.extent = None
+
+
+def _intersect(first, second):
+    if second is None:
+        return first
+    left = max(first[0], second[0])
+    top = max(first[1], second[1])
+    right = min(first[2], second[2])
+    bottom = min(first[3], second[3])
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+def _area(rect):
+    return (rect[2] - rect[0]) * (rect[3] - rect[1])
+
+
+def layer_origin(op):
+    """Return (scale, x, y) placing op's child level in op's level."""
+    transform = op.transform
+    if transform is None:
+        return 1.0, op.x, op.y
+    scale = transform.scale
+    x = op.x + transform.translate_x
+    y = op.y + transform.translate_y
+    if scale != 1.0:
+        # Scaled about the widget's center.
+        x += op.width * (1.0 - scale) / 2.0
+        y += op.height * (1.0 - scale) / 2.0
+    return scale, x, y
+
+
+def transform_rect(op, rect):
+    """Map a rect in op's child level to the whole pixels it covers in op's level."""
+    scale, x, y = layer_origin(op)
+    if scale == 1.0:
+        return (rect[0] + x, rect[1] + y, rect[2] + x, rect[3] + y)
+    return (
+        int(math.floor(x + rect[0] * scale)),
+        int(math.floor(y + rect[1] * scale)),
+        int(math.ceil(x + rect[2] * scale)),
+        int(math.ceil(y + rect[3] * scale)),
+    )
+
+
+class DisplayList:
+    """Compiles a window's widgets into display levels and keeps them current.
+
+    host is the renderer; it supplies widget introspection (visibility,
+    appearance, container detection) and op bounds.
+    """
+
+    def __init__(self, host, max_occluders=MAX_OCCLUDERS):
+        self.host = host
+        self.max_occluders = max(0, int(max_occluders))
+        self.root = DisplayLevel("root")
+        self.root_children = ()
+        self.ops_by_widget = {}
+        self.subtrees = {}
+        self.damaged_levels = set()
+        # Screen rects covering where changed ops were drawn and are drawn
+        # now; None means the whole frame.
+        self.screen_damage = []
+
+    def __len__(self):
+        return len(self.ops_by_widget)
+
+    def widget_ids(self):
+        return self.ops_by_widget.keys()
+
+    def compile(self):
+        """Rebuild every level from the window's widget tree."""
+        self.ops_by_widget = {}
+        self.subtrees = {}
+        self.damaged_levels = set()
+        # The window level is clipped to the canvas so culling ignores overhang.
+        self.root = DisplayLevel(
+            "root", clip=(0, 0, int(self.host.width), int(self.host.height))
+        )
+        self.root_children = self._children_of(self.host.window)
+        self._compile_children(
+            None, self.root_children, self.root, 0, 0, self.root.ops, False
+        )
+        self._finish_level(self.root)
+
+    def update(self, widget):
+        """Bring the ops of a widget that reported a change up to date."""
+        op = self.ops_by_widget.get(id(widget))
+        if op is None:
+            self._update_new_widget(widget)
+            return
+        parent = op.parent
+        if parent is None and op.level is self.root:
+            siblings = self._children_of(self.host.window)
+            compiled = self.root_children
+        else:
+            siblings = self._children_of(parent.widget)
+            compiled = parent.child_widgets
+        if (
+            siblings != compiled
+            or not self.host._is_widget_visible(widget)
+            or self._kind_for(widget, op.level, parent) != op.kind
+        ):
+            # Added, removed, restacked, hidden or re-kinded: rebuild the siblings.
+            self._rebuild_children(parent, op.level, recompile=widget)
+            return
+        self._refresh(op)
+
+    def _children_of(self, widget):
+        return tuple(self.host._safe_attr(widget, "children", []) or ())
+
+    def _subtree_allowed(self, level, parent):
+        # Only the direct children of a container are cached as subtrees.
+        return level.kind == LAYER and parent is not None and parent.parent is None
+
+    def _kind_for(self, widget, level, parent):
+        if self.host._is_container_layer_widget(widget):
+            return LAYER
+        if self.host._layer_transform(widget) is not None:
+            return SUBTREE
+        if self._subtree_allowed(level, parent) and self._children_of(widget):
+            return SUBTREE
+        return BODY
+
+    def _update_new_widget(self, widget):
+        parent_widget = self.host._safe_attr(widget, "root", None)
+        if parent_widget is None and any(
+            child is widget for child in self._children_of(self.host.window)
+        ):
+            parent_widget = self.host.window
+        if parent_widget is None:
+            self.compile()
+            # Where the recompiled widgets end up is not tracked.
+            self.screen_damage = None
+            return
+        if parent_widget is self.host.window:
+            self._rebuild_children(None, self.root)
+            return
+        parent_op = self.ops_by_widget.get(id(parent_widget))
+        if parent_op is None:
+            # The parent is not drawn, so neither is the widget.
+            return
+        if parent_op.kind == BODY:
+            self._rebuild_children(parent_op, parent_op.level)
+        else:
+            level = parent_op.child_level
+            self._rebuild_children(level.ops[0], level)
+
+    def _compile_children(self, parent, children, level, x, y, out, subtree_ok):
+        host = self.host
+        for child in reversed(children):
+            if not host._is_widget_visible(child):
+                continue
+            offset_x, offset_y = host._widget_position(child)
+            self._compile_widget(
+                child,
+                level,
+                parent,
+                x + offset_x,
+                y + offset_y,
+                out,
+                subtree_ok,
+            )
+
+    def _compile_widget(self, widget, level, parent, x, y, out, subtree_ok):
+        host = self.host
+        width, height = host._widget_size(widget)
+        children = self._children_of(widget)
+        appearance = host._resolve_widget_appearance(widget)
+        transform = host._layer_transform(widget)
+        if host._is_container_layer_widget(widget):
+            kind = LAYER
+        elif transform is not None or (subtree_ok and children):
+            kind = SUBTREE
+        else:
+            kind = BODY
+
+        op = DrawOp(widget, kind, level, parent, x, y, width, height, appearance)
+        if kind != BODY:
+            op.transform = transform
+        self.ops_by_widget[id(widget)] = op
+        start = len(out)
+        out.append(op)
+        if kind == BODY:
+            op.child_widgets = children
+            self._compile_children(op, children, level, x, y, out, False)
+            op.span = len(out) - start
+            return op
+
+        clip = (0, 0, width, height) if kind == LAYER else None
+        child_level = DisplayLevel(kind, clip=clip, owner=op)
+        root = DrawOp(widget, BODY, child_level, None, 0, 0, width, height, appearance)
+        root.child_widgets = children
+        child_level.ops.append(root)
+        self._compile_children(
+            root, children, child_level, 0, 0, child_level.ops, kind == LAYER
+        )
+        root.span = len(child_level.ops)
+        op.child_level = child_level
+        self._finish_level(child_level)
+        if kind == SUBTREE:
+            self.subtrees[id(widget)] = op
+        return op
+
+    def _forget(self, ops):
+        for op in ops:
+            if self.ops_by_widget.get(id(op.widget)) is op:
+                del self.ops_by_widget[id(op.widget)]
+            if self.subtrees.get(id(op.widget)) is op:
+                del self.subtrees[id(op.widget)]
+            if op.child_level is not None:
+                self._forget(op.child_level.ops[1:])
+
+    def _rebuild_children(self, parent, level, recompile=None):
+        """Recompile parent's child slice, reusing unchanged children's ops."""
+        ops = level.ops
+        if parent is None:
+            start, end = 0, len(ops)
+            x = y = 0
+            children = self._children_of(self.host.window)
+        else:
+            start, end = parent.index + 1, parent.index + parent.span
+            x, y = parent.x, parent.y
+            children = self._children_of(parent.widget)
+
+        reusable = {}
+        index = start
+        while index < end:
+            op = ops[index]
+            reusable[id(op.widget)] = ops[index : index + op.span]
+            index += op.span
+
+        subtree_ok = self._subtree_allowed(level, parent)
+        new_ops = []
+        # Ops leaving the level and ops compiled anew; both damage the screen.
+        dropped = []
+        compiled = []
+        for child in reversed(children):
+            if not self.host._is_widget_visible(child):
+                continue
+            previous = reusable.pop(id(child), None)
+            offset_x, offset_y = self.host._widget_position(child)
+            child_x = x + offset_x
+            child_y = y + offset_y
+            if (
+                previous is not None
+                and child is not recompile
+                and previous[0].x == child_x
+                and previous[0].y == child_y
+            ):
+                new_ops.extend(previous)
+                continue
+            if previous is not None:
+                dropped.extend(previous)
+                self._forget(previous)
+            start_new = len(new_ops)
+            self._compile_widget(
+                child, level, parent, child_x, child_y, new_ops, subtree_ok
+            )
+            compiled.extend(new_ops[start_new:])
+        for previous in reusable.values():
+            dropped.extend(previous)
+            self._forget(previous)
+
+        ops[start:end] = new_ops
+        delta = len(new_ops) - (end - start)
+        if parent is None:
+            self.root_children = children
+        else:
+            parent.child_widgets = children
+        ancestor = parent
+        while ancestor is not None:
+            ancestor.span += delta
+            ancestor = ancestor.parent
+        self._finish_level(level)
+        # Where the dropped ops were drawn is only known from their old extents.
+        rects = [self.host._op_extent(op, rasterize=True) for op in dropped]
+        self._damage(level, None)
+        rects.extend(self.host._op_extent(op, rasterize=True) for op in compiled)
+        self._damage_screen(self._to_screen(level, [rect for rect in rects if rect]))
+
+    def _refresh(self, op):
+        """Re-read a widget whose place among its siblings is unchanged."""
+        host = self.host
+        widget = op.widget
+        level = op.level
+        parent = op.parent
+        base_x, base_y = (parent.x, parent.y) if parent is not None else (0, 0)
+        offset_x, offset_y = host._widget_position(widget)
+        x = base_x + offset_x
+        y = base_y + offset_y
+        width, height = host._widget_size(widget)
+        appearance = host._resolve_widget_appearance(widget)
+        transform = host._layer_transform(widget)
+        children = self._children_of(widget)
+
+        delta_x = x - op.x
+        delta_y = y - op.y
+        restyled = appearance[0] != op.appearance[0]
+        retransformed = transform != op.transform
+        if not delta_x and not delta_y and not restyled and not retransformed:
+            self._refresh_children(op, children)
+            return
+
+        if op.kind == BODY:
+            moved = ops_slice = level.ops[op.index : op.index + op.span]
+        else:
+            moved = ops_slice = [op]
+        rects = [host._op_extent(item, rasterize=True) for item in moved]
+        if delta_x or delta_y:
+            for item in ops_slice:
+                item.x += delta_x
+                item.y += delta_y
+        if restyled:
+            op.appearance = appearance
+            op.width = width
+            op.height = height
+            op.raster = None
+            if op.child_level is not None:
+                child_level = op.child_level
+                root = child_level.ops[0]
+                root.appearance = appearance
+                root.width = width
+                root.height = height
+                root.raster = None
+                if op.kind == LAYER:
+                    child_level.clip = (0, 0, width, height)
+                    self._finish_level(child_level)
+                else:
+                    # The root's body spans the subtree's tiles; the rects
+                    # below cover it in the enclosing levels.
+                    child_level.damage = None
+                    child_level.extent = None
+                    self.damaged_levels.add(child_level)
+        op.transform = transform
+        rects.extend(host._op_extent(item, rasterize=True) for item in moved)
+        self._damage(level, [rect for rect in rects if rect])
+        self._update_culling(level, moved)
+        self._refresh_children(op, children)
+
+    def _refresh_children(self, op, children):
+        if op.child_level is None:
+            if children != op.child_widgets:
+                self._rebuild_children(op, op.level)
+            return
+        root = op.child_level.ops[0]
+        if children != root.child_widgets:
+            self._rebuild_children(root, op.child_level)
+
+    def _damage(self, level, rects):
+        """Report changed local rects (None for all) to cached subtree levels.
+
+        Given rects are also added to screen_damage, mapped to the window.
+        """
+        if rects is not None:
+            self._damage_screen(self._to_screen(level, rects))
+        while level is not None:
+            level.extent = None
+            if level.kind == SUBTREE:
+                if rects is None or level.damage is None:
+                    level.damage = None
+                else:
+                    level.damage.extend(rects)
+                self.damaged_levels.add(level)
+            owner = level.owner
+            if owner is None:
+                return
+            if owner.kind == LAYER:
+                # Outside its layer a change only shows within the container.
+                rects = [transform_rect(owner, (0, 0, owner.width, owner.height))]
+            elif rects is not None:
+                rects = [transform_rect(owner, rect) for rect in rects]
+            level = owner.level
+
+    def _to_screen(self, level, rects):
+        """Map local rects of level to the window, clipped by enclosing layers."""
+        while level.owner is not None:
+            owner = level.owner
+            if level.clip is not None:
+                rects = [_intersect(rect, level.clip) for rect in rects]
+            rects = [transform_rect(owner, rect) for rect in rects if rect]
+            level = owner.level
+        return rects
+
+    def _damage_screen(self, rects):
+        if rects is None:
+            self.screen_damage = None
+        elif self.screen_damage is not None:
+            self.screen_damage.extend(rects)
+
+    def _opaque_rect(self, level, op):
+        if level.kind == SUBTREE or op.transform is not None:
+            return None
+        rect = self.host._opaque_rect(op.appearance[0], op.x, op.y)
+        if rect is None:
+            return None
+        return _intersect(rect, level.clip)
+
+    def _finish_level(self, level):
+        level.extent = None
+        for index, op in enumerate(level.ops):
+            op.index = index
+            op.opaque = self._opaque_rect(level, op)
+        self._select_occluders(level)
+
+    def _select_occluders(self, level):
+        candidates = [op for op in level.ops if op.opaque is not None]
+        candidates.sort(key=lambda op: _area(op.opaque), reverse=True)
+        level.occluders = candidates[: self.max_occluders]
+        level.cull_version += 1
+
+    def _update_culling(self, level, changed):
+        if level.kind == SUBTREE:
+            return
+        occluders = level.occluders
+        smallest = 0
+        if len(occluders) >= self.max_occluders and occluders:
+            smallest = _area(occluders[-1].opaque)
+        reselect = False
+        for op in changed:
+            was_occluder = op.opaque is not None and op in occluders
+            op.opaque = self._opaque_rect(level, op)
+            op.cull_version = -1
+            if was_occluder or (op.opaque is not None and _area(op.opaque) > smallest):
+                reselect = True
+        if reselect:
+            self._select_occluders(level)
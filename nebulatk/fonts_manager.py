@@ -265,6 +265,15 @@ def resolve_draw_font(font):
     return _load_font(family, size, style)
 
 
+def scale_font(font, factor):
+    """Return a (family, size, style) tuple of font with its size scaled."""
+    try:
+        family, size, style = _coerce_font(font)
+    except Exception:
+        family, size, style = ("arial", 12, "normal")
+    return (family, max(1, int(round(float(size) * factor))), style)
+
+
 def get_font_debug_info(font):
     """Return detailed diagnostics for a font tuple used by rendering."""
     try:
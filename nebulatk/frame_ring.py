@@ -0,0 +1,94 @@
+"""Shared-memory ring of frame slots between a window owner and its GL process.
+
+The owner copies each frame into a slot and only sends a small "slot ready"
+command; the GL process uploads straight from the shared block. A slot is
+reused only after the reader has reported every frame up to the one it last
+held as consumed, so frames are never overwritten while being read.
+"""
+
+import struct
+from multiprocessing import shared_memory
+
+# Block header: the newest sequence number the reader has consumed.
+_HEADER = struct.Struct("<Q")
+# Keep slot data cache-line aligned.
+HEADER_SIZE = 64
+DEFAULT_SLOTS = 3
+
+
+class SharedFrameRing:
+    """Fixed-size frame slots in one multiprocessing.shared_memory block.
+
+    Create the ring in the writer with SharedFrameRing(slot_size) and open it
+    in the reader with SharedFrameRing.attach(name, slot_size, slots).
+    Sequence numbers start at 1 and increase by one per written frame.
+    """
+
+    def __init__(self, slot_size, slots=DEFAULT_SLOTS, name=None):
+        self.slot_size = max(1, int(slot_size))
+        self.slots = max(2, int(slots))
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(
+                create=True, size=HEADER_SIZE + self.slot_size * self.slots
+            )
+            _HEADER.pack_into(self._shm.buf, 0, 0)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self._next_seq = 1
+
+    @classmethod
+    def attach(cls, name, slot_size, slots=DEFAULT_SLOTS):
+        return cls(slot_size, slots=slots, name=name)
+
+    def _offset(self, slot):
+        return HEADER_SIZE + int(slot) * self.slot_size
+
+    @property
+    def consumed(self):
+        return _HEADER.unpack_from(self._shm.buf, 0)[0]
+
+    def write(self, pixels):
+        """Copy a bytes-like frame into the next slot.
+
+        Returns:
+            tuple: (slot, seq, nbytes), or None when the frame does not fit or
+                the reader has not consumed the frame that slot still holds.
+        """
+        data = memoryview(pixels).cast("B")
+        nbytes = data.nbytes
+        if nbytes > self.slot_size:
+            return None
+        seq = self._next_seq
+        # The slot last held seq - slots; it is free once that was consumed.
+        if seq - self.slots > self.consumed:
+            return None
+        slot = seq % self.slots
+        offset = self._offset(slot)
+        self._shm.buf[offset : offset + nbytes] = data
+        self._next_seq = seq + 1
+        return slot, seq, nbytes
+
+    def view(self, slot, nbytes):
+        """Return a memoryview of a slot's pixels; drop it before close()."""
+        offset = self._offset(slot)
+        return self._shm.buf[offset : offset + int(nbytes)]
+
+    def release(self, seq):
+        """Mark every frame up to seq as consumed (reader side)."""
+        if int(seq) > self.consumed:
+            _HEADER.pack_into(self._shm.buf, 0, int(seq))
+
+    def close(self):
+        """Unmap the block; the creating side also unlinks it.
+
+        Raises:
+            BufferError: A view returned by view() is still alive.
+        """
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
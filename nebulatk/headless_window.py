@@ -0,0 +1,404 @@
+"""An offscreen window for servers and CI: no display, no GLFW, no GL.
+
+HeadlessWindow implements the NativeGLWindow surface in-process. Timers run
+on a VirtualClock, and whenever nothing is due the mainloop jumps the clock
+to the next timer, so frames are rendered back to back as fast as the
+renderer allows instead of at wall-clock pace. Submitted frames and GPU
+compositor scenes are kept as a PIL image (see HeadlessWindow.frame), and
+input is injected with event_generate.
+"""
+
+import heapq
+import itertools
+import logging
+import re
+import threading
+import traceback
+
+from PIL import Image as PILImage
+
+try:
+    from .native_gl_window import NativeEvent
+except ImportError:
+    from native_gl_window import NativeEvent
+
+logger = logging.getLogger(__name__)
+
+
+class VirtualClock:
+    """Seconds that only move forward when advanced."""
+
+    def __init__(self, start=0.0):
+        self._now = float(start)
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self._now
+
+    def advance(self, seconds):
+        self.advance_to(self._now + max(0.0, float(seconds)))
+
+    def advance_to(self, when):
+        with self._lock:
+            self._now = max(self._now, float(when))
+
+
+def _frame_image(pixels, width, height, premultiplied):
+    """Copy packed RGBA (or premultiplied RGBa) pixels into an RGBA image."""
+    image = PILImage.frombytes(
+        "RGBa" if premultiplied else "RGBA",
+        (int(width), int(height)),
+        bytes(memoryview(pixels).cast("B")),
+    )
+    return image.convert("RGBA") if premultiplied else image
+
+
+class HeadlessWindow:
+    """In-process stand-in for NativeGLWindow that renders offscreen.
+
+    clock is the VirtualClock timers run on; a renderer paced on it renders
+    at full speed. Events are dispatched on the thread running mainloop.
+    """
+
+    def __init__(
+        self,
+        width,
+        height,
+        title="ntk",
+        resizable=(True, True),
+        override=False,
+        clock=None,
+    ):
+        self.clock = VirtualClock() if clock is None else clock
+        self._closed = False
+        self._running = False
+        self._loop_thread_id = None
+        self._bindings = {}
+        self._protocol_handlers = {}
+        self._draw_callback = None
+        self._timers = []
+        self._timer_counter = itertools.count()
+        self._cancelled_timers = set()
+        # Guards the timers; mainloop waits on it when none are pending.
+        self._condition = threading.Condition()
+        self._clipboard = ""
+        self._size = (int(width), int(height))
+        self._window = object()
+        self.title_text = str(title)
+        self.resizable_axes = tuple(resizable)
+        self.override = bool(override)
+        self.visible = True
+        self.render_scale = 1.0
+        self.render_filter = "linear"
+        # The last frame shown; compositor layers by id and their keys.
+        self._frame = None
+        self._layers = {}
+        self.frame_count = 0
+
+    @property
+    def handle(self):
+        return self._window
+
+    @property
+    def available(self):
+        return self._window is not None
+
+    def bind(self, key, command):
+        self._bindings.setdefault(key, []).append(command)
+        return command
+
+    def protocol(self, name, command):
+        self._protocol_handlers[name] = command
+
+    def set_draw_callback(self, callback):
+        self._draw_callback = callback
+
+    def _dispatch(self, key, event):
+        for callback in self._bindings.get(key, []):
+            callback(event)
+
+    def _on_loop_thread(self):
+        return (
+            self._loop_thread_id is None
+            or threading.get_ident() == self._loop_thread_id
+        )
+
+    def event_generate(self, sequence, **fields):
+        """Dispatch a NativeEvent built from fields to sequence's bindings.
+
+        From another thread than mainloop's, the event is queued for it.
+        """
+        event = NativeEvent(**fields)
+        if self._on_loop_thread():
+            self._dispatch(sequence, event)
+        else:
+            self.after(0, lambda: self._dispatch(sequence, event))
+
+    def request_close(self):
+        """Act as if the user closed the window (WM_DELETE_WINDOW)."""
+        callback = self._protocol_handlers.get("WM_DELETE_WINDOW")
+        if callback is None:
+            return
+        if self._on_loop_thread():
+            callback()
+        else:
+            self.after(0, callback)
+
+    def after(self, ms, callback):
+        timer_id = f"after#{next(self._timer_counter)}"
+        due = self.clock() + max(0, int(ms)) / 1000.0
+        with self._condition:
+            heapq.heappush(
+                self._timers, (due, next(self._timer_counter), timer_id, callback)
+            )
+            self._condition.notify_all()
+        return timer_id
+
+    def after_cancel(self, timer_id):
+        with self._condition:
+            self._cancelled_timers.add(timer_id)
+
+    def _pop_timer(self, limit=None):
+        """Take the earliest timer due by limit (any timer when None)."""
+        with self._condition:
+            while self._timers:
+                due, _, timer_id, callback = self._timers[0]
+                if limit is not None and due > limit:
+                    return None
+                heapq.heappop(self._timers)
+                if timer_id in self._cancelled_timers:
+                    self._cancelled_timers.discard(timer_id)
+                    continue
+                return due, callback
+            return None
+
+    def _run_timer(self, timer):
+        due, callback = timer
+        self.clock.advance_to(due)
+        try:
+            callback()
+        except Exception:
+            traceback.print_exc()
+
+    def advance(self, seconds):
+        """Move the clock forward, running the timers that fall due in order.
+
+        For driving timers without a mainloop; a running mainloop already
+        advances the clock to each timer as it comes due.
+        """
+        limit = self.clock() + max(0.0, float(seconds))
+        timer = self._pop_timer(limit)
+        while timer is not None:
+            self._run_timer(timer)
+            timer = self._pop_timer(limit)
+        self.clock.advance_to(limit)
+
+    def geometry(self, geometry):
+        if self._window is None:
+            return
+        match = re.match(r"^\s*(\d+)x(\d+)(?:\+(-?\d+)\+(-?\d+))?\s*$", geometry)
+        if not match:
+            return
+        size = (int(match.group(1)), int(match.group(2)))
+        if size == self._size:
+            return
+        self._size = size
+        # Delivered later, like a native size message.
+        self.after(
+            0,
+            lambda: self._dispatch(
+                "<Configure>", NativeEvent(width=size[0], height=size[1])
+            ),
+        )
+
+    def title(self, value):
+        self.title_text = str(value)
+
+    def resizable(self, can_resize_x, can_resize_y):
+        self.resizable_axes = (bool(can_resize_x), bool(can_resize_y))
+
+    def overrideredirect(self, override):
+        self.override = bool(override)
+
+    def wm_attributes(self, *_args, **_kwargs):
+        return None
+
+    def lift(self):
+        return None
+
+    def update(self):
+        self.update_idletasks()
+
+    def update_idletasks(self):
+        timer = self._pop_timer(self.clock())
+        while timer is not None:
+            self._run_timer(timer)
+            timer = self._pop_timer(self.clock())
+
+    def withdraw(self):
+        self.visible = False
+
+    def deiconify(self):
+        self.visible = True
+
+    def iconbitmap(self, value):
+        return None
+
+    def set_render_scale(self, render_scale, render_filter="linear"):
+        self.render_scale = float(render_scale)
+        self.render_filter = render_filter
+
+    def clipboard_clear(self):
+        self._clipboard = ""
+
+    def clipboard_append(self, value):
+        self._clipboard = str(value)
+
+    def clipboard_get(self):
+        if self._clipboard == "":
+            raise RuntimeError("Clipboard is empty")
+        return self._clipboard
+
+    def winfo_id(self):
+        return 0
+
+    def winfo_width(self):
+        return self._size[0] if self._window is not None else 0
+
+    def winfo_height(self):
+        return self._size[1] if self._window is not None else 0
+
+    @property
+    def framebuffer_size(self):
+        return self._size
+
+    @property
+    def frame_backlogged(self):
+        # Frames are shown as soon as they are submitted.
+        return False
+
+    @property
+    def frame(self):
+        """A copy of the last frame shown, as an RGBA PIL image, or None."""
+        return None if self._frame is None else self._frame.copy()
+
+    def submit_frame(
+        self, frame_rgba, width, height, premultiplied=False, rects=None
+    ):
+        """Show a frame, or with rects update those regions of the last one.
+
+        The pixels are copied before this returns.
+        """
+        if self._window is None:
+            return
+        if rects is None:
+            self._frame = _frame_image(frame_rgba, width, height, premultiplied)
+        elif self._frame is not None and self._frame.size == (width, height):
+            pixels = memoryview(frame_rgba).cast("B")
+            offset = 0
+            for left, top, right, bottom in rects:
+                size = (right - left) * (bottom - top) * 4
+                part = _frame_image(
+                    pixels[offset : offset + size],
+                    right - left,
+                    bottom - top,
+                    premultiplied,
+                )
+                self._frame.paste(part, (left, top))
+                offset += size
+        self._presented()
+
+    def submit_scene(self, scene):
+        """Composite a layer_compositor.CompositorScene on the CPU."""
+        if self._window is None:
+            return
+        layers = self._layers
+        for layer_id, width, height, pixels, key in scene.layers:
+            if pixels is None:
+                # Shares the pixels of a live layer with the same content.
+                image = next(
+                    (image for image, image_key in layers.values() if image_key == key),
+                    None,
+                )
+                if image is None:
+                    logger.warning(
+                        "Compositor layer %s is missing its pixels.", layer_id
+                    )
+                    continue
+            else:
+                image = _frame_image(pixels, width, height, scene.premultiplied)
+            layers[layer_id] = (image, key)
+        frame = PILImage.new("RGBA", (scene.width, scene.height), (0, 0, 0, 0))
+        for layer_id, x, y, width, height, clip, opacity in scene.quads:
+            layer = layers.get(layer_id)
+            if layer is None or opacity <= 0.0:
+                continue
+            self._composite_quad(frame, layer[0], x, y, width, height, clip, opacity)
+        for layer_id in scene.release:
+            layers.pop(layer_id, None)
+        self._frame = frame
+        self._presented()
+
+    def _composite_quad(self, frame, image, x, y, width, height, clip, opacity):
+        left = int(round(x))
+        top = int(round(y))
+        right = int(round(x + width))
+        bottom = int(round(y + height))
+        if right <= left or bottom <= top:
+            return
+        if image.size != (right - left, bottom - top):
+            image = image.resize((right - left, bottom - top), PILImage.BILINEAR)
+        draw_left = max(left, int(clip[0]), 0)
+        draw_top = max(top, int(clip[1]), 0)
+        draw_right = min(right, int(clip[2]), frame.size[0])
+        draw_bottom = min(bottom, int(clip[3]), frame.size[1])
+        if draw_right <= draw_left or draw_bottom <= draw_top:
+            return
+        part = image.crop(
+            (draw_left - left, draw_top - top, draw_right - left, draw_bottom - top)
+        )
+        if opacity < 1.0:
+            table = [int(value * opacity + 0.5) for value in range(256)]
+            part.putalpha(part.getchannel("A").point(table))
+        frame.alpha_composite(part, (draw_left, draw_top))
+
+    def _presented(self):
+        self.frame_count += 1
+        self._dispatch("<<FramePresented>>", NativeEvent())
+
+    def mainloop(self):
+        """Run timers until quit, jumping the clock to each one as it is due.
+
+        With no timers pending this waits for one to be added from another
+        thread.
+        """
+        if self._window is None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._running = True
+        try:
+            while self._running:
+                with self._condition:
+                    if not self._running:
+                        break
+                    if not self._timers:
+                        self._condition.wait()
+                        continue
+                timer = self._pop_timer()
+                if timer is not None:
+                    self._run_timer(timer)
+        finally:
+            self._loop_thread_id = None
+            self.destroy()
+
+    def quit(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def destroy(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.quit()
+        self._window = None
@@ -0,0 +1,219 @@
+"""Scenes of textured quads for compositing widget layers on the GPU.
+
+In compositor mode the renderer does not paint widget bodies into a frame.
+Every cached body bitmap becomes a layer that the GL side keeps in a texture,
+and each frame is a list of quads that place those layers. A widget that
+moves, scrolls or fades only changes its quad; its pixels are sent once.
+Layer transforms (translate, scale, opacity) are folded into the quads of
+everything under the transformed widget.
+Layers with identical pixels share one copy on the GL side (see
+texture_atlas), so their pixels are only sent for the first of them.
+"""
+
+from collections import Counter, namedtuple
+
+try:
+    from . import display_list, texture_atlas
+except ImportError:
+    import display_list
+    import texture_atlas
+
+
+# Layers no quad has used for this many scenes are released on the GL side.
+LAYER_RETAIN_SCENES = 120
+
+# One layer drawn at (x, y) stretched to width x height, cut to the
+# screen-space clip (left, top, right, bottom) and faded by opacity (0.0 - 1.0).
+Quad = namedtuple("Quad", "layer x y width height clip opacity")
+
+
+def _place(rect, offset_x, offset_y, scale):
+    """Map a level-local rect to the screen."""
+    if scale != 1.0:
+        rect = tuple(value * scale for value in rect)
+    return (
+        rect[0] + offset_x,
+        rect[1] + offset_y,
+        rect[2] + offset_x,
+        rect[3] + offset_y,
+    )
+
+
+class CompositorScene:
+    """One frame for the GL compositor.
+
+    layers holds (layer_id, width, height, pixels, key) for every layer
+    first used by this scene, where key is the texture_atlas.content_key of
+    its pixels and pixels is None when a live layer already has that key.
+    release holds the ids of layers the GL side can free, and quads the Quad
+    list in back-to-front order.
+    """
+
+    __slots__ = ("width", "height", "premultiplied", "layers", "release", "quads")
+
+    def __init__(self, width, height, premultiplied=False):
+        self.width = int(width)
+        self.height = int(height)
+        self.premultiplied = bool(premultiplied)
+        self.layers = []
+        self.release = []
+        self.quads = []
+
+
+class _Layer:
+    __slots__ = ("layer_id", "key", "surface", "last_used")
+
+    def __init__(self, layer_id, key, surface, last_used):
+        self.layer_id = layer_id
+        self.key = key
+        # Held so id(surface) cannot be reused while the GL side has it.
+        self.surface = surface
+        self.last_used = last_used
+
+
+class LayerCompositor:
+    """Turns a renderer's display list into CompositorScenes.
+
+    Container layers and cached subtrees are flattened: their children become
+    quads of their own, clipped to the container instead of being painted
+    into an intermediate surface. A transformed widget's opacity therefore
+    fades each of its quads separately.
+    """
+
+    def __init__(self, renderer, retain_scenes=LAYER_RETAIN_SCENES):
+        self.renderer = renderer
+        self.retain_scenes = max(1, int(retain_scenes))
+        self._layers = {}
+        # Live layers per content key, mirroring the GL side's references.
+        self._key_refs = Counter()
+        self._next_layer_id = 1
+        self._scene_count = 0
+
+    def __len__(self):
+        return len(self._layers)
+
+    def compose(self):
+        """Build the scene for the renderer's current display list."""
+        renderer = self.renderer
+        pool = renderer.surface_pool
+        scene = CompositorScene(renderer.width, renderer.height, pool.premultiplied)
+        self._scene_count += 1
+        self._add_level(
+            scene,
+            renderer.display_list.root,
+            0,
+            0,
+            (0, 0, renderer.width, renderer.height),
+        )
+        self._release_unused(scene)
+        stats = renderer.render_stats
+        stats["compositor_quads"] += len(scene.quads)
+        stats["layer_uploads"] += sum(
+            1 for layer in scene.layers if layer[3] is not None
+        )
+        return scene
+
+    def _add_level(
+        self, scene, level, offset_x, offset_y, clip, scale=1.0, opacity=1.0
+    ):
+        """Add quads for a level whose local (x, y) is at offset + x * scale."""
+        renderer = self.renderer
+        culls = level.kind != display_list.SUBTREE
+        for op in level.ops:
+            if culls and op.cull_version != level.cull_version:
+                renderer._cull_op(level, op)
+            visible = op.visible_rect
+            if visible is False:
+                continue
+            if visible is not None:
+                draw_clip = display_list._intersect(
+                    _place(visible, offset_x, offset_y, scale), clip
+                )
+                if draw_clip is None:
+                    continue
+            else:
+                draw_clip = clip
+
+            if op.kind == display_list.BODY:
+                self._add_body(
+                    scene, op, offset_x, offset_y, draw_clip, scale, opacity
+                )
+                continue
+            child_scale, child_x, child_y = display_list.layer_origin(op)
+            child_opacity = opacity
+            if op.transform is not None:
+                child_opacity *= op.transform.opacity
+                if child_opacity <= 0.0 or child_scale <= 0.0:
+                    continue
+            if op.kind == display_list.LAYER:
+                rect = display_list.transform_rect(op, (0, 0, op.width, op.height))
+                draw_clip = display_list._intersect(
+                    _place(rect, offset_x, offset_y, scale), draw_clip
+                )
+                if draw_clip is None:
+                    continue
+            if scale != 1.0:
+                child_x *= scale
+                child_y *= scale
+                child_scale *= scale
+            self._add_level(
+                scene,
+                op.child_level,
+                child_x + offset_x,
+                child_y + offset_y,
+                draw_clip,
+                child_scale,
+                child_opacity,
+            )
+
+    def _add_body(self, scene, op, offset_x, offset_y, clip, scale, opacity):
+        raster = op.raster
+        if raster is None:
+            raster = self.renderer._op_raster(op)
+        if not raster:
+            return
+        width, height = self.renderer.surface_pool.surface_size(raster.surface)
+        left = op.x + raster.offset_x
+        top = op.y + raster.offset_y
+        rect = _place(
+            (left, top, left + width, top + height), offset_x, offset_y, scale
+        )
+        if display_list._intersect(rect, clip) is None:
+            return
+        layer_id = self._layer_id(scene, raster.surface, width, height)
+        scene.quads.append(
+            Quad(
+                layer_id,
+                rect[0],
+                rect[1],
+                rect[2] - rect[0],
+                rect[3] - rect[1],
+                clip,
+                opacity,
+            )
+        )
+
+    def _layer_id(self, scene, surface, width, height):
+        layer = self._layers.get(id(surface))
+        if layer is None:
+            pixels = self.renderer.surface_pool.surface_bytes(surface)
+            key = texture_atlas.content_key(width, height, pixels)
+            layer = _Layer(self._next_layer_id, key, surface, self._scene_count)
+            self._next_layer_id += 1
+            self._layers[id(surface)] = layer
+            if self._key_refs[key]:
+                pixels = None
+            self._key_refs[key] += 1
+            scene.layers.append((layer.layer_id, width, height, pixels, key))
+        layer.last_used = self._scene_count
+        return layer.layer_id
+
+    def _release_unused(self, scene):
+        oldest = self._scene_count - self.retain_scenes
+        for key, layer in list(self._layers.items()):
+            if layer.last_used <= oldest:
+                del self._layers[key]
+                self._key_refs[layer.key] -= 1
+                if not self._key_refs[layer.key]:
+                    del self._key_refs[layer.key]
+                scene.release.append(layer.layer_id)
@@ -1,12 +1,15 @@
+import collections
 import ctypes
 from dataclasses import dataclass
 import heapq
 import itertools
 import logging
 import multiprocessing as mp
+from multiprocessing import connection as mp_connection
 import os
 import queue as std_queue
 import re
+import sys
 import threading
 import time
 import traceback
@@ -19,12 +22,37 @@ except Exception:
     GL = None
 
 try:
+    from . import frame_ring, native_protocol
     from .opengl_image_display import OpenGLImageDisplay
 except ImportError:
+    import frame_ring
+    import native_protocol
     from opengl_image_display import OpenGLImageDisplay
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on how long an idle mainloop blocks before checking that the
+# native process is still alive.
+_IDLE_WAIT_SECONDS = 1.0
+
+# Frames submitted but not yet reported presented before frame_backlogged
+# asks the renderer to hold off.
+MAX_FRAMES_IN_FLIGHT = 2
+
+# GLFW is process-global, so only one in-process window may own it at a time.
+_inprocess_host_lock = threading.Lock()
+
+# Native processes started by prewarm(), as (process, command_conn, event_conn).
+_standby_hosts = []
+_standby_lock = threading.Lock()
+# The process shared by SharedProcessGLWindows, or None.
+_shared_host = None
+_shared_host_lock = threading.Lock()
+# Placeholder size of a standby window until it is claimed.
+_STANDBY_SIZE = (500, 500)
+# Window ids are never reused, unlike id() of a destroyed window.
+_window_ids = itertools.count(1)
+
 _GLFW_SPECIAL_KEY_NAMES = {
     "KEY_BACKSPACE": "BackSpace",
     "KEY_DELETE": "Delete",
@@ -101,6 +129,103 @@ class NativeEvent:
     delta_x: int = 0
     delta_y: int = 0
     num: int = 0
+    width: int = 0
+    height: int = 0
+
+
+def _coalesce_key(message):
+    if message.get("type") == "size":
+        return ("size", message.get("window_id"))
+    if message.get("type") == "event" and message.get("name") in (
+        "<Motion>",
+        "<MouseWheel>",
+    ):
+        return (message.get("name"), message.get("window_id"))
+    return None
+
+
+def coalesce_events(messages):
+    """Collapse runs of motion, scroll and size messages.
+
+    Consecutive <Motion> events and size updates keep only the latest one, and
+    consecutive <MouseWheel> events add up their deltas. Any other message ends
+    a run, so buttons and keys keep their order relative to the pointer.
+    """
+    coalesced = []
+    previous_key = None
+    for message in messages:
+        key = _coalesce_key(message)
+        if key is not None and key == previous_key:
+            if key[0] == "<MouseWheel>":
+                previous = coalesced[-1]
+                message = dict(message)
+                for field in ("delta", "delta_x", "delta_y"):
+                    message[field] = int(previous.get(field, 0) or 0) + int(
+                        message.get(field, 0) or 0
+                    )
+            coalesced[-1] = message
+            continue
+        coalesced.append(message)
+        previous_key = key
+    return coalesced
+
+
+def _frame_command(frame_id, width, height, premultiplied, rects):
+    command = {
+        "op": "frame",
+        "frame": frame_id,
+        "width": int(width),
+        "height": int(height),
+        "premultiplied": bool(premultiplied),
+    }
+    if rects is not None:
+        command["rects"] = [tuple(int(value) for value in rect) for rect in rects]
+    return command
+
+
+class FrameMailbox:
+    """Latest-wins queue of frame commands for the GL loop.
+
+    A whole frame supersedes every frame queued before it. Rect updates are
+    deltas, so they stay queued behind the whole frame they apply to.
+    """
+
+    def __init__(self):
+        self._commands = []
+        self.dropped = 0
+        # Newest frame id put in, and the newest one acknowledged as shown.
+        self._latest_frame = 0
+        self._presented_frame = 0
+
+    def __len__(self):
+        return len(self._commands)
+
+    def put(self, command):
+        if command.get("rects") is None:
+            self.dropped += len(self._commands)
+            self._commands.clear()
+        self._commands.append(command)
+        self._latest_frame = max(self._latest_frame, int(command.get("frame") or 0))
+
+    def mark_shown(self, frame_id):
+        """Count a frame handed straight to the display as awaiting present."""
+        self._latest_frame = max(self._latest_frame, int(frame_id or 0))
+
+    def take(self):
+        """Return the queued commands, oldest first, and empty the mailbox."""
+        commands = self._commands
+        self._commands = []
+        return commands
+
+    def take_presented(self):
+        """Return the newest frame id not yet acknowledged, or None.
+
+        Call after a present; dropped frames count as shown by their successor.
+        """
+        if self._latest_frame <= self._presented_frame:
+            return None
+        self._presented_frame = self._latest_frame
+        return self._latest_frame
 
 
 def _build_key_event(mouse_x, mouse_y, key=None, scancode=0):
@@ -137,32 +262,60 @@ class NativeGLWindow:
         self._resizable = tuple(resizable)
         self._owner_thread_id = threading.get_ident()
         self._window = object()
-        self._window_id = f"native-{id(self)}"
+        # Integer ids fit the fixed native_protocol record header.
+        self._window_id = next(_window_ids)
         self._sync_lock = threading.Lock()
-        self._ctx = mp.get_context("spawn")
-        self._command_queue = self._ctx.Queue()
-        self._event_queue = self._ctx.Queue()
-        self._response_queue = self._ctx.Queue()
+        # Lets other threads interrupt a mainloop blocked on native messages.
+        self._wake_reader, self._wake_writer = mp.Pipe(duplex=False)
+        self._responses = {}
         self._hwnd = 0
         self._startup_error = None
-        self._process = self._ctx.Process(
-            target=_native_window_process_main,
-            args=(
-                int(width),
-                int(height),
-                str(title),
-                tuple(self._resizable),
-                bool(override),
-                self._window_id,
-                self._command_queue,
-                self._event_queue,
-                self._response_queue,
-            ),
-            daemon=True,
-        )
-        self._process.start()
+        # Window and framebuffer sizes, pushed by the native process.
+        self._size = (int(width), int(height))
+        self._framebuffer_size = (int(width), int(height))
+        # Frames travel through shared memory; None until the first frame.
+        self._frame_ring = None
+        self._frame_ring_generation = 0
+        self._frame_ring_failed = False
+        # Ids of the last frame submitted and the last one shown on screen.
+        self._frames_submitted = 0
+        self._frames_presented = 0
+        self._start_native_host(int(width), int(height), str(title), bool(override))
         self._wait_for_process_ready()
 
+    def _start_native_host(self, width, height, title, override):
+        """Start the GLFW process; it reports back with a "ready" message.
+
+        A process started by prewarm() is claimed when one is available.
+        """
+        self._send_lock = threading.Lock()
+        standby = _take_standby_host()
+        if standby is not None:
+            self._process, self._command_conn, self._event_conn = standby
+            self._send_record(
+                {
+                    "type": "open",
+                    "window_id": self._window_id,
+                    "width": width,
+                    "height": height,
+                    "title": title,
+                    "resizable": tuple(self._resizable),
+                    "override": override,
+                }
+            )
+            return
+        self._process, self._command_conn, self._event_conn = _spawn_native_host(
+            width, height, title, tuple(self._resizable), override, self._window_id
+        )
+
+    def _stop_native_host(self):
+        self._process.join(timeout=1.0)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._command_conn.close()
+        self._event_conn.close()
+
     @property
     def handle(self):
         return self._window
@@ -201,7 +354,7 @@ class NativeGLWindow:
                 )
             if not self._process.is_alive():
                 break
-            time.sleep(0.01)
+            self._poll_messages(0.01)
         if self._startup_error is not None:
             raise RuntimeError(
                 f"Failed to initialize native window process: {self._startup_error}"
@@ -213,36 +366,70 @@ class NativeGLWindow:
             return None
         payload = {"type": "command", "window_id": self._window_id, "command": command}
         if not expect_response:
-            self._command_queue.put(payload)
+            self._send_record(payload)
             return None
         request_id = f"req-{next(self._timer_counter)}-{time.time_ns()}"
         payload["request_id"] = request_id
         with self._sync_lock:
-            self._command_queue.put(payload)
-            deadline = time.time() + timeout
-            while time.time() < deadline:
-                remaining = max(0.01, min(0.25, deadline - time.time()))
-                try:
-                    message = self._response_queue.get(timeout=remaining)
-                except std_queue.Empty:
-                    self._process_events()
-                    continue
-                if (
-                    message.get("type") == "response"
-                    and message.get("window_id") == self._window_id
-                    and message.get("request_id") == request_id
-                ):
-                    return message.get("value")
-                # Preserve unrelated async messages by routing through event handler.
-                self._handle_process_message(message)
+            self._send_record(payload)
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                # Unrelated messages are dispatched while waiting; responses
+                # are collected into _responses.
+                self._poll_messages(
+                    max(0.01, min(0.25, deadline - time.monotonic()))
+                )
+                self._process_events()
+                if request_id in self._responses:
+                    return self._responses.pop(request_id)
         return None
 
+    def _send_record(self, message):
+        data = native_protocol.encode(message)
+        with self._send_lock:
+            try:
+                self._command_conn.send_bytes(data)
+            except OSError:
+                # The native process has exited; the mainloop sees EOF.
+                logger.debug("Dropped command for closed native window process.")
+
+    def _poll_messages(self, timeout):
+        """Wait up to timeout seconds for a native message; True if one may be pending."""
+        return self._event_conn.poll(timeout)
+
+    def _receive_messages(self, messages):
+        """Append every pending native message to messages."""
+        while self._event_conn.poll():
+            messages.extend(native_protocol.decode_batch(self._event_conn.recv_bytes()))
+
+    def _mainloop_wait_handles(self):
+        return [self._event_conn, self._wake_reader]
+
     def _handle_process_message(self, message):
         if not isinstance(message, dict):
             return
         msg_type = message.get("type")
         if msg_type == "ready" and message.get("window_id") == self._window_id:
             self._hwnd = int(message.get("hwnd") or 0)
+            self._update_size(message)
+            return
+        if msg_type == "response" and message.get("window_id") == self._window_id:
+            self._responses[message.get("request_id")] = message.get("value")
+            return
+        if msg_type == "size" and message.get("window_id") == self._window_id:
+            self._update_size(message)
+            with self._event_lock:
+                x, y = self._mouse_x, self._mouse_y
+            width, height = self._size
+            self._dispatch(
+                "<Configure>", NativeEvent(x=x, y=y, width=width, height=height)
+            )
+            return
+        if msg_type == "presented" and message.get("window_id") == self._window_id:
+            self._frames_presented = max(
+                self._frames_presented, int(message.get("frame", 0))
+            )
+            self._dispatch("<<FramePresented>>", NativeEvent())
             return
         if msg_type == "error" and message.get("window_id") == self._window_id:
             self._startup_error = str(message.get("reason") or "unknown native error")
@@ -279,12 +466,26 @@ class NativeGLWindow:
         ):
             self._running = False
 
+    def _update_size(self, message):
+        if "width" in message and "height" in message:
+            self._size = (int(message["width"]), int(message["height"]))
+        if "framebuffer_width" in message and "framebuffer_height" in message:
+            self._framebuffer_size = (
+                int(message["framebuffer_width"]),
+                int(message["framebuffer_height"]),
+            )
+
     def _process_events(self):
-        while True:
-            try:
-                message = self._event_queue.get_nowait()
-            except std_queue.Empty:
-                break
+        """Drain pending messages and dispatch them as one coalesced batch."""
+        messages = []
+        try:
+            self._receive_messages(messages)
+        except (EOFError, OSError):
+            # The native process is gone.
+            self._running = False
+        for message in coalesce_events(
+            [message for message in messages if isinstance(message, dict)]
+        ):
             self._handle_process_message(message)
 
     def _key_name(self, key):
@@ -296,20 +497,32 @@ class NativeGLWindow:
 
     def after(self, ms, callback):
         timer_id = f"after#{next(self._timer_counter)}"
-        due = time.time() + (max(0, int(ms)) / 1000.0)
+        due = time.monotonic() + (max(0, int(ms)) / 1000.0)
         with self._timers_lock:
             heapq.heappush(
                 self._timers, (due, next(self._timer_counter), timer_id, callback)
             )
-        self._send_native_command({"op": "wake"})
+        if not self._is_owner_thread():
+            # The owner recomputes its wait after every callback, so only
+            # other threads need to interrupt a blocked mainloop.
+            self._wake_mainloop()
         return timer_id
 
+    def _wake_mainloop(self):
+        self._wake_writer.send_bytes(b"")
+
     def after_cancel(self, timer_id):
         with self._timers_lock:
             self._cancelled_timers.add(timer_id)
 
+    def _next_timer_delay(self):
+        with self._timers_lock:
+            if not self._timers:
+                return None
+            return max(0.0, self._timers[0][0] - time.monotonic())
+
     def _process_timers(self):
-        now = time.time()
+        now = time.monotonic()
         ready = []
         with self._timers_lock:
             while self._timers and self._timers[0][0] <= now:
@@ -388,6 +601,16 @@ class NativeGLWindow:
         icon_path = os.path.abspath(str(value))
         self._send_native_command({"op": "iconbitmap", "value": icon_path})
 
+    def set_render_scale(self, render_scale, render_filter="linear"):
+        """Have the native display stretch frames rendered at render_scale."""
+        self._send_native_command(
+            {
+                "op": "render_scale",
+                "value": float(render_scale),
+                "filter": render_filter,
+            }
+        )
+
     def clipboard_clear(self):
         self._clipboard_fallback = ""
         self._send_native_command({"op": "clipboard_set", "value": ""})
@@ -419,35 +642,112 @@ class NativeGLWindow:
     def winfo_width(self):
         if self._window is None:
             return 0
-        size = self._send_native_command(
-            {"op": "get_size"}, expect_response=True, timeout=1.0
-        )
-        if not size:
-            return 0
-        return int(size.get("width", 0))
+        return self._size[0]
 
     def winfo_height(self):
         if self._window is None:
             return 0
-        size = self._send_native_command(
-            {"op": "get_size"}, expect_response=True, timeout=1.0
+        return self._size[1]
+
+    @property
+    def framebuffer_size(self):
+        """Last reported (width, height) of the framebuffer, in pixels."""
+        return self._framebuffer_size
+
+    @property
+    def frame_backlogged(self):
+        """Whether MAX_FRAMES_IN_FLIGHT frames are still waiting to be shown.
+
+        The native side reports each present; <<FramePresented>> fires then.
+        """
+        return self._frames_submitted - self._frames_presented >= MAX_FRAMES_IN_FLIGHT
+
+    def _next_frame_command(self, width, height, premultiplied, rects):
+        self._frames_submitted += 1
+        return _frame_command(
+            self._frames_submitted, width, height, premultiplied, rects
         )
-        if not size:
-            return 0
-        return int(size.get("height", 0))
 
-    def submit_frame(self, frame_rgba, width, height):
+    def submit_frame(
+        self, frame_rgba, width, height, premultiplied=False, rects=None
+    ):
+        """Send a frame to the native process.
+
+        frame_rgba may be any C-contiguous bytes-like object; it is copied
+        before this returns, so the caller can reuse its buffer. With rects,
+        it holds only those (left, top, right, bottom) regions' pixels, packed
+        back to back, and updates the previously sent frame.
+        """
         if self._window is None:
             return
+        command = self._next_frame_command(width, height, premultiplied, rects)
+        written = self._write_frame_slot(frame_rgba)
+        if written is None:
+            command["frame_rgba"] = bytes(frame_rgba)
+        else:
+            command["ring"] = self._frame_ring_generation
+            command["slot"], command["seq"], command["nbytes"] = written
+        self._send_native_command(command)
+
+    def submit_scene(self, scene):
+        """Send a layer_compositor.CompositorScene to the native process.
+
+        Only layers new to the scene carry pixels; the rest of it is quads.
+        """
+        if self._window is None:
+            return
+        self._frames_submitted += 1
         self._send_native_command(
             {
-                "op": "frame",
-                "width": int(width),
-                "height": int(height),
-                "frame_rgba": frame_rgba,
+                "op": "scene",
+                "frame": self._frames_submitted,
+                "width": scene.width,
+                "height": scene.height,
+                "premultiplied": scene.premultiplied,
+                "layers": scene.layers,
+                "release": scene.release,
+                # Plain tuples, so the native side needs no renderer imports.
+                "quads": [tuple(quad) for quad in scene.quads],
             }
         )
 
+    def _write_frame_slot(self, frame_rgba):
+        """Copy a frame into the shared ring; None means send it inline."""
+        if self._frame_ring_failed:
+            return None
+        try:
+            nbytes = memoryview(frame_rgba).nbytes
+            if self._frame_ring is None or nbytes > self._frame_ring.slot_size:
+                self._replace_frame_ring(nbytes)
+            # None while the native process still holds every slot.
+            return self._frame_ring.write(frame_rgba)
+        except (OSError, TypeError, ValueError):
+            logger.exception("Shared frame ring unavailable; sending frames inline.")
+            self._frame_ring_failed = True
+            return None
+
+    def _replace_frame_ring(self, slot_size):
+        ring = frame_ring.SharedFrameRing(slot_size)
+        self._close_frame_ring()
+        self._frame_ring = ring
+        self._frame_ring_generation += 1
+        self._send_native_command(
+            {
+                "op": "frame_ring",
+                "generation": self._frame_ring_generation,
+                "name": ring.name,
+                "slot_size": ring.slot_size,
+                "slots": ring.slots,
+            }
+        )
+
+    def _close_frame_ring(self):
+        if self._frame_ring is None:
+            return
+        # The native process keeps its own mapping of the block.
+        self._frame_ring.close()
+        self._frame_ring = None
+
     def mainloop(self):
         if self._window is None:
             return
@@ -455,15 +755,28 @@ class NativeGLWindow:
         while self._running:
             if self._window is None:
                 break
-            self._process_events()
             self._process_timers()
-            time.sleep(0.001)
+            if not self._running:
+                break
+            # Sleep until the next native event, cross-thread wake or timer.
+            timeout = self._next_timer_delay()
+            if timeout is None or timeout > _IDLE_WAIT_SECONDS:
+                timeout = _IDLE_WAIT_SECONDS
+            ready = mp_connection.wait(self._mainloop_wait_handles(), timeout)
+            if not ready and not self._process.is_alive():
+                break
+            if self._wake_reader in ready:
+                while self._wake_reader.poll():
+                    self._wake_reader.recv_bytes()
+            self._process_events()
         self.destroy()
 
     def quit(self):
         self._running = False
         if self._window is not None:
             self._send_native_command({"op": "quit"})
+            if not self._is_owner_thread():
+                self._wake_mainloop()
 
     def destroy(self):
         if self._closed:
@@ -474,14 +787,257 @@ class NativeGLWindow:
                 self._send_native_command({"op": "quit"})
             except Exception:
                 logger.exception("Failed sending quit to native window process.")
-            if self._process is not None:
-                self._process.join(timeout=1.0)
-                if self._process.is_alive():
-                    self._process.terminate()
-                    self._process.join(timeout=1.0)
+            self._stop_native_host()
+            self._close_frame_ring()
+            self._wake_reader.close()
+            self._wake_writer.close()
             self._window = None
 
 
+class _InboxGLWindow(NativeGLWindow):
+    """NativeGLWindow whose native messages are delivered into an inbox.
+
+    Whoever reads the native side calls _post_messages from its own thread,
+    instead of this window reading a pipe of its own.
+    """
+
+    def _init_inbox(self):
+        self._inbox = collections.deque()
+        self._inbox_ready = threading.Event()
+
+    def _post_messages(self, messages):
+        """Deliver native messages; runs on the delivering thread."""
+        self._inbox.extend(messages)
+        # One wake per drain is enough; _receive_messages clears the flag
+        # before draining, so nothing appended after a skipped wake is lost.
+        if self._inbox_ready.is_set():
+            return
+        self._inbox_ready.set()
+        try:
+            self._wake_mainloop()
+        except OSError:
+            # The owner already closed its wake pipe.
+            pass
+
+    def _poll_messages(self, timeout):
+        return self._inbox_ready.wait(timeout)
+
+    def _receive_messages(self, messages):
+        self._inbox_ready.clear()
+        while self._inbox:
+            messages.append(self._inbox.popleft())
+
+    def _mainloop_wait_handles(self):
+        return [self._wake_reader]
+
+
+class InProcessGLWindow(_InboxGLWindow):
+    """NativeGLWindow whose GLFW loop runs on a thread of this process.
+
+    Commands and events are handed over as dicts through in-memory queues and
+    frames reach OpenGLImageDisplay without a shared-memory copy, so there is
+    no interpreter spawn, serialization or IPC hop. GLFW is process-global:
+    only one in-process window can be open at a time, and macOS, where GLFW
+    must run on the main thread, is unsupported.
+    """
+
+    def _start_native_host(self, width, height, title, override):
+        if sys.platform == "darwin":
+            raise RuntimeError(
+                "In-process OpenGL backend unavailable on macOS; use the process backend."
+            )
+        if not _inprocess_host_lock.acquire(blocking=False):
+            raise RuntimeError("Only one in-process native window can be open at a time.")
+        self._pending_commands = std_queue.Queue()
+        self._init_inbox()
+        self._loop_waker = _LoopWaker()
+        # The GLFW thread stands in for the native process.
+        self._process = threading.Thread(
+            target=self._run_native_host,
+            args=(width, height, title, override),
+            name="ntk-glfw",
+            daemon=True,
+        )
+        self._process.start()
+
+    def _run_native_host(self, width, height, title, override):
+        try:
+            _run_native_window(
+                width,
+                height,
+                title,
+                tuple(self._resizable),
+                override,
+                self._window_id,
+                self._pending_commands,
+                self._post_messages,
+                self._loop_waker,
+            )
+        finally:
+            _inprocess_host_lock.release()
+
+    def _wait_for_process_ready(self):
+        try:
+            super()._wait_for_process_ready()
+        except RuntimeError:
+            # Let the thread finish so the GLFW slot is free for a retry.
+            self._process.join(timeout=1.0)
+            raise
+
+    def _stop_native_host(self):
+        self._process.join(timeout=1.0)
+        if self._process.is_alive():
+            logger.warning("In-process GLFW thread did not exit.")
+
+    def _send_record(self, message):
+        self._pending_commands.put(message)
+        self._loop_waker.wake()
+
+    def submit_frame(
+        self, frame_rgba, width, height, premultiplied=False, rects=None
+    ):
+        """Hand a frame to the GLFW thread.
+
+        bytes frames are passed on as they are; any other buffer is copied
+        before this returns, so the caller can reuse it.
+        """
+        if self._window is None:
+            return
+        command = self._next_frame_command(width, height, premultiplied, rects)
+        if not isinstance(frame_rgba, bytes):
+            frame_rgba = bytes(frame_rgba)
+        command["frame_rgba"] = frame_rgba
+        self._send_native_command(command)
+
+
+class SharedProcessGLWindow(_InboxGLWindow):
+    """NativeGLWindow hosted together with others in one native process.
+
+    All SharedProcessGLWindows of this process share a single GLFW process
+    and GL context group; the process exits once the last of them is
+    destroyed.
+    """
+
+    def _start_native_host(self, width, height, title, override):
+        self._init_inbox()
+        self._host = _claim_shared_native_host(self)
+        # The shared process stands in for a process of our own.
+        self._process = self._host.process
+        self._send_record(
+            {
+                "type": "open",
+                "window_id": self._window_id,
+                "width": width,
+                "height": height,
+                "title": title,
+                "resizable": tuple(self._resizable),
+                "override": override,
+                "shared": True,
+            }
+        )
+
+    def _wait_for_process_ready(self):
+        try:
+            super()._wait_for_process_ready()
+        except RuntimeError:
+            self._host.release(self)
+            raise
+
+    def _send_record(self, message):
+        self._host.send(message)
+
+    def _stop_native_host(self):
+        self._host.release(self)
+
+
+class _SharedNativeHost:
+    """Owner-side end of a native process hosting several windows.
+
+    A reader thread splits incoming batches by window_id and posts each part
+    to its window's inbox.
+    """
+
+    def __init__(self):
+        standby = _take_standby_host()
+        if standby is None:
+            standby = _spawn_native_host(
+                _STANDBY_SIZE[0], _STANDBY_SIZE[1], "ntk", (True, True), False, None
+            )
+        self.process, self._command_conn, self._event_conn = standby
+        self._send_lock = threading.Lock()
+        self._windows = {}
+        self._closed = False
+        threading.Thread(target=self._route_messages, daemon=True).start()
+
+    @property
+    def alive(self):
+        return not self._closed and self.process.is_alive()
+
+    def send(self, message):
+        data = native_protocol.encode(message)
+        with self._send_lock:
+            try:
+                self._command_conn.send_bytes(data)
+            except OSError:
+                logger.debug("Dropped command for closed shared native process.")
+
+    def release(self, window):
+        """Forget a window; the last one closes the host."""
+        global _shared_host
+        with _shared_host_lock:
+            self._windows.pop(window._window_id, None)
+            if self._windows:
+                return
+            self._closed = True
+            if _shared_host is self:
+                _shared_host = None
+        # The native process exits on EOF; the reader thread then finishes.
+        with self._send_lock:
+            self._command_conn.close()
+
+    def _route_messages(self):
+        while True:
+            try:
+                messages = native_protocol.decode_batch(self._event_conn.recv_bytes())
+            except (EOFError, OSError):
+                break
+            with _shared_host_lock:
+                windows = dict(self._windows)
+            batches = {}
+            for message in messages:
+                if not isinstance(message, dict):
+                    continue
+                window_id = message.get("window_id")
+                if window_id is None and message.get("type") == "error":
+                    # The host itself failed; every window has to know.
+                    for other_id in windows:
+                        batches.setdefault(other_id, []).append(
+                            dict(message, window_id=other_id)
+                        )
+                    continue
+                batches.setdefault(window_id, []).append(message)
+            for window_id, batch in batches.items():
+                window = windows.get(window_id)
+                if window is not None:
+                    window._post_messages(batch)
+        self._event_conn.close()
+        with _shared_host_lock:
+            self._closed = True
+            windows = list(self._windows.values())
+        for window in windows:
+            window._post_messages([{"type": "closed", "window_id": window._window_id}])
+
+
+def _claim_shared_native_host(window):
+    """Register window with the live shared host, starting one if needed."""
+    global _shared_host
+    with _shared_host_lock:
+        if _shared_host is None or not _shared_host.alive:
+            _shared_host = _SharedNativeHost()
+        _shared_host._windows[window._window_id] = window
+        return _shared_host
+
+
 def _set_windows_window_icon(hwnd, icon_path):
     """Set a Win32 window icon from an .ico file path."""
     if not hwnd or not icon_path or os.name != "nt":
@@ -529,6 +1085,99 @@ def _set_windows_window_icon(hwnd, icon_path):
         return False
 
 
+def _spawn_native_host(width, height, title, resizable, override, window_id):
+    """Start a native window process.
+
+    Returns:
+        tuple: (process, command_conn, event_conn); commands are sent on
+            command_conn and events arrive on event_conn.
+    """
+    ctx = mp.get_context("spawn")
+    # One-way pipes carrying native_protocol records: commands to the
+    # native process, and events and responses back.
+    command_reader, command_conn = ctx.Pipe(duplex=False)
+    event_conn, event_writer = ctx.Pipe(duplex=False)
+    process = ctx.Process(
+        target=_native_window_process_main,
+        args=(
+            width,
+            height,
+            title,
+            resizable,
+            override,
+            window_id,
+            command_reader,
+            event_writer,
+        ),
+        daemon=True,
+    )
+    process.start()
+    # The child holds its own copies of these ends.
+    command_reader.close()
+    event_writer.close()
+    return process, command_conn, event_conn
+
+
+def prewarm(count=1):
+    """Keep count native window processes on standby for fast window startup.
+
+    Each one imports GLFW and OpenGL, creates a hidden window and compiles its
+    shaders ahead of time. A NativeGLWindow created later claims one, sends it
+    its size and title and shows it. Claimed processes are not replaced; call
+    prewarm() again to refill. Has no effect on InProcessGLWindow.
+    """
+    if glfw is None or GL is None:
+        raise RuntimeError(
+            "OpenGL backend unavailable. Install/enable glfw + PyOpenGL."
+        )
+    with _standby_lock:
+        _standby_hosts[:] = [host for host in _standby_hosts if host[0].is_alive()]
+        missing = max(0, int(count) - len(_standby_hosts))
+    for _ in range(missing):
+        host = _spawn_native_host(
+            _STANDBY_SIZE[0], _STANDBY_SIZE[1], "ntk", (True, True), False, None
+        )
+        with _standby_lock:
+            _standby_hosts.append(host)
+
+
+def _take_standby_host():
+    """Claim a live standby process, or return None."""
+    with _standby_lock:
+        while _standby_hosts:
+            process, command_conn, event_conn = _standby_hosts.pop(0)
+            if process.is_alive():
+                return process, command_conn, event_conn
+            command_conn.close()
+            event_conn.close()
+    return None
+
+
+class _LoopWaker:
+    """Wakes a GLFW loop blocked in wait_events() from other threads.
+
+    Wakes are dropped while GLFW is not initialized, so a late caller can not
+    touch a terminated library.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = False
+
+    def set_active(self, active):
+        with self._lock:
+            self._active = bool(active)
+
+    def wake(self):
+        with self._lock:
+            if not self._active:
+                return
+            try:
+                glfw.post_empty_event()
+            except Exception:
+                pass
+
+
 def _native_window_process_main(
     width,
     height,
@@ -536,32 +1185,98 @@ def _native_window_process_main(
     resizable,
     override,
     window_id,
-    command_queue,
-    event_queue,
-    response_queue,
+    command_conn,
+    event_conn,
 ):
-    def report_startup_error(reason):
+    pending_commands = std_queue.Queue()
+    waker = _LoopWaker()
+
+    def post_messages(messages):
         try:
-            event_queue.put(
-                {
-                    "type": "error",
-                    "window_id": window_id,
-                    "reason": str(reason),
-                }
-            )
-        except Exception:
+            event_conn.send_bytes(native_protocol.encode_batch(messages))
+        except OSError:
             pass
 
-    if glfw is None or GL is None:
-        report_startup_error(
-            "OpenGL backend unavailable (glfw or OpenGL module missing)."
-        )
-        return
-    if not glfw.init():
-        report_startup_error("glfw.init() failed.")
+    # Commands are read on a helper thread that wakes the GLFW loop with an
+    # empty event, so the loop can block in wait_events() while idle.
+    def read_commands():
+        while True:
+            try:
+                messages = native_protocol.decode_batch(command_conn.recv_bytes())
+            except (EOFError, OSError):
+                messages = [None]
+            for message in messages:
+                pending_commands.put(message)
+            waker.wake()
+            if messages and messages[-1] is None:
+                return
+
+    threading.Thread(target=read_commands, daemon=True).start()
+    _run_native_window(
+        width,
+        height,
+        title,
+        resizable,
+        override,
+        window_id,
+        pending_commands,
+        post_messages,
+        waker,
+    )
+
+
+def _run_native_window(
+    width,
+    height,
+    title,
+    resizable,
+    override,
+    window_id,
+    pending_commands,
+    post_messages,
+    waker,
+):
+    """Run a native window host until its windows are closed.
+
+    Command messages are taken from pending_commands (None means the owner is
+    gone) and lists of outgoing messages are handed to post_messages. waker is
+    activated once GLFW is initialized.
+
+    With window_id None the host starts as a standby: it creates a hidden
+    spare window and waits for an "open" message carrying the real id, size,
+    title and style.
+    """
+    host = _NativeWindowHost(pending_commands, post_messages, waker)
+    if window_id is None:
+        host.run(spare_size=(width, height))
         return
+    host.run(
+        first_window={
+            "window_id": window_id,
+            "width": width,
+            "height": height,
+            "title": title,
+            "resizable": resizable,
+            "override": override,
+        }
+    )
 
-    try:
+
+class _RootHandle:
+    def __init__(self, handle):
+        self.handle = handle
+
+
+class _HostedWindow:
+    """One GLFW window of a native window host, with its display and state."""
+
+    def __init__(
+        self, host, window_id, width, height, title, resizable, override, visible
+    ):
+        self.host = host
+        self.window_id = window_id
+        self.width = int(width)
+        self.height = int(height)
         glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
         glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
         glfw.window_hint(glfw.CLIENT_API, glfw.OPENGL_API)
@@ -570,305 +1285,574 @@ def _native_window_process_main(
         )
         glfw.window_hint(glfw.TRANSPARENT_FRAMEBUFFER, glfw.TRUE)
         glfw.window_hint(glfw.DECORATED, glfw.FALSE if override else glfw.TRUE)
-
-        window = glfw.create_window(int(width), int(height), str(title), None, None)
-        if not window:
-            report_startup_error("glfw.create_window() failed.")
-            return
-        glfw.make_context_current(window)
+        glfw.window_hint(glfw.VISIBLE, glfw.TRUE if visible else glfw.FALSE)
+        # Every window shares textures and buffers with the host's others.
+        self.window = glfw.create_window(
+            self.width, self.height, str(title), None, host.share_window()
+        )
+        if not self.window:
+            raise RuntimeError("glfw.create_window() failed.")
+        glfw.make_context_current(self.window)
         glfw.swap_interval(0)
+        self.display = OpenGLImageDisplay(
+            _RootHandle(self.window), self.width, self.height
+        )
+        self.clipboard_fallback = ""
+        self.mouse_x = 0
+        self.mouse_y = 0
+        self.closing = False
+        self.needs_present = True
+        self.close_request_deadline = None
+        # The attached shared frame ring and its generation, rings awaiting
+        # close, and the newest ring sequence queued for the display.
+        self.frame_rings = {"current": None, "generation": 0, "retired": [], "received": 0}
+        self.frame_mailbox = FrameMailbox()
+        self.hwnd = (
+            glfw.get_win32_window(self.window)
+            if hasattr(glfw, "get_win32_window")
+            else 0
+        )
+        self._command_handlers = {
+            "quit": self.handle_quit,
+            "close_request_handled": self.handle_close_request_handled,
+            "wake": self.handle_wake,
+            "geometry": self.handle_geometry,
+            "title": self.handle_title,
+            "resizable": self.handle_resizable,
+            "override": self.handle_override,
+            "withdraw": self.handle_withdraw,
+            "deiconify": self.handle_deiconify,
+            "iconbitmap": self.handle_iconbitmap,
+            "focus": self.handle_focus,
+            "render_scale": self.handle_render_scale,
+            "frame_ring": self.handle_frame_ring,
+            "scene": self.handle_scene,
+            "clipboard_set": self.handle_clipboard_set,
+            "clipboard_get": self.handle_clipboard_get,
+        }
+        self._install_callbacks()
+
+    def adopt(self, message):
+        """Turn a hidden spare window into the window an "open" asked for."""
+        self.window_id = message["window_id"]
+        self.width = int(message.get("width", self.width))
+        self.height = int(message.get("height", self.height))
+        resizable = tuple(message.get("resizable", (True, True)))
+        glfw.set_window_title(self.window, str(message.get("title", "ntk")))
+        glfw.set_window_size(self.window, self.width, self.height)
+        self.handle_resizable({"x": resizable[0], "y": resizable[1]}, None)
+        self.handle_override({"value": message.get("override", False)}, None)
+        glfw.show_window(self.window)
+        self.needs_present = True
+
+    def _install_callbacks(self):
+        window = self.window
+        glfw.set_window_close_callback(window, self.on_close_requested)
+        glfw.set_cursor_pos_callback(window, self.on_cursor_pos)
+        glfw.set_cursor_enter_callback(window, self.on_cursor_enter)
+        glfw.set_mouse_button_callback(window, self.on_mouse_button)
+        glfw.set_scroll_callback(window, self.on_scroll)
+        glfw.set_key_callback(window, self.on_key)
+        glfw.set_char_callback(window, self.on_char)
+        glfw.set_window_refresh_callback(window, self.on_window_refresh)
+        glfw.set_window_size_callback(window, self.on_window_size)
+        glfw.set_framebuffer_size_callback(window, self.on_window_size)
+
+    def send_event(
+        self, name, x=0, y=0, keysym="", char="", delta=0, delta_x=0, delta_y=0, num=0
+    ):
+        self.host.outbox.append(
+            {
+                "type": "event",
+                "window_id": self.window_id,
+                "name": name,
+                "x": int(x),
+                "y": int(y),
+                "keysym": keysym,
+                "char": char,
+                "delta": int(delta),
+                "delta_x": int(delta_x),
+                "delta_y": int(delta_y),
+                "num": int(num),
+            }
+        )
 
-        class _RootHandle:
-            def __init__(self, handle):
-                self.handle = handle
-
-        display = OpenGLImageDisplay(_RootHandle(window), width, height)
-        clipboard_fallback = ""
-        mouse_state = {"x": 0, "y": 0}
-        running = True
-        needs_present = True
-        close_request_deadline = None
-
-        def send_event(
-            name,
-            x=0,
-            y=0,
-            keysym="",
-            char="",
-            delta=0,
-            delta_x=0,
-            delta_y=0,
-            num=0,
-        ):
-            event_queue.put(
-                {
-                    "type": "event",
-                    "window_id": window_id,
-                    "name": name,
-                    "x": int(x),
-                    "y": int(y),
-                    "keysym": keysym,
-                    "char": char,
-                    "delta": int(delta),
-                    "delta_x": int(delta_x),
-                    "delta_y": int(delta_y),
-                    "num": int(num),
-                }
-            )
+    def size_message(self, message_type):
+        window_width, window_height = glfw.get_window_size(self.window)
+        framebuffer_width, framebuffer_height = glfw.get_framebuffer_size(self.window)
+        return {
+            "type": message_type,
+            "window_id": self.window_id,
+            "width": int(window_width),
+            "height": int(window_height),
+            "framebuffer_width": int(framebuffer_width),
+            "framebuffer_height": int(framebuffer_height),
+        }
 
-        def send_response(request_id, value):
-            if request_id is None:
-                return
-            response_queue.put(
-                {
-                    "type": "response",
-                    "window_id": window_id,
-                    "request_id": request_id,
-                    "value": value,
-                }
-            )
+    def on_close_requested(self, _window):
+        self.host.outbox.append(
+            {
+                "type": "protocol",
+                "window_id": self.window_id,
+                "name": "WM_DELETE_WINDOW",
+            }
+        )
+        # Keep the window open while the owner thread handles WM_DELETE_WINDOW.
+        # If the owner is gone and never acknowledges, close anyway shortly
+        # after to avoid a permanently stuck window.
+        self.close_request_deadline = time.monotonic() + 1.0
+        glfw.set_window_should_close(self.window, False)
+
+    def on_cursor_pos(self, _window, x, y):
+        self.mouse_x, self.mouse_y = int(x), int(y)
+        self.send_event("<Motion>", x, y)
+
+    def on_cursor_enter(self, _window, entered):
+        if not entered:
+            self.send_event("<Leave>", self.mouse_x, self.mouse_y)
+
+    def on_mouse_button(self, _window, button, action, _mods):
+        if button == glfw.MOUSE_BUTTON_LEFT and action == glfw.PRESS:
+            self.send_event("<Button-1>", self.mouse_x, self.mouse_y)
+        elif button == glfw.MOUSE_BUTTON_LEFT and action == glfw.RELEASE:
+            self.send_event("<ButtonRelease-1>", self.mouse_x, self.mouse_y)
+
+    def on_scroll(self, _window, xoffset, yoffset):
+        # Match tkinter-style MouseWheel semantics (positive == scroll up).
+        self.send_event(
+            "<MouseWheel>",
+            self.mouse_x,
+            self.mouse_y,
+            delta=int(round(float(yoffset) * 120.0)),
+            delta_x=int(round(float(xoffset) * 120.0)),
+            delta_y=int(round(float(yoffset) * 120.0)),
+        )
 
-        def on_close_requested(_window):
-            nonlocal close_request_deadline
-            event_queue.put(
-                {
-                    "type": "protocol",
-                    "window_id": window_id,
-                    "name": "WM_DELETE_WINDOW",
-                }
-            )
-            # Keep the window open while the owner thread handles WM_DELETE_WINDOW.
-            # If the owner is gone and never acknowledges, close anyway shortly
-            # after to avoid a permanently stuck window.
-            close_request_deadline = time.time() + 1.0
-            glfw.set_window_should_close(_window, False)
-
-        def on_cursor_pos(_window, x, y):
-            mouse_state["x"], mouse_state["y"] = int(x), int(y)
-            send_event("<Motion>", x, y)
-
-        def on_cursor_enter(_window, entered):
-            if not entered:
-                send_event("<Leave>", mouse_state["x"], mouse_state["y"])
-
-        def on_mouse_button(_window, button, action, _mods):
-            if button == glfw.MOUSE_BUTTON_LEFT and action == glfw.PRESS:
-                send_event("<Button-1>", mouse_state["x"], mouse_state["y"])
-            elif button == glfw.MOUSE_BUTTON_LEFT and action == glfw.RELEASE:
-                send_event("<ButtonRelease-1>", mouse_state["x"], mouse_state["y"])
-
-        def on_scroll(_window, xoffset, yoffset):
-            # Match tkinter-style MouseWheel semantics (positive == scroll up).
-            send_event(
-                "<MouseWheel>",
-                mouse_state["x"],
-                mouse_state["y"],
-                delta=int(round(float(yoffset) * 120.0)),
-                delta_x=int(round(float(xoffset) * 120.0)),
-                delta_y=int(round(float(yoffset) * 120.0)),
-            )
+    def on_key(self, _window, key, scancode, action, mods):
+        event = _build_key_event(self.mouse_x, self.mouse_y, key, scancode)
+        if action in (glfw.PRESS, glfw.REPEAT):
+            if _should_dispatch_keypress_event(event.keysym, event.char, mods):
+                self.send_event("<Key>", event.x, event.y, event.keysym, event.char)
+        elif action == glfw.RELEASE:
+            self.send_event("<KeyRelease>", event.x, event.y, event.keysym, event.char)
 
-        def on_key(_window, key, scancode, action, mods):
-            event = _build_key_event(mouse_state["x"], mouse_state["y"], key, scancode)
-            if action in (glfw.PRESS, glfw.REPEAT):
-                if _should_dispatch_keypress_event(event.keysym, event.char, mods):
-                    send_event("<Key>", event.x, event.y, event.keysym, event.char)
-            elif action == glfw.RELEASE:
-                send_event("<KeyRelease>", event.x, event.y, event.keysym, event.char)
+    def on_char(self, _window, codepoint):
+        try:
+            char = chr(int(codepoint))
+        except (TypeError, ValueError):
+            return
+        if not _is_text_input_char(char):
+            return
+        keysym = char.lower() if char.isalpha() else char
+        self.send_event("<Key>", self.mouse_x, self.mouse_y, keysym, char)
+
+    def on_window_refresh(self, _window):
+        self.needs_present = True
+
+    def on_window_size(self, _window, _w, _h):
+        self.needs_present = True
+        self.host.outbox.append(self.size_message("size"))
+
+    def handle_command(self, command, request_id):
+        op = command.get("op")
+        if op == "frame":
+            # Only the newest whole frame (and rects on top of it) is
+            # uploaded once the queue is drained.
+            self.queue_frame(command)
+            return
+        if op in ("frame_ring", "scene"):
+            # Frames still queued refer to the ring being replaced, or would
+            # be shown over the scene.
+            self.deliver_frames()
+        handler = self._command_handlers.get(op)
+        if handler is not None:
+            handler(command, request_id)
+
+    def handle_quit(self, command, _request_id):
+        self.closing = True
+
+    def handle_close_request_handled(self, command, _request_id):
+        self.close_request_deadline = None
+
+    def handle_wake(self, command, _request_id):
+        self.needs_present = True
+
+    def handle_geometry(self, command, _request_id):
+        glfw.set_window_size(
+            self.window,
+            int(command.get("width", self.width)),
+            int(command.get("height", self.height)),
+        )
+        if command.get("x") is not None and command.get("y") is not None:
+            glfw.set_window_pos(self.window, int(command["x"]), int(command["y"]))
+        self.needs_present = True
 
-        def on_char(_window, codepoint):
-            try:
-                char = chr(int(codepoint))
-            except (TypeError, ValueError):
-                return
-            if not _is_text_input_char(char):
-                return
-            keysym = char.lower() if char.isalpha() else char
-            send_event("<Key>", mouse_state["x"], mouse_state["y"], keysym, char)
-
-        def on_window_refresh(_window):
-            nonlocal needs_present
-            needs_present = True
-
-        def on_window_size(_window, _w, _h):
-            nonlocal needs_present
-            needs_present = True
-
-        def on_framebuffer_size(_window, _w, _h):
-            nonlocal needs_present
-            needs_present = True
-
-        glfw.set_window_close_callback(window, on_close_requested)
-        glfw.set_cursor_pos_callback(window, on_cursor_pos)
-        glfw.set_cursor_enter_callback(window, on_cursor_enter)
-        glfw.set_mouse_button_callback(window, on_mouse_button)
-        glfw.set_scroll_callback(window, on_scroll)
-        glfw.set_key_callback(window, on_key)
-        glfw.set_char_callback(window, on_char)
-        glfw.set_window_refresh_callback(window, on_window_refresh)
-        glfw.set_window_size_callback(window, on_window_size)
-        glfw.set_framebuffer_size_callback(window, on_framebuffer_size)
-
-        hwnd = glfw.get_win32_window(window) if hasattr(glfw, "get_win32_window") else 0
-        event_queue.put(
-            {"type": "ready", "window_id": window_id, "hwnd": int(hwnd or 0)}
+    def handle_title(self, command, _request_id):
+        glfw.set_window_title(self.window, str(command.get("value", "")))
+
+    def handle_resizable(self, command, _request_id):
+        can_resize = bool(command.get("x")) or bool(command.get("y"))
+        glfw.set_window_attrib(
+            self.window, glfw.RESIZABLE, glfw.TRUE if can_resize else glfw.FALSE
         )
 
-        def handle_quit(command, _request_id):
-            nonlocal running
-            running = False
-            glfw.set_window_should_close(window, True)
-
-        def handle_close_request_handled(command, _request_id):
-            nonlocal close_request_deadline
-            close_request_deadline = None
-
-        def handle_wake(command, _request_id):
-            nonlocal needs_present
-            needs_present = True
-
-        def handle_geometry(command, _request_id):
-            nonlocal needs_present
-            glfw.set_window_size(
-                window,
-                int(command.get("width", width)),
-                int(command.get("height", height)),
-            )
-            if command.get("x") is not None and command.get("y") is not None:
-                glfw.set_window_pos(window, int(command["x"]), int(command["y"]))
-            needs_present = True
+    def handle_override(self, command, _request_id):
+        glfw.set_window_attrib(
+            self.window,
+            glfw.DECORATED,
+            glfw.FALSE if bool(command.get("value")) else glfw.TRUE,
+        )
+
+    def handle_withdraw(self, command, _request_id):
+        glfw.hide_window(self.window)
+
+    def handle_deiconify(self, command, _request_id):
+        glfw.show_window(self.window)
+        self.needs_present = True
 
-        def handle_title(command, _request_id):
-            glfw.set_window_title(window, str(command.get("value", "")))
+    def handle_iconbitmap(self, command, _request_id):
+        _set_windows_window_icon(self.hwnd, command.get("value"))
 
-        def handle_resizable(command, _request_id):
-            can_resize = bool(command.get("x")) or bool(command.get("y"))
-            glfw.set_window_attrib(
-                window, glfw.RESIZABLE, glfw.TRUE if can_resize else glfw.FALSE
+    def handle_focus(self, command, _request_id):
+        glfw.focus_window(self.window)
+
+    def handle_render_scale(self, command, _request_id):
+        self.display.set_render_scale(
+            command.get("value", 1.0), command.get("filter", "linear")
+        )
+        self.needs_present = True
+
+    def handle_frame_ring(self, command, _request_id):
+        frame_rings = self.frame_rings
+        if frame_rings["current"] is not None:
+            # Closed after the next present, once no view of it is held.
+            frame_rings["retired"].append(frame_rings["current"])
+        frame_rings["generation"] = command.get("generation")
+        frame_rings["received"] = 0
+        try:
+            frame_rings["current"] = frame_ring.SharedFrameRing.attach(
+                command.get("name"),
+                int(command.get("slot_size", 0)),
+                int(command.get("slots", frame_ring.DEFAULT_SLOTS)),
+            )
+        except (OSError, ValueError):
+            # Already replaced by the owner; its frames will be skipped.
+            frame_rings["current"] = None
+
+    def queue_frame(self, command):
+        frame_rings = self.frame_rings
+        if command.get("ring") is not None and (
+            command.get("ring") == frame_rings["generation"]
+        ):
+            # Superseded frames are consumed too, so their slots free up.
+            frame_rings["received"] = max(
+                frame_rings["received"], int(command.get("seq", 0))
             )
+        self.frame_mailbox.put(command)
+
+    def deliver_frames(self):
+        for command in self.frame_mailbox.take():
+            self.show_frame(command)
 
-        def handle_override(command, _request_id):
-            glfw.set_window_attrib(
-                window,
-                glfw.DECORATED,
-                glfw.FALSE if bool(command.get("value")) else glfw.TRUE,
+    def show_frame(self, command):
+        frame_rgba = command.get("frame_rgba")
+        if frame_rgba is None:
+            ring = self.frame_rings["current"]
+            if ring is None or self.frame_rings["generation"] != command.get("ring"):
+                return
+            frame_rgba = ring.view(command.get("slot"), command.get("nbytes"))
+        frame_width = int(command.get("width", self.width))
+        frame_height = int(command.get("height", self.height))
+        premultiplied = bool(command.get("premultiplied", False))
+        if command.get("rects") is not None:
+            self.display.show_frame_rects(
+                command["rects"],
+                frame_rgba,
+                frame_width,
+                frame_height,
+                premultiplied=premultiplied,
             )
+        else:
+            self.display.show_frame_bytes(
+                frame_rgba, frame_width, frame_height, premultiplied=premultiplied
+            )
+        self.needs_present = True
+
+    def handle_scene(self, command, _request_id):
+        # Scenes are not dropped like frames: each one's layer uploads and
+        # releases still apply, and only the newest quads are drawn.
+        self.display.apply_scene(
+            command.get("width", self.width),
+            command.get("height", self.height),
+            command.get("layers", ()),
+            command.get("release", ()),
+            command.get("quads", ()),
+            premultiplied=bool(command.get("premultiplied", False)),
+        )
+        self.frame_mailbox.mark_shown(command.get("frame"))
+        self.needs_present = True
 
-        def handle_withdraw(command, _request_id):
-            glfw.hide_window(window)
+    def release_frame_slots(self):
+        if self.display.upload_pending:
+            # Not drawn (e.g. minimized); the slots are still needed.
+            return
+        frame_rings = self.frame_rings
+        ring = frame_rings["current"]
+        if ring is not None and frame_rings["received"]:
+            ring.release(frame_rings["received"])
+        retired = frame_rings["retired"]
+        while retired:
+            try:
+                retired[-1].close()
+            except BufferError:
+                break
+            retired.pop()
 
-        def handle_deiconify(command, _request_id):
-            nonlocal needs_present
-            glfw.show_window(window)
-            needs_present = True
+    def handle_clipboard_set(self, command, _request_id):
+        self.clipboard_fallback = str(command.get("value", ""))
+        glfw.set_clipboard_string(self.window, self.clipboard_fallback)
 
-        def handle_iconbitmap(command, _request_id):
-            _set_windows_window_icon(hwnd, command.get("value"))
+    def handle_clipboard_get(self, command, request_id):
+        value = glfw.get_clipboard_string(self.window)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", errors="ignore")
+        if value is None:
+            value = self.clipboard_fallback
+        if request_id is None:
+            return
+        self.host.post(
+            {
+                "type": "response",
+                "window_id": self.window_id,
+                "request_id": request_id,
+                "value": value,
+            }
+        )
 
-        def handle_focus(command, _request_id):
-            glfw.focus_window(window)
+    def present(self):
+        glfw.make_context_current(self.window)
+        try:
+            self.display.draw()
+            self.release_frame_slots()
+            glfw.swap_buffers(self.window)
+            self.needs_present = False
+        except Exception:
+            traceback.print_exc()
+        finally:
+            # Ack even a failed draw, or the owner stays backlogged for good.
+            presented = self.frame_mailbox.take_presented()
+            if presented is not None:
+                self.host.outbox.append(
+                    {
+                        "type": "presented",
+                        "window_id": self.window_id,
+                        "frame": presented,
+                    }
+                )
 
-        def handle_frame(command, _request_id):
-            nonlocal needs_present
-            display.show_frame_bytes(
-                command.get("frame_rgba"),
-                int(command.get("width", width)),
-                int(command.get("height", height)),
-            )
-            needs_present = True
-
-        def handle_clipboard_set(command, _request_id):
-            nonlocal clipboard_fallback
-            clipboard_fallback = str(command.get("value", ""))
-            glfw.set_clipboard_string(window, clipboard_fallback)
-
-        def handle_clipboard_get(command, request_id):
-            value = glfw.get_clipboard_string(window)
-            if isinstance(value, bytes):
-                value = value.decode("utf-8", errors="ignore")
-            if value is None:
-                value = clipboard_fallback
-            send_response(request_id, value)
-
-        def handle_get_size(command, request_id):
-            width_now, height_now = glfw.get_window_size(window)
-            send_response(
-                request_id,
-                {
-                    "width": int(width_now),
-                    "height": int(height_now),
-                },
-            )
+    @property
+    def should_close(self):
+        if self.closing or glfw.window_should_close(self.window):
+            return True
+        return (
+            self.close_request_deadline is not None
+            and time.monotonic() >= self.close_request_deadline
+        )
 
-        command_handlers = {
-            "quit": handle_quit,
-            "close_request_handled": handle_close_request_handled,
-            "wake": handle_wake,
-            "geometry": handle_geometry,
-            "title": handle_title,
-            "resizable": handle_resizable,
-            "override": handle_override,
-            "withdraw": handle_withdraw,
-            "deiconify": handle_deiconify,
-            "iconbitmap": handle_iconbitmap,
-            "focus": handle_focus,
-            "frame": handle_frame,
-            "clipboard_set": handle_clipboard_set,
-            "clipboard_get": handle_clipboard_get,
-            "get_size": handle_get_size,
-        }
+    def close_rings(self):
+        frame_rings = self.frame_rings
+        for ring in frame_rings["retired"] + [frame_rings["current"]]:
+            if ring is None:
+                continue
+            try:
+                ring.close()
+            except BufferError:
+                pass
+        frame_rings["retired"] = []
+        frame_rings["current"] = None
 
-        while running and not glfw.window_should_close(window):
-            had_commands = False
-            while True:
-                try:
-                    message = command_queue.get_nowait()
-                except std_queue.Empty:
-                    break
-                had_commands = True
+    def destroy(self):
+        self.close_rings()
+        glfw.destroy_window(self.window)
+
+
+class _NativeWindowHost:
+    """Runs one GLFW event loop for any number of windows.
+
+    Commands are routed to windows by window_id and "open" messages add
+    windows. Every window shares one GL context group. A host opened for a
+    single window exits once it is closed; one opened with "shared" stays
+    up until its owner goes away.
+    """
+
+    def __init__(self, pending_commands, post_messages, waker):
+        self.pending_commands = pending_commands
+        self.post_messages = post_messages
+        self.waker = waker
+        self.windows = {}
+        # A hidden window created ahead of time by a standby host.
+        self.spare = None
+        self.keep_alive = False
+        self.had_window = False
+        self.running = True
+        # Messages raised by GLFW callbacks are buffered and flushed once per
+        # event pass, so bursts of motion or scroll collapse before they are
+        # posted.
+        self.outbox = []
+
+    def post(self, message):
+        self.post_messages([message])
+
+    def report_error(self, window_id, reason):
+        self.post({"type": "error", "window_id": window_id, "reason": str(reason)})
+
+    def share_window(self):
+        for hosted in self.windows.values():
+            return hosted.window
+        if self.spare is not None:
+            return self.spare.window
+        return None
 
-                if not isinstance(message, dict):
-                    continue
-                if message.get("window_id") != window_id:
-                    continue
-                command = message.get("command") or {}
-                op = command.get("op")
-                request_id = message.get("request_id")
-
-                handler = command_handlers.get(op)
-                if handler is not None:
-                    handler(command, request_id)
-
-            if needs_present:
-                glfw.poll_events()
-                try:
-                    display.draw()
-                    glfw.swap_buffers(window)
-                    needs_present = False
-                except Exception:
-                    traceback.print_exc()
-            elif not had_commands:
-                # Keep idle CPU low while avoiding frame-command wake latency.
-                # A short timeout prevents visible stutter when animation frames
-                # are submitted from the owner process while no GLFW events fire.
-                glfw.wait_events_timeout(0.002)
+    def flush_events(self):
+        if not self.outbox:
+            return
+        messages = coalesce_events(self.outbox)
+        self.outbox = []
+        self.post_messages(messages)
+
+    def open_window(self, message):
+        window_id = message.get("window_id")
+        self.keep_alive = self.keep_alive or bool(message.get("shared"))
+        try:
+            if self.spare is not None:
+                hosted, self.spare = self.spare, None
+                hosted.adopt(message)
             else:
-                glfw.poll_events()
-            if (
-                close_request_deadline is not None
-                and time.time() >= close_request_deadline
-            ):
-                running = False
-                glfw.set_window_should_close(window, True)
-    except Exception as exc:
-        report_startup_error(f"Native window process exception: {exc}")
-        traceback.print_exc()
-    finally:
+                hosted = _HostedWindow(
+                    self,
+                    window_id,
+                    message.get("width", _STANDBY_SIZE[0]),
+                    message.get("height", _STANDBY_SIZE[1]),
+                    message.get("title", "ntk"),
+                    tuple(message.get("resizable", (True, True))),
+                    bool(message.get("override", False)),
+                    visible=True,
+                )
+        except Exception as exc:
+            self.report_error(window_id, exc)
+            return
+        self.windows[window_id] = hosted
+        self.had_window = True
+        ready = hosted.size_message("ready")
+        ready["hwnd"] = int(hosted.hwnd or 0)
+        self.post(ready)
+
+    def close_window(self, hosted):
+        del self.windows[hosted.window_id]
         try:
-            event_queue.put({"type": "closed", "window_id": window_id})
-        except Exception:
-            pass
+            hosted.destroy()
+        finally:
+            self.post({"type": "closed", "window_id": hosted.window_id})
+
+    def drain_commands(self):
+        had_commands = False
+        while True:
+            try:
+                message = self.pending_commands.get_nowait()
+            except std_queue.Empty:
+                break
+            had_commands = True
+            if message is None:
+                # The owner side of the command queue is gone.
+                self.running = False
+                break
+            if not isinstance(message, dict):
+                continue
+            if message.get("type") == "open":
+                self.open_window(message)
+                continue
+            hosted = self.windows.get(message.get("window_id"))
+            if hosted is None:
+                continue
+            hosted.handle_command(
+                message.get("command") or {}, message.get("request_id")
+            )
+        for hosted in self.windows.values():
+            hosted.deliver_frames()
+        return had_commands
+
+    def wait(self, had_commands):
+        if any(hosted.needs_present for hosted in self.windows.values()):
+            glfw.poll_events()
+            for hosted in list(self.windows.values()):
+                if hosted.needs_present:
+                    hosted.present()
+            return
+        if had_commands:
+            glfw.poll_events()
+            return
+        deadlines = [
+            hosted.close_request_deadline
+            for hosted in self.windows.values()
+            if hosted.close_request_deadline is not None
+        ]
+        if deadlines:
+            glfw.wait_events_timeout(max(0.001, min(deadlines) - time.monotonic()))
+        else:
+            glfw.wait_events()
+
+    def run(self, first_window=None, spare_size=_STANDBY_SIZE):
+        window_id = first_window.get("window_id") if first_window else None
+        if glfw is None or GL is None:
+            self.report_error(
+                window_id, "OpenGL backend unavailable (glfw or OpenGL module missing)."
+            )
+            return
+        if not glfw.init():
+            self.report_error(window_id, "glfw.init() failed.")
+            return
+        self.waker.set_active(True)
         try:
-            glfw.terminate()
-        except Exception:
-            pass
+            if first_window is None:
+                # Everything slow happens now; "open" only has to show it.
+                self.spare = _HostedWindow(
+                    self,
+                    None,
+                    spare_size[0],
+                    spare_size[1],
+                    "ntk",
+                    (True, True),
+                    False,
+                    visible=False,
+                )
+            else:
+                self.open_window(first_window)
+                if not self.windows:
+                    # The error has been reported to the owner.
+                    return
+            while self.running:
+                had_commands = self.drain_commands()
+                if not self.running:
+                    break
+                self.wait(had_commands)
+                self.flush_events()
+                for hosted in list(self.windows.values()):
+                    if hosted.should_close:
+                        self.close_window(hosted)
+                if self.had_window and not self.windows and not self.keep_alive:
+                    break
+        except Exception as exc:
+            for closing_id in list(self.windows) or [window_id]:
+                self.report_error(closing_id, f"Native window process exception: {exc}")
+            traceback.print_exc()
+        finally:
+            self.waker.set_active(False)
+            self.flush_events()
+            for hosted in list(self.windows.values()):
+                hosted.close_rings()
+                self.post({"type": "closed", "window_id": hosted.window_id})
+            self.windows = {}
+            try:
+                glfw.terminate()
+            except Exception:
+                pass
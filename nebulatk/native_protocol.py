@@ -0,0 +1,224 @@
+"""Binary message encoding between NativeGLWindow and its GLFW process.
+
+Messages are the same dicts the window code has always exchanged, but the
+hot ones (pointer, button, key and scroll events, frame-ready and wake
+commands, presented-frame acknowledgements) are packed into fixed struct
+records. Anything else falls back to a pickled record. Several records can
+be concatenated and sent with one Connection.send_bytes() call.
+
+Every record starts with a kind byte and the target window id (uint64).
+"""
+
+import pickle
+import struct
+
+PICKLED = 0
+MOTION = 1
+BUTTON = 2
+SCROLL = 3
+KEY = 4
+FRAME = 5
+WAKE = 6
+PRESENTED = 7
+
+_HEADER = struct.Struct("<BQ")
+_LENGTH = struct.Struct("<I")
+_POINT = struct.Struct("<ii")
+_BUTTON = struct.Struct("<Bii")
+_SCROLL = struct.Struct("<iiiii")
+_KEY = struct.Struct("<BiiBB")
+_FRAME = struct.Struct("<IHQIIIBHQ")
+_RECT = struct.Struct("<iiii")
+_FRAME_ID = struct.Struct("<Q")
+
+_BUTTON_NAMES = ("<Button-1>", "<ButtonRelease-1>", "<Leave>")
+_BUTTON_CODES = {name: code for code, name in enumerate(_BUTTON_NAMES)}
+_KEY_NAMES = ("<Key>", "<KeyRelease>")
+_KEY_CODES = {name: code for code, name in enumerate(_KEY_NAMES)}
+
+# Field names of command frames sent through the shared frame ring.
+_FRAME_FIELDS = ("ring", "slot", "seq", "nbytes", "width", "height")
+
+
+def _event(window_id, name, x, y, **fields):
+    message = {"type": "event", "window_id": window_id, "name": name, "x": x, "y": y}
+    message.update(fields)
+    return message
+
+
+def _encode_event(window_id, message):
+    name = message.get("name")
+    x = int(message.get("x", 0))
+    y = int(message.get("y", 0))
+    if name == "<Motion>":
+        return _HEADER.pack(MOTION, window_id) + _POINT.pack(x, y)
+    if name in _BUTTON_CODES:
+        return _HEADER.pack(BUTTON, window_id) + _BUTTON.pack(
+            _BUTTON_CODES[name], x, y
+        )
+    if name == "<MouseWheel>":
+        return _HEADER.pack(SCROLL, window_id) + _SCROLL.pack(
+            x,
+            y,
+            int(message.get("delta", 0) or 0),
+            int(message.get("delta_x", 0) or 0),
+            int(message.get("delta_y", 0) or 0),
+        )
+    if name in _KEY_CODES:
+        keysym = str(message.get("keysym", "")).encode("utf-8")
+        char = str(message.get("char", "")).encode("utf-8")
+        if len(keysym) > 255 or len(char) > 255:
+            return None
+        return (
+            _HEADER.pack(KEY, window_id)
+            + _KEY.pack(_KEY_CODES[name], x, y, len(keysym), len(char))
+            + keysym
+            + char
+        )
+    return None
+
+
+def _encode_command(window_id, message):
+    if message.get("request_id") is not None:
+        return None
+    command = message.get("command") or {}
+    op = command.get("op")
+    if op == "wake" and len(command) == 1:
+        return _HEADER.pack(WAKE, window_id)
+    if op != "frame" or "frame_rgba" in command:
+        return None
+    if any(field not in command for field in _FRAME_FIELDS):
+        return None
+    rects = command.get("rects")
+    flags = 1 if command.get("premultiplied") else 0
+    if rects is not None:
+        flags |= 2
+    else:
+        rects = ()
+    if "frame" in command:
+        flags |= 4
+    parts = [
+        _HEADER.pack(FRAME, window_id),
+        _FRAME.pack(
+            int(command["ring"]),
+            int(command["slot"]),
+            int(command["seq"]),
+            int(command["nbytes"]),
+            int(command["width"]),
+            int(command["height"]),
+            flags,
+            len(rects),
+            int(command.get("frame", 0)),
+        ),
+    ]
+    parts.extend(_RECT.pack(*rect) for rect in rects)
+    return b"".join(parts)
+
+
+def encode(message):
+    """Encode one message dict as a record."""
+    window_id = message.get("window_id")
+    record = None
+    if isinstance(window_id, int) and 0 <= window_id < 1 << 64:
+        if message.get("type") == "event":
+            record = _encode_event(window_id, message)
+        elif message.get("type") == "presented":
+            record = _HEADER.pack(PRESENTED, window_id) + _FRAME_ID.pack(
+                int(message.get("frame", 0))
+            )
+        elif message.get("type") == "command":
+            record = _encode_command(window_id, message)
+    if record is not None:
+        return record
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(PICKLED, 0) + _LENGTH.pack(len(payload)) + payload
+
+
+def encode_batch(messages):
+    return b"".join(encode(message) for message in messages)
+
+
+def decode_batch(data):
+    """Decode concatenated records back into message dicts."""
+    data = memoryview(data)
+    messages = []
+    offset = 0
+    while offset < len(data):
+        kind, window_id = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        if kind == PICKLED:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            messages.append(pickle.loads(data[offset : offset + length]))
+            offset += length
+        elif kind == MOTION:
+            x, y = _POINT.unpack_from(data, offset)
+            offset += _POINT.size
+            messages.append(_event(window_id, "<Motion>", x, y))
+        elif kind == BUTTON:
+            code, x, y = _BUTTON.unpack_from(data, offset)
+            offset += _BUTTON.size
+            messages.append(_event(window_id, _BUTTON_NAMES[code], x, y))
+        elif kind == SCROLL:
+            x, y, delta, delta_x, delta_y = _SCROLL.unpack_from(data, offset)
+            offset += _SCROLL.size
+            messages.append(
+                _event(
+                    window_id,
+                    "<MouseWheel>",
+                    x,
+                    y,
+                    delta=delta,
+                    delta_x=delta_x,
+                    delta_y=delta_y,
+                )
+            )
+        elif kind == KEY:
+            code, x, y, keysym_length, char_length = _KEY.unpack_from(data, offset)
+            offset += _KEY.size
+            keysym = bytes(data[offset : offset + keysym_length]).decode("utf-8")
+            offset += keysym_length
+            char = bytes(data[offset : offset + char_length]).decode("utf-8")
+            offset += char_length
+            messages.append(
+                _event(window_id, _KEY_NAMES[code], x, y, keysym=keysym, char=char)
+            )
+        elif kind == FRAME:
+            ring, slot, seq, nbytes, width, height, flags, rect_count, frame_id = (
+                _FRAME.unpack_from(data, offset)
+            )
+            offset += _FRAME.size
+            command = {
+                "op": "frame",
+                "ring": ring,
+                "slot": slot,
+                "seq": seq,
+                "nbytes": nbytes,
+                "width": width,
+                "height": height,
+                "premultiplied": bool(flags & 1),
+            }
+            if flags & 4:
+                command["frame"] = frame_id
+            if flags & 2:
+                rects = []
+                for _ in range(rect_count):
+                    rects.append(_RECT.unpack_from(data, offset))
+                    offset += _RECT.size
+                command["rects"] = rects
+            messages.append(
+                {"type": "command", "window_id": window_id, "command": command}
+            )
+        elif kind == PRESENTED:
+            (frame_id,) = _FRAME_ID.unpack_from(data, offset)
+            offset += _FRAME_ID.size
+            messages.append(
+                {"type": "presented", "window_id": window_id, "frame": frame_id}
+            )
+        elif kind == WAKE:
+            messages.append(
+                {"type": "command", "window_id": window_id, "command": {"op": "wake"}}
+            )
+        else:
+            raise ValueError(f"Unknown native message kind {kind}")
+    return messages
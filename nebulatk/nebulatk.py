@@ -1,3 +1,4 @@
+import math
 import sys
 import threading
 import queue as std_queue
@@ -19,8 +20,10 @@ if __package__:
         defaults,
         animation_controller,
         taskbar_manager,
+        headless_window,
         native_gl_window,
         pil_image_renderer,
+        numpy_renderer,
         opengl_image_display,
         file_manager,
     )
@@ -40,8 +43,10 @@ else:
     import defaults
     import animation_controller
     import taskbar_manager
+    import headless_window
     import native_gl_window
     import pil_image_renderer
+    import numpy_renderer
     import opengl_image_display
     import file_manager
 
@@ -73,6 +78,12 @@ class _window_internal(threading.Thread, Component):
         fps=60,
         background_color="default",
         defaults_file=None,
+        render_threads=1,
+        renderer="pil",
+        backend="process",
+        compositor="cpu",
+        render_scale=1.0,
+        render_filter="linear",
     ):
         # Initialize the thread
         super().__init__()
@@ -99,6 +110,12 @@ class _window_internal(threading.Thread, Component):
         self.override = override
         self.render_mode = render_mode
         self.fps = fps
+        self.render_threads = render_threads
+        self.renderer_backend = renderer
+        self.window_backend = backend
+        self.compositor = compositor
+        self.render_scale = render_scale
+        self.render_filter = render_filter
         self.updates_all = (
             False  # Whether updates to members update the widget automatically
         )
@@ -146,6 +163,9 @@ class _window_internal(threading.Thread, Component):
         self._closing_command_called = False
         self._closing_lock = threading.Lock()
         self._redraw_needed = True
+        # Renders are armed on demand: at most one render tick is pending, and
+        # nothing is scheduled while the frame is clean.
+        self._render_scheduled = False
         self._resize_reflow_active = False
         self._resize_reference_window_size = (max(1, int(width)), max(1, int(height)))
         if self._background_color_bound_to_defaults:
@@ -380,13 +400,36 @@ class _window_internal(threading.Thread, Component):
         if not self._ui_queue.empty() and self.root is not None:
             self._signal_ui_queue()
 
-    def _mark_redraw_needed(self):
+    def _mark_redraw_needed(self, rects=None, widget=None):
         self._redraw_needed = True
         if self.renderer is not None and hasattr(self.renderer, "request_redraw"):
-            self.renderer.request_redraw()
+            self.renderer.request_redraw(rects, widget=widget)
+        self._schedule_render()
 
-    def request_redraw(self):
-        self._execute_in_window_thread(self._mark_redraw_needed, wait=False)
+    def request_redraw(self, rects=None, widget=None):
+        """Request a redraw of the given damaged screen rects (None == everything).
+
+        widget names the widget whose change caused the damage, if known.
+        """
+        self._execute_in_window_thread(
+            lambda: self._mark_redraw_needed(rects, widget), wait=False
+        )
+
+    def _mark_composite_needed(self, widget):
+        self._redraw_needed = True
+        if self.renderer is not None and hasattr(self.renderer, "request_composite"):
+            self.renderer.request_composite(widget)
+        self._schedule_render()
+
+    def request_composite(self, widget):
+        """Request a frame for a change to widget's compositor properties.
+
+        translate_x, translate_y, scale and opacity only change how the
+        widget's cached layer is composited, so nothing is re-rendered.
+        """
+        self._execute_in_window_thread(
+            lambda: self._mark_composite_needed(widget), wait=False
+        )
 
     def _iter_widgets(self, children=None):
         if children is None:
@@ -455,8 +498,7 @@ class _window_internal(threading.Thread, Component):
         self.canvas_width = width
         self.canvas_height = height
         if self.renderer is not None:
-            self.renderer.width = width
-            self.renderer.height = height
+            self.renderer.resize(width, height)
             if hasattr(self.renderer, "request_redraw"):
                 self.renderer.request_redraw()
         if self.display is not None and hasattr(self.display, "configure"):
@@ -519,18 +561,17 @@ class _window_internal(threading.Thread, Component):
         self._apply_resizable_widgets(width, height)
         self._mark_redraw_needed()
 
-    def _sync_window_size_from_native(self):
-        if self.root is None:
+    def _on_native_configure(self, event):
+        # The native process pushes its size on every change, so nothing
+        # has to ask it on the render path.
+        if event.width <= 0 or event.height <= 0:
             return
-        if not hasattr(self.root, "winfo_width") or not hasattr(
-            self.root, "winfo_height"
-        ):
-            return
-        width = int(self.root.winfo_width() or 0)
-        height = int(self.root.winfo_height() or 0)
-        if width <= 0 or height <= 0:
-            return
-        self._sync_resize_state(width, height)
+        self._sync_resize_state(event.width, event.height)
+
+    def _on_frame_presented(self, _event):
+        # Render ticks skipped while the native side was behind resume here.
+        if self.renderer is not None and self.renderer.redraw_pending:
+            self._schedule_render()
 
     # NOTE: Other methods
 
@@ -578,19 +619,36 @@ class _window_internal(threading.Thread, Component):
         try:
             self._window_thread_id = threading.get_ident()
             # Create window
-            self.root = native_gl_window.NativeGLWindow(
+            window_class = {
+                "process": native_gl_window.NativeGLWindow,
+                "inprocess": native_gl_window.InProcessGLWindow,
+                "shared": native_gl_window.SharedProcessGLWindow,
+                "headless": headless_window.HeadlessWindow,
+            }[self.window_backend]
+            self.root = window_class(
                 self.width,
                 self.height,
                 title=self.title,
                 resizable=self.resizable,
                 override=self.override,
             )
-            self.renderer = pil_image_renderer.PILImageRenderer(
-                self, self.canvas_width, self.canvas_height, fps=self.fps
+            renderer_class = pil_image_renderer.PILImageRenderer
+            if self.renderer_backend == "numpy":
+                renderer_class = numpy_renderer.NumpyRenderer
+            self.renderer = renderer_class(
+                self,
+                self.canvas_width,
+                self.canvas_height,
+                fps=self.fps,
+                render_threads=self.render_threads,
+                render_scale=self.render_scale,
             )
+            # Headless windows pace frames on their virtual clock.
+            self.renderer.clock = getattr(self.root, "clock", None)
             self.display = opengl_image_display.OpenGLImageDisplay(
                 self.root, self.canvas_width, self.canvas_height
             )
+            self.display.set_render_scale(self.render_scale, self.render_filter)
             self.root.set_draw_callback(self.display.draw)
             self.canvas = self.display.canvas
 
@@ -627,6 +685,8 @@ class _window_internal(threading.Thread, Component):
             self.root.protocol("WM_DELETE_WINDOW", close)
             self.bind("<Motion>", self.hover)
             self.bind("<Leave>", self.leave_window)
+            self.bind("<Configure>", self._on_native_configure)
+            self.bind("<<FramePresented>>", self._on_frame_presented)
 
             self.root.after(0, self._drain_ui_queue)
             self._render_tick()
@@ -637,6 +697,8 @@ class _window_internal(threading.Thread, Component):
             self.running = False
             self._startup_event.set()
         finally:
+            if self.renderer is not None:
+                self.renderer.close()
             self._startup_event.set()
             self._closed_event.set()
             self._invoke_closing_command_once()
@@ -667,6 +729,37 @@ class _window_internal(threading.Thread, Component):
 
         return self
 
+    def set_render_scale(self, render_scale, render_filter=None):
+        """Rasterize frames at render_scale times the logical canvas size.
+
+        Widgets, layout and input keep logical coordinates; the frame is
+        stretched back over the canvas when it is drawn.
+
+        Args:
+            render_scale (float): Frame pixels per logical pixel.
+            render_filter (str, optional): "linear" or "nearest" sampling of the stretched frame. If None, keeps the current filter.
+
+        Returns:
+            self: Returns self for method chaining
+        """
+        if render_filter is None:
+            render_filter = self.render_filter
+        render_scale = opengl_image_display.check_render_scale(
+            render_scale, render_filter
+        )
+
+        def _apply_render_scale():
+            self.render_scale = render_scale
+            self.render_filter = render_filter
+            if self.renderer is not None:
+                self.renderer.set_render_scale(render_scale)
+            if self.display is not None:
+                self.display.set_render_scale(render_scale, render_filter)
+
+        self._execute_in_window_thread(_apply_render_scale)
+
+        return self
+
     # Add show method similar to widget show
     def _show(self, root):
         """Show the window if it was previously hidden.
@@ -761,24 +854,53 @@ class _window_internal(threading.Thread, Component):
             self._execute_in_window_thread(self.root.update)
         return self
 
-    def _render_tick(self):
-        if self.renderer is None or self.root is None:
+    def _schedule_render(self):
+        """Arm a render tick for the next frame deadline, unless one is pending."""
+        if self._render_scheduled or self.renderer is None or self.root is None:
             return
-        self._sync_window_size_from_native()
         if self._render_batch_depth > 0:
-            self.root.after(max(1, int(1000 / max(1, self.fps))), self._render_tick)
+            # end_render_batch arms the tick once the batch is complete.
             return
-        frame = self.renderer.render_if_due()
-        if frame is not None:
-            self.display.show_frame(frame)
-            self._redraw_needed = False
-        self.root.after(max(1, int(1000 / max(1, self.fps))), self._render_tick)
+        delay = self.renderer.next_frame_delay()
+        self._render_scheduled = True
+        self.root.after(int(math.ceil(delay * 1000)), self._render_tick)
+
+    def _render_tick(self):
+        # Redraws requested while this tick runs are picked up below rather
+        # than arming a second tick.
+        try:
+            if self.renderer is None or self.root is None:
+                return
+            if self._render_batch_depth > 0:
+                return
+            if self.root.frame_backlogged:
+                # Rendering faster than frames are shown only drops frames;
+                # <<FramePresented>> re-arms the tick.
+                return
+            if self.compositor == "gpu":
+                scene = self.renderer.compose_if_due()
+                if scene is not None:
+                    self.display.show_scene(scene)
+                    self._redraw_needed = False
+            else:
+                frame = self.renderer.render_if_due()
+                if frame is not None:
+                    self.display.show_frame(frame, rects=self.renderer.last_damage)
+                    self._redraw_needed = False
+        finally:
+            self._render_scheduled = False
+        if self.renderer is not None and self.renderer.redraw_pending:
+            # Either the frame was not due yet or more damage arrived while
+            # rendering; otherwise go idle until the next redraw request.
+            self._schedule_render()
 
     def begin_render_batch(self):
         self._render_batch_depth += 1
 
     def end_render_batch(self):
         self._render_batch_depth = max(0, self._render_batch_depth - 1)
+        if self._render_batch_depth == 0 and self._redraw_needed:
+            self._schedule_render()
 
 
 def Window(
@@ -794,6 +916,12 @@ def Window(
     fps=60,
     background_color="default",
     defaults_file=None,
+    render_threads=1,
+    renderer="pil",
+    backend="process",
+    compositor="cpu",
+    render_scale=1.0,
+    render_filter="linear",
     **kwargs,
 ):
     """Window constructor
@@ -807,6 +935,12 @@ def Window(
         closing_command (function, optional): Command to execute on close. Defaults to sys.exit.
         resizable (iterable or boolean, optional): Controls whether the window is resizable on the X axis, then Y axis
         background_color (str, optional): Window background color. Defaults to "default".
+        render_threads (int, optional): Threads used to rasterize frames. Above 1, frames are split into tiles rendered in parallel. Defaults to 1.
+        renderer (str, optional): Rasterizer backend, "pil" or "numpy" (premultiplied NumPy framebuffer, requires numpy). Defaults to "pil".
+        backend (str, optional): Native window host, "process" (GLFW in a child process) or "inprocess" (GLFW on a thread of this process; one window at a time, not on macOS) or "shared" (one child process hosting every "shared" window) or "headless" (offscreen and in-process with no GLFW or GL; timers run on a virtual clock at full speed and frames are kept in window.root.frame). Defaults to "process".
+        compositor (str, optional): Where widget layers are combined, "cpu" (frames are painted by the renderer and uploaded whole or by damaged rects) or "gpu" (each cached widget bitmap is a GL texture and frames are drawn as batched textured quads). Defaults to "cpu".
+        render_scale (float, optional): Frame pixels per logical pixel. Below 1 rasterizes less (0.5 is a quarter of the pixels) and the frame is stretched to the window; on a HiDPI screen, its content scale (e.g. 2.0) renders at native resolution. Layout and input stay in logical coordinates. Defaults to 1.0.
+        render_filter (str, optional): How the frame is sampled when stretched to the window, "linear" or "nearest". Defaults to "linear".
 
     Returns:
         _type_: _description_
@@ -825,6 +959,22 @@ def Window(
             "Non-image_gl render modes are no longer supported."
         )
 
+    if renderer not in ("pil", "numpy"):
+        raise ValueError(f"Unknown renderer {renderer!r}; expected 'pil' or 'numpy'.")
+    if renderer == "numpy" and not numpy_renderer.available():
+        raise RuntimeError("NumPy renderer unavailable. Install numpy.")
+
+    if backend not in ("process", "inprocess", "shared", "headless"):
+        raise ValueError(
+            f"Unknown backend {backend!r}; expected 'process', 'inprocess', "
+            "'shared' or 'headless'."
+        )
+
+    if compositor not in ("cpu", "gpu"):
+        raise ValueError(f"Unknown compositor {compositor!r}; expected 'cpu' or 'gpu'.")
+
+    render_scale = opengl_image_display.check_render_scale(render_scale, render_filter)
+
     if title is None:
         title = "ntk"
 
@@ -841,6 +991,12 @@ def Window(
         fps,
         background_color,
         defaults_file,
+        render_threads,
+        renderer,
+        backend,
+        compositor,
+        render_scale,
+        render_filter,
     )
 
     # Start window thread
@@ -878,6 +1034,20 @@ def Window(
     return canvas
 
 
+def prewarm(n=1):
+    """Start standby native window processes so later windows open faster.
+
+    Each standby has imported GLFW and OpenGL and created a hidden window; a
+    Window() created afterwards (with the default "process" backend) claims
+    one instead of spawning a fresh interpreter. Claimed standbys are not
+    replaced; call prewarm() again to refill.
+
+    Args:
+        n (int, optional): Number of standby processes to keep. Defaults to 1.
+    """
+    native_gl_window.prewarm(n)
+
+
 fonts = [
     "Algerian",
     "Blackadder ITC",
@@ -0,0 +1,325 @@
+"""NumPy renderer backend.
+
+Keeps the framebuffer, layers and cached widget bodies as premultiplied RGBA
+arrays of shape (height, width, 4). Fills, borders and compositing are done
+with array slicing; Pillow is only used to rasterize glyphs.
+"""
+
+import sys
+
+from PIL import Image as PILImage
+from PIL import ImageColor, ImageDraw
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from . import fonts_manager, pil_image_renderer
+except ImportError:
+    import fonts_manager
+    import pil_image_renderer
+
+
+# Bit offset of the alpha byte within a pixel read as a native uint32.
+_ALPHA_SHIFT = 24 if sys.byteorder == "little" else 0
+
+
+def available():
+    return np is not None
+
+
+def _rgba(color):
+    if isinstance(color, (tuple, list)):
+        if len(color) == 4:
+            return tuple(int(value) for value in color)
+        if len(color) == 3:
+            return tuple(int(value) for value in color) + (255,)
+    return ImageColor.getcolor(str(color), "RGBA")
+
+
+def _premultiplied_color(color):
+    red, green, blue, alpha = _rgba(color)
+    return np.array(
+        [
+            (red * alpha + 127) // 255,
+            (green * alpha + 127) // 255,
+            (blue * alpha + 127) // 255,
+            alpha,
+        ],
+        dtype=np.uint8,
+    )
+
+
+def _div255(values):
+    """Divide a uint16 array of products by 255, rounding to nearest, in place."""
+    values += 128
+    values += values >> 8
+    values >>= 8
+    return values
+
+
+def premultiply(pixels):
+    """Return a premultiplied copy of a straight-alpha (h, w, 4) uint8 array."""
+    result = pixels.astype(np.uint16)
+    result[..., :3] *= result[..., 3:4]
+    _div255(result[..., :3])
+    return result.astype(np.uint8)
+
+
+def unpremultiply(pixels):
+    """Return a straight-alpha copy of a premultiplied (h, w, 4) uint8 array."""
+    result = pixels.astype(np.uint32)
+    alpha = result[..., 3:4]
+    safe_alpha = np.maximum(alpha, 1)
+    result[..., :3] = (result[..., :3] * 255 + safe_alpha // 2) // safe_alpha
+    result[..., :3] = np.where(alpha == 0, 0, np.minimum(result[..., :3], 255))
+    return result.astype(np.uint8)
+
+
+def frame_to_image(pixels):
+    """Convert a premultiplied frame array to a straight-alpha PIL image."""
+    return PILImage.fromarray(unpremultiply(pixels), "RGBA")
+
+
+def image_to_array(image):
+    """Convert a PIL image to a premultiplied RGBA array."""
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    return premultiply(np.asarray(image))
+
+
+def _coverage(source):
+    """255 - alpha of every source pixel, repeated across its four channels."""
+    alpha = (source.view(np.uint32)[..., 0] >> _ALPHA_SHIFT) & 0xFF
+    # Spreading one byte over a uint32 is much cheaper than broadcasting.
+    coverage = (255 - alpha) * 0x01010101
+    return coverage.view(np.uint8).reshape(source.shape)
+
+
+def blend_over(destination, source):
+    """Composite premultiplied source over destination (same shape), in place."""
+    blended = np.multiply(destination, _coverage(source), dtype=np.uint16)
+    _div255(blended)
+    blended += source
+    destination[...] = blended
+
+
+class ArraySurfacePool(pil_image_renderer.SurfacePool):
+    """SurfacePool of zeroed (height, width, 4) uint8 arrays."""
+
+    premultiplied = True
+
+    def new_surface(self, size):
+        return np.zeros((int(size[1]), int(size[0]), 4), dtype=np.uint8)
+
+    def clear_surface(self, surface):
+        surface.fill(0)
+
+    def surface_size(self, surface):
+        return surface.shape[1], surface.shape[0]
+
+    def surface_bytes(self, surface):
+        return surface.tobytes()
+
+
+class NumpyRenderer(pil_image_renderer.PILImageRenderer):
+    """PILImageRenderer that draws into premultiplied NumPy arrays.
+
+    Frames returned by render_if_due are (height, width, 4) uint8 arrays; use
+    frame_to_image to inspect one as a PIL image.
+    """
+
+    surface_pool_class = ArraySurfacePool
+
+    def __init__(
+        self, window, width, height, fps=60, render_threads=1, render_scale=1.0
+    ):
+        if np is None:
+            raise RuntimeError("NumPy renderer unavailable. Install numpy.")
+        super().__init__(
+            window,
+            width,
+            height,
+            fps=fps,
+            render_threads=render_threads,
+            render_scale=render_scale,
+        )
+
+    def _paste_surface(self, frame, surface, dest_x, dest_y):
+        height, width = surface.shape[:2]
+        frame[dest_y : dest_y + height, dest_x : dest_x + width] = surface
+
+    def _composite_layer(self, frame, layer, dest_x, dest_y):
+        self._composite_image(frame, layer, dest_x, dest_y)
+
+    def _is_blank(self, surface):
+        return not surface[..., 3].any()
+
+    def _composite_image(
+        self, frame, source, dest_x, dest_y, clip_rect=None, opaque=False, opacity=1.0
+    ):
+        if source is None:
+            return
+        source_height, source_width = source.shape[:2]
+        frame_height, frame_width = frame.shape[:2]
+        dest_x = int(dest_x)
+        dest_y = int(dest_y)
+
+        clip_left, clip_top = 0, 0
+        clip_right, clip_bottom = frame_width, frame_height
+        if clip_rect is not None:
+            clip_left = max(clip_left, int(clip_rect[0]))
+            clip_top = max(clip_top, int(clip_rect[1]))
+            clip_right = min(clip_right, int(clip_rect[2]))
+            clip_bottom = min(clip_bottom, int(clip_rect[3]))
+
+        draw_left = max(dest_x, clip_left)
+        draw_top = max(dest_y, clip_top)
+        draw_right = min(dest_x + source_width, clip_right)
+        draw_bottom = min(dest_y + source_height, clip_bottom)
+        if draw_right <= draw_left or draw_bottom <= draw_top:
+            return
+
+        target = frame[draw_top:draw_bottom, draw_left:draw_right]
+        part = source[
+            draw_top - dest_y : draw_bottom - dest_y,
+            draw_left - dest_x : draw_right - dest_x,
+        ]
+        if opacity < 1.0:
+            # Premultiplied, so fading scales every channel.
+            part = np.multiply(part, int(opacity * 255 + 0.5), dtype=np.uint16)
+            part = _div255(part).astype(np.uint8)
+            opaque = False
+        if opaque:
+            target[...] = part
+        else:
+            blend_over(target, part)
+
+    def _scaled(self, surface, size):
+        """A copy of surface resampled to size with bilinear filtering."""
+        height, width = surface.shape[:2]
+        image = PILImage.frombuffer("RGBa", (width, height), surface.tobytes())
+        return np.array(image.resize(size, PILImage.BILINEAR), dtype=np.uint8)
+
+    def _draw_text(self, surface, position, text, fill, text_font, anchor):
+        """Rasterize glyphs with Pillow and composite them onto surface."""
+        extents = self._text_extents(text, text_font, position, anchor)
+        height, width = surface.shape[:2]
+        if extents is None:
+            region = (0, 0, width, height)
+        else:
+            region = (
+                max(0, extents[0]),
+                max(0, extents[1]),
+                min(width, extents[2]),
+                min(height, extents[3]),
+            )
+            if region[2] <= region[0] or region[3] <= region[1]:
+                return
+        left, top, right, bottom = region
+        glyphs = PILImage.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+        ImageDraw.Draw(glyphs, "RGBA").text(
+            (position[0] - left, position[1] - top),
+            text,
+            fill=fill,
+            font=text_font,
+            anchor=anchor,
+        )
+        blend_over(surface[top:bottom, left:right], image_to_array(glyphs))
+
+    def _rasterize_widget_body(self, key, image):
+        """Render a widget body into its own premultiplied array."""
+        (
+            width,
+            height,
+            border_width,
+            outline,
+            fill,
+            _image_id,
+            text,
+            font_spec,
+            justify,
+            text_fill,
+        ) = key
+
+        extents = []
+        draw_rect = (
+            width > 0
+            and height > 0
+            and (fill is not None or (outline is not None and border_width > 0))
+        )
+        if draw_rect:
+            # Match PIL rectangles, which include their right/bottom edge.
+            extents.append((0, 0, width + 1, height + 1))
+
+        pixels = None
+        if image is not None:
+            pixels = image_to_array(image)
+            extents.append(
+                (
+                    border_width,
+                    border_width,
+                    border_width + pixels.shape[1],
+                    border_width + pixels.shape[0],
+                )
+            )
+
+        text_font = None
+        if font_spec is not None:
+            text_font = fonts_manager.resolve_draw_font(font_spec)
+            text_x, anchor = self._text_anchor(justify, width)
+            text_y = height / 2
+            text_extents = self._text_extents(
+                text, text_font, (text_x, text_y), anchor
+            )
+            # Unmeasurable fonts are clipped to the widget rect.
+            extents.append(text_extents or (0, 0, width + 1, height + 1))
+
+        if not extents:
+            return None
+        left = min(rect[0] for rect in extents)
+        top = min(rect[1] for rect in extents)
+        right = max(rect[2] for rect in extents)
+        bottom = max(rect[3] for rect in extents)
+        if right <= left or bottom <= top:
+            return None
+
+        surface = np.zeros((bottom - top, right - left, 4), dtype=np.uint8)
+        origin_x = -left
+        origin_y = -top
+        if draw_rect:
+            body = surface[
+                origin_y : origin_y + height + 1,
+                origin_x : origin_x + width + 1,
+            ]
+            if fill is not None:
+                body[...] = _premultiplied_color(fill)
+            if outline is not None and border_width > 0 and outline != fill:
+                # The outline replaces the fill along the edges, like PIL's.
+                color = _premultiplied_color(outline)
+                edge = min(border_width, height + 1)
+                body[:edge] = color
+                body[height + 1 - edge :] = color
+                edge = min(border_width, width + 1)
+                body[:, :edge] = color
+                body[:, width + 1 - edge :] = color
+        if pixels is not None:
+            self._composite_image(
+                surface, pixels, origin_x + border_width, origin_y + border_width
+            )
+        if text_font is not None:
+            self._draw_text(
+                surface,
+                (origin_x + text_x, origin_y + text_y),
+                text,
+                text_fill,
+                text_font,
+                anchor,
+            )
+        opaque = bool(surface[..., 3].min() == 255)
+        # Keep the source image alive so its id() in the key cannot be reused.
+        return pil_image_renderer.WidgetRaster(
+            surface, left, top, image, opaque
+        )
@@ -1,4 +1,12 @@
 import ctypes
+import logging
+import re
+from array import array
+
+try:
+    from . import texture_atlas
+except ImportError:
+    import texture_atlas
 
 try:
     import glfw
@@ -7,6 +15,7 @@ except Exception:
     glfw = None
     GL = None
 
+logger = logging.getLogger(__name__)
 
 VERTEX_SRC_330 = """
 #version 330 core
@@ -49,9 +58,296 @@ void main() {
 }
 """
 
+COMPOSITE_VERTEX_SRC_330 = """
+#version 330 core
+layout (location = 0) in vec2 a_pos;
+layout (location = 1) in vec2 a_uv;
+layout (location = 2) in float a_opacity;
+out vec2 v_uv;
+out float v_opacity;
+void main() {
+    v_uv = a_uv;
+    v_opacity = a_opacity;
+    gl_Position = vec4(a_pos, 0.0, 1.0);
+}
+"""
+
+COMPOSITE_FRAGMENT_SRC_330 = """
+#version 330 core
+in vec2 v_uv;
+in float v_opacity;
+out vec4 FragColor;
+uniform sampler2D u_texture;
+uniform float u_premultiplied;
+void main() {
+    vec4 color = texture(u_texture, v_uv);
+    FragColor = mix(
+        vec4(color.rgb, color.a * v_opacity), color * v_opacity, u_premultiplied
+    );
+}
+"""
+
+COMPOSITE_VERTEX_SRC_120 = """
+#version 120
+attribute vec2 a_pos;
+attribute vec2 a_uv;
+attribute float a_opacity;
+varying vec2 v_uv;
+varying float v_opacity;
+void main() {
+    v_uv = a_uv;
+    v_opacity = a_opacity;
+    gl_Position = vec4(a_pos, 0.0, 1.0);
+}
+"""
+
+COMPOSITE_FRAGMENT_SRC_120 = """
+#version 120
+varying vec2 v_uv;
+varying float v_opacity;
+uniform sampler2D u_texture;
+uniform float u_premultiplied;
+void main() {
+    vec4 color = texture2D(u_texture, v_uv);
+    gl_FragColor = mix(
+        vec4(color.rgb, color.a * v_opacity), color * v_opacity, u_premultiplied
+    );
+}
+"""
+
+# Floats per compositor vertex: position, texture coordinates and opacity.
+COMPOSITE_VERTEX_FLOATS = 5
+
+# Damaged rects covering more than this share of the frame are sent whole.
+PARTIAL_UPLOAD_MAX_RATIO = 0.5
+# Pixel unpack buffers cycled through for texture uploads; 0 disables them.
+PIXEL_BUFFER_COUNT = 3
+# Filters a frame rendered at another scale can be stretched to the
+# framebuffer with.
+RENDER_FILTERS = ("linear", "nearest")
+
+
+def check_render_scale(render_scale, render_filter="linear"):
+    """Validate a render scale and filter, returning the scale as a float."""
+    render_scale = float(render_scale)
+    if not render_scale > 0.0:
+        raise ValueError(f"render_scale must be positive, not {render_scale!r}.")
+    if render_filter not in RENDER_FILTERS:
+        raise ValueError(
+            f"Unknown render_filter {render_filter!r}; expected 'linear' or 'nearest'."
+        )
+    return render_scale
+
+
+def _pixel_buffers_supported():
+    """Whether the current context has pixel buffer objects.
+
+    They are core from OpenGL 2.1 and otherwise need ARB_pixel_buffer_object.
+    """
+    if not bool(GL.glMapBuffer):
+        return False
+    version = GL.glGetString(GL.GL_VERSION) or b""
+    if isinstance(version, bytes):
+        version = version.decode("ascii", errors="ignore")
+    match = re.search(r"(\d+)\.(\d+)", version)
+    if match and (int(match.group(1)), int(match.group(2))) >= (2, 1):
+        return True
+    extensions = GL.glGetString(GL.GL_EXTENSIONS) or b""
+    if isinstance(extensions, bytes):
+        extensions = extensions.decode("ascii", errors="ignore")
+    return "GL_ARB_pixel_buffer_object" in extensions.split()
+
+
+class PixelUploadBuffers:
+    """Round-robin GL_PIXEL_UNPACK_BUFFER objects for texture uploads.
+
+    Pixels are copied into a freshly orphaned buffer and glTexSubImage2D reads
+    from it instead of client memory, so the call returns at once and the
+    driver transfers the data while earlier frames draw. Cycling buffers keeps
+    a new copy from waiting on a transfer still in flight.
+    """
+
+    def __init__(self, count=PIXEL_BUFFER_COUNT):
+        count = max(2, int(count))
+        buffers = GL.glGenBuffers(count)
+        self._buffers = [int(buffer_id) for buffer_id in buffers]
+        self._next = 0
+
+    def upload(self, uploads):
+        """Upload (rect, pixels) pairs to the bound 2D texture.
+
+        Returns:
+            bool: False when the buffer could not be mapped or lost its
+                contents; nothing was uploaded then.
+        """
+        views = [memoryview(pixels).cast("B") for _, pixels in uploads]
+        total = sum(view.nbytes for view in views)
+        if total == 0:
+            return True
+        buffer_id = self._buffers[self._next]
+        self._next = (self._next + 1) % len(self._buffers)
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, buffer_id)
+        try:
+            # Orphaning the old storage lets the map proceed without a sync.
+            GL.glBufferData(GL.GL_PIXEL_UNPACK_BUFFER, total, None, GL.GL_STREAM_DRAW)
+            address = GL.glMapBuffer(GL.GL_PIXEL_UNPACK_BUFFER, GL.GL_WRITE_ONLY)
+            if not address:
+                return False
+            mapped = memoryview(
+                (ctypes.c_char * total).from_address(int(address))
+            ).cast("B")
+            offset = 0
+            for view in views:
+                mapped[offset : offset + view.nbytes] = view
+                offset += view.nbytes
+            mapped.release()
+            if not GL.glUnmapBuffer(GL.GL_PIXEL_UNPACK_BUFFER):
+                return False
+            offset = 0
+            for ((left, top, right, bottom), _), view in zip(uploads, views):
+                GL.glTexSubImage2D(
+                    GL.GL_TEXTURE_2D,
+                    0,
+                    left,
+                    top,
+                    right - left,
+                    bottom - top,
+                    GL.GL_RGBA,
+                    GL.GL_UNSIGNED_BYTE,
+                    ctypes.c_void_p(offset),
+                )
+                offset += view.nbytes
+            return True
+        finally:
+            GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+
+
+def _set_texture_filter(render_filter):
+    """Sample the bound texture with a RENDER_FILTERS filter."""
+    mode = GL.GL_NEAREST if render_filter == "nearest" else GL.GL_LINEAR
+    GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, mode)
+    GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, mode)
+
+
+def _new_texture(render_filter="linear"):
+    """Create a clamped, filtered 2D texture and leave it bound."""
+    texture = GL.glGenTextures(1)
+    GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+    _set_texture_filter(render_filter)
+    GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE)
+    GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
+    return texture
+
+
+class AtlasPages:
+    """GL textures behind the pages of a texture_atlas.TextureAtlas.
+
+    upload is a callable taking (rect, pixels) pairs for the bound texture.
+    """
+
+    def __init__(self, upload, render_filter="linear"):
+        self._upload = upload
+        self.render_filter = render_filter
+
+    def create_page(self, width, height):
+        texture = _new_texture(self.render_filter)
+        GL.glTexImage2D(
+            GL.GL_TEXTURE_2D,
+            0,
+            GL.GL_RGBA,
+            width,
+            height,
+            0,
+            GL.GL_RGBA,
+            GL.GL_UNSIGNED_BYTE,
+            None,
+        )
+        return texture
+
+    def upload(self, page, uploads):
+        GL.glBindTexture(GL.GL_TEXTURE_2D, page)
+        self._upload(uploads)
+
+    def delete_page(self, page):
+        GL.glDeleteTextures([page])
+
+
+class _LayerRegions:
+    """Looks up the current atlas region of a compositor layer id."""
+
+    def __init__(self, layer_keys, atlas):
+        self._layer_keys = layer_keys
+        self._atlas = atlas
+
+    def get(self, layer_id):
+        key = self._layer_keys.get(layer_id)
+        return None if key is None else self._atlas.region(key)
+
+
+def _scene_batches(quads, regions, width, height):
+    """Triangles for a compositor scene, grouped into per-texture draws.
+
+    regions.get() maps layer ids to (texture, u0, v0, u1, v1). Each quad is
+    cut to its clip on the CPU, so one draw call can cover quads with any
+    clip, and consecutive quads on one atlas page share it.
+
+    Returns:
+        tuple: (vertices, batches) where vertices is an array of
+            COMPOSITE_VERTEX_FLOATS floats per vertex and batches lists
+            (texture, first_vertex, vertex_count) in drawing order.
+    """
+    vertices = array("f")
+    batches = []
+    scale_x = 2.0 / max(1, width)
+    scale_y = 2.0 / max(1, height)
+    for layer, x, y, quad_width, quad_height, clip, opacity in quads:
+        region = regions.get(layer)
+        if region is None or quad_width <= 0 or quad_height <= 0:
+            continue
+        left = max(x, clip[0])
+        top = max(y, clip[1])
+        right = min(x + quad_width, clip[2])
+        bottom = min(y + quad_height, clip[3])
+        if right <= left or bottom <= top:
+            continue
+        texture, u0, v0, u1, v1 = region
+        step_u = (u1 - u0) / quad_width
+        step_v = (v1 - v0) / quad_height
+        u_left = u0 + (left - x) * step_u
+        u_right = u0 + (right - x) * step_u
+        v_top = v0 + (top - y) * step_v
+        v_bottom = v0 + (bottom - y) * step_v
+        x_left = left * scale_x - 1.0
+        x_right = right * scale_x - 1.0
+        y_top = 1.0 - top * scale_y
+        y_bottom = 1.0 - bottom * scale_y
+        corners = (
+            (x_left, y_top, u_left, v_top, opacity),
+            (x_right, y_top, u_right, v_top, opacity),
+            (x_left, y_bottom, u_left, v_bottom, opacity),
+            (x_right, y_bottom, u_right, v_bottom, opacity),
+        )
+        for corner in (0, 1, 2, 1, 3, 2):
+            vertices.extend(corners[corner])
+        if batches and batches[-1][0] == texture:
+            batches[-1][2] += 6
+        else:
+            first = len(vertices) // COMPOSITE_VERTEX_FLOATS - 6
+            batches.append([texture, first, 6])
+    return vertices, [tuple(batch) for batch in batches]
+
+
+def _pack_rects(frame, rects):
+    """Concatenate the RGBA pixels of each (left, top, right, bottom) rect."""
+    if hasattr(frame, "crop"):
+        return b"".join(frame.crop(rect).tobytes("raw", "RGBA") for rect in rects)
+    return b"".join(
+        frame[top:bottom, left:right].tobytes() for left, top, right, bottom in rects
+    )
+
 
 class OpenGLImageDisplay:
-    def __init__(self, root, width, height):
+    def __init__(self, root, width, height, pixel_buffers=PIXEL_BUFFER_COUNT):
         self._proxy_mode = hasattr(root, "submit_frame")
         self._enabled = glfw is not None and GL is not None
         self._texture_id = None
@@ -62,8 +358,34 @@ class OpenGLImageDisplay:
         self._uv_loc = -1
         self._sampler_loc = -1
         self._frame_rgba = None
+        self._premultiplied = False
         self._needs_texture_upload = False
+        # (rect, pixels) sub-image uploads applied after any full upload.
+        self._dirty_uploads = []
+        # Size of the last full frame handed on; partial updates need one.
+        self._full_frame_size = None
         self._texture_size = (0, 0)
+        self._pixel_buffer_count = int(pixel_buffers)
+        # PixelUploadBuffers, or None to upload from client memory.
+        self._pixel_buffers = None
+        # Compositor mode: the quads of the current scene (None while showing
+        # whole frames), layers waiting for their atlas region, layers to
+        # free, and the atlas content key of every placed layer.
+        self._scene_quads = None
+        self._pending_layers = []
+        self._released_layers = []
+        self._layer_keys = {}
+        self._atlas = None
+        self._composite_program = None
+        self._composite_vbo = None
+        self._composite_locs = (-1, -1, -1)
+        self._composite_sampler_loc = -1
+        self._composite_premultiplied_loc = -1
+        # Frames hold render_scale pixels per logical pixel; render_filter
+        # samples them when they are stretched over the canvas.
+        self.render_scale = 1.0
+        self.render_filter = "linear"
+        self._texture_filter = "linear"
         self.width = int(width)
         self.height = int(height)
         self.root = root
@@ -81,14 +403,17 @@ class OpenGLImageDisplay:
         GL.glDisable(GL.GL_DEPTH_TEST)
         GL.glEnable(GL.GL_BLEND)
         GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
-        self._texture_id = GL.glGenTextures(1)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture_id)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
+        self._texture_id = _new_texture()
         self._program_id = self._build_program()
+        self._pos_loc = GL.glGetAttribLocation(self._program_id, "a_pos")
+        self._uv_loc = GL.glGetAttribLocation(self._program_id, "a_uv")
+        self._sampler_loc = GL.glGetUniformLocation(self._program_id, "u_texture")
         self._setup_fullscreen_quad()
+        if self._pixel_buffer_count > 0 and _pixel_buffers_supported():
+            try:
+                self._pixel_buffers = PixelUploadBuffers(self._pixel_buffer_count)
+            except Exception:
+                logger.exception("Pixel buffer objects unavailable; uploading directly.")
 
     def _compile_shader(self, shader_type, source):
         shader = GL.glCreateShader(shader_type)
@@ -100,11 +425,16 @@ class OpenGLImageDisplay:
             raise RuntimeError(f"OpenGL shader compile failed: {log}")
         return shader
 
-    def _build_program(self):
-        variants = [
-            (VERTEX_SRC_330, FRAGMENT_SRC_330, True),
-            (VERTEX_SRC_120, FRAGMENT_SRC_120, False),
-        ]
+    def _build_program(self, variants=None, attributes=("a_pos", "a_uv")):
+        """Link the first shader variant the driver accepts.
+
+        Without explicit locations, attributes are bound in the given order.
+        """
+        if variants is None:
+            variants = [
+                (VERTEX_SRC_330, FRAGMENT_SRC_330, True),
+                (VERTEX_SRC_120, FRAGMENT_SRC_120, False),
+            ]
         last_error = None
 
         for vertex_src, fragment_src, explicit_locations in variants:
@@ -118,17 +448,14 @@ class OpenGLImageDisplay:
                 GL.glAttachShader(program, vertex)
                 GL.glAttachShader(program, fragment)
                 if not explicit_locations:
-                    GL.glBindAttribLocation(program, 0, "a_pos")
-                    GL.glBindAttribLocation(program, 1, "a_uv")
+                    for location, name in enumerate(attributes):
+                        GL.glBindAttribLocation(program, location, name)
                 GL.glLinkProgram(program)
                 if GL.glGetProgramiv(program, GL.GL_LINK_STATUS) != GL.GL_TRUE:
                     log = GL.glGetProgramInfoLog(program)
                     raise RuntimeError(f"OpenGL program link failed: {log}")
                 GL.glDeleteShader(vertex)
                 GL.glDeleteShader(fragment)
-                self._pos_loc = GL.glGetAttribLocation(program, "a_pos")
-                self._uv_loc = GL.glGetAttribLocation(program, "a_uv")
-                self._sampler_loc = GL.glGetUniformLocation(program, "u_texture")
                 return program
             except Exception as exc:
                 last_error = exc
@@ -222,21 +549,167 @@ class OpenGLImageDisplay:
         if self._uv_loc >= 0:
             GL.glDisableVertexAttribArray(self._uv_loc)
 
-    def show_frame(self, frame):
-        rgba = frame.convert("RGBA")
-        self.width, self.height = rgba.size
-        frame_rgba = rgba.tobytes("raw", "RGBA")
+    def show_frame(self, frame, rects=None):
+        """Show a rendered frame.
+
+        Args:
+            frame: A PIL image, or a premultiplied (height, width, 4) array
+                from NumpyRenderer.
+            rects (list, optional): The (left, top, right, bottom) rects that
+                changed since the previous frame. Only those pixels are sent
+                and uploaded. Defaults to None, which sends the whole frame.
+        """
+        premultiplied = not hasattr(frame, "convert")
+        if premultiplied:
+            size = (int(frame.shape[1]), int(frame.shape[0]))
+        else:
+            if frame.mode != "RGBA":
+                frame = frame.convert("RGBA")
+            size = frame.size
+        if rects and self._can_send_partial(size, rects):
+            self.show_frame_rects(
+                rects, _pack_rects(frame, rects), size[0], size[1], premultiplied
+            )
+            return
+        if premultiplied:
+            self.show_frame_array(frame, premultiplied=True)
+            return
+        self.width, self.height = size
+        self._full_frame_size = size
+        frame_rgba = frame.tobytes("raw", "RGBA")
         if self._proxy_mode:
             self.root.submit_frame(frame_rgba, self.width, self.height)
             return
-        self._frame_rgba = frame_rgba
-        self._needs_texture_upload = True
+        self.show_frame_bytes(frame_rgba, self.width, self.height)
+
+    def _can_send_partial(self, size, rects):
+        if self._full_frame_size != size:
+            return False
+        area = sum((right - left) * (bottom - top) for left, top, right, bottom in rects)
+        return area <= size[0] * size[1] * PARTIAL_UPLOAD_MAX_RATIO
 
-    def show_frame_bytes(self, frame_rgba, width, height):
+    def show_frame_rects(self, rects, pixels, width, height, premultiplied=False):
+        """Update only the given rects of the current frame.
+
+        pixels holds each rect's RGBA rows back to back, in rect order.
+        """
+        self.width = int(width)
+        self.height = int(height)
+        if self._proxy_mode:
+            self.root.submit_frame(
+                pixels, self.width, self.height, premultiplied=premultiplied, rects=rects
+            )
+            return
+        pixels = memoryview(pixels).cast("B")
+        offset = 0
+        for left, top, right, bottom in rects:
+            size = (right - left) * (bottom - top) * 4
+            self._dirty_uploads.append(
+                ((left, top, right, bottom), pixels[offset : offset + size])
+            )
+            offset += size
+        self._premultiplied = premultiplied
+
+    @property
+    def upload_pending(self):
+        return self._needs_texture_upload or bool(self._dirty_uploads)
+
+    def show_frame_array(self, pixels, premultiplied=False):
+        """Show a contiguous (height, width, 4) uint8 RGBA array."""
+        self.height, self.width = int(pixels.shape[0]), int(pixels.shape[1])
+        self._full_frame_size = (self.width, self.height)
+        if self._proxy_mode:
+            # submit_frame copies the pixels before the renderer reuses them.
+            self.root.submit_frame(
+                pixels, self.width, self.height, premultiplied=premultiplied
+            )
+            return
+        self.show_frame_bytes(pixels, self.width, self.height, premultiplied)
+
+    def show_frame_bytes(self, frame_rgba, width, height, premultiplied=False):
         self.width = int(width)
         self.height = int(height)
         self._frame_rgba = frame_rgba
+        self._premultiplied = premultiplied
         self._needs_texture_upload = True
+        # A whole frame replaces any sub-image updates not uploaded yet.
+        self._dirty_uploads = []
+        self._scene_quads = None
+
+    def show_scene(self, scene):
+        """Show a layer_compositor.CompositorScene built by compose_if_due."""
+        self.width = scene.width
+        self.height = scene.height
+        if self._proxy_mode:
+            self.root.submit_scene(scene)
+            return
+        self.apply_scene(
+            scene.width,
+            scene.height,
+            scene.layers,
+            scene.release,
+            scene.quads,
+            scene.premultiplied,
+        )
+
+    def apply_scene(self, width, height, layers, release, quads, premultiplied=False):
+        """Take a compositor scene's layer changes and quads for the next draw.
+
+        layers are (layer_id, width, height, pixels, key) to place in the
+        texture atlas, release the ids of layers no longer needed, and quads
+        the layer_compositor.Quad tuples to draw back to front.
+        """
+        self.width = int(width)
+        self.height = int(height)
+        self._pending_layers.extend(layers)
+        self._released_layers.extend(release)
+        self._scene_quads = list(quads)
+        self._premultiplied = premultiplied
+        # The scene replaces whatever whole frame was waiting to be shown.
+        self._frame_rgba = None
+        self._needs_texture_upload = False
+        self._dirty_uploads = []
+        self._full_frame_size = None
+
+    def set_render_scale(self, render_scale, render_filter="linear"):
+        """Show frames rendered at render_scale times the logical canvas size.
+
+        They are stretched back over the canvas, sampled with render_filter
+        ("linear" or "nearest").
+        """
+        render_scale = check_render_scale(render_scale, render_filter)
+        if (render_scale, render_filter) == (self.render_scale, self.render_filter):
+            return
+        self.render_scale = render_scale
+        self.render_filter = render_filter
+        if self._proxy_mode:
+            self.root.set_render_scale(render_scale, render_filter)
+
+    def _viewport_size(self, framebuffer_width, framebuffer_height):
+        """Framebuffer pixels covered by the current frame.
+
+        A frame covers the logical canvas (frame size / render_scale, in
+        window coordinates), times the framebuffer pixels per window unit.
+        """
+        window_width, window_height = glfw.get_window_size(self.root.handle)
+        content_x = framebuffer_width / window_width if window_width > 0 else 1.0
+        content_y = framebuffer_height / window_height if window_height > 0 else 1.0
+        return (
+            max(1, int(round(self.width * content_x / self.render_scale))),
+            max(1, int(round(self.height * content_y / self.render_scale))),
+        )
+
+    def _apply_texture_filter(self):
+        if self._texture_filter == self.render_filter:
+            return
+        self._texture_filter = self.render_filter
+        textures = [self._texture_id]
+        if self._atlas is not None:
+            self._atlas.backend.render_filter = self.render_filter
+            textures.extend(page.texture for page in self._atlas.pages)
+        for texture in textures:
+            GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+            _set_texture_filter(self.render_filter)
 
     def draw(self):
         if self._proxy_mode:
@@ -246,20 +719,29 @@ class OpenGLImageDisplay:
         )
         if framebuffer_width <= 0 or framebuffer_height <= 0:
             return
-        # Keep content at a fixed pixel size and anchor to top-left.
-        # Window resizing should change only the visible/canvas area, not scale content.
-        viewport_x = 0
-        viewport_y = framebuffer_height - self.height
-        GL.glViewport(viewport_x, viewport_y, self.width, self.height)
+        # Keep content at a fixed logical size and anchor to top-left.
+        # Window resizing should change only the visible/canvas area, not scale
+        # content; frames rendered at another scale or on a HiDPI framebuffer
+        # are stretched to it.
+        view_width, view_height = self._viewport_size(
+            framebuffer_width, framebuffer_height
+        )
+        GL.glViewport(0, framebuffer_height - view_height, view_width, view_height)
+        self._apply_texture_filter()
         GL.glClearColor(0.0, 0.0, 0.0, 0.0)
         GL.glClear(GL.GL_COLOR_BUFFER_BIT)
-        if self._frame_rgba is None or self._texture_id is None:
+        if self._scene_quads is not None:
+            self._draw_scene()
+            return
+        if self._texture_id is None:
             return
 
         GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture_id)
         GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
-        if self._needs_texture_upload:
+        uploads = []
+        if self._needs_texture_upload and self._frame_rgba is not None:
             if self._texture_size != (self.width, self.height):
+                # Allocate only; the pixels go through _upload like any other.
                 GL.glTexImage2D(
                     GL.GL_TEXTURE_2D,
                     0,
@@ -269,23 +751,26 @@ class OpenGLImageDisplay:
                     0,
                     GL.GL_RGBA,
                     GL.GL_UNSIGNED_BYTE,
-                    self._frame_rgba,
+                    None,
                 )
                 self._texture_size = (self.width, self.height)
-            else:
-                GL.glTexSubImage2D(
-                    GL.GL_TEXTURE_2D,
-                    0,
-                    0,
-                    0,
-                    self.width,
-                    self.height,
-                    GL.GL_RGBA,
-                    GL.GL_UNSIGNED_BYTE,
-                    self._frame_rgba,
-                )
+            uploads.append(((0, 0, self.width, self.height), self._frame_rgba))
             self._needs_texture_upload = False
+        if self._texture_size == (self.width, self.height):
+            uploads.extend(self._dirty_uploads)
+        self._dirty_uploads = []
+        self._upload(uploads)
+        # The pixels may be a view of a shared frame slot; the texture now
+        # holds them, so let the slot go.
+        self._frame_rgba = None
+        if self._texture_size == (0, 0):
+            return
 
+        # Premultiplied frames already carry color scaled by alpha.
+        GL.glBlendFunc(
+            GL.GL_ONE if self._premultiplied else GL.GL_SRC_ALPHA,
+            GL.GL_ONE_MINUS_SRC_ALPHA,
+        )
         GL.glUseProgram(self._program_id)
         GL.glActiveTexture(GL.GL_TEXTURE0)
         GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture_id)
@@ -297,6 +782,121 @@ class OpenGLImageDisplay:
         self._unbind_quad()
         GL.glUseProgram(0)
 
+    def _init_compositor(self):
+        self._composite_program = self._build_program(
+            [
+                (COMPOSITE_VERTEX_SRC_330, COMPOSITE_FRAGMENT_SRC_330, True),
+                (COMPOSITE_VERTEX_SRC_120, COMPOSITE_FRAGMENT_SRC_120, False),
+            ],
+            ("a_pos", "a_uv", "a_opacity"),
+        )
+        program = self._composite_program
+        self._composite_locs = tuple(
+            GL.glGetAttribLocation(program, name)
+            for name in ("a_pos", "a_uv", "a_opacity")
+        )
+        self._composite_sampler_loc = GL.glGetUniformLocation(program, "u_texture")
+        self._composite_premultiplied_loc = GL.glGetUniformLocation(
+            program, "u_premultiplied"
+        )
+        self._composite_vbo = GL.glGenBuffers(1)
+        self._atlas = texture_atlas.TextureAtlas(
+            AtlasPages(self._upload, self._texture_filter)
+        )
+
+    def _update_layers(self):
+        """Place the new layers in the atlas and drop released ones."""
+        atlas = self._atlas
+        for layer_id, width, height, pixels, key in self._pending_layers:
+            if atlas.acquire(key, width, height, pixels) is None:
+                logger.warning(
+                    "Compositor layer %s is missing its pixels.", layer_id
+                )
+                continue
+            self._layer_keys[layer_id] = key
+        self._pending_layers = []
+        # Released only now, so a key passed from one layer to another in
+        # the same batch is never evicted in between.
+        for layer_id in self._released_layers:
+            key = self._layer_keys.pop(layer_id, None)
+            if key is not None:
+                atlas.release(key)
+        self._released_layers = []
+        atlas.flush()
+
+    def _draw_scene(self):
+        """Draw the scene's quads from the atlas, one call per atlas page run."""
+        if self._composite_program is None:
+            self._init_compositor()
+        GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+        self._update_layers()
+        vertices, batches = _scene_batches(
+            self._scene_quads,
+            _LayerRegions(self._layer_keys, self._atlas),
+            self.width,
+            self.height,
+        )
+        if not batches:
+            return
+
+        GL.glBlendFunc(
+            GL.GL_ONE if self._premultiplied else GL.GL_SRC_ALPHA,
+            GL.GL_ONE_MINUS_SRC_ALPHA,
+        )
+        GL.glUseProgram(self._composite_program)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        if self._composite_sampler_loc >= 0:
+            GL.glUniform1i(self._composite_sampler_loc, 0)
+        if self._composite_premultiplied_loc >= 0:
+            GL.glUniform1f(
+                self._composite_premultiplied_loc,
+                1.0 if self._premultiplied else 0.0,
+            )
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._composite_vbo)
+        data = (ctypes.c_float * len(vertices)).from_buffer(vertices)
+        GL.glBufferData(
+            GL.GL_ARRAY_BUFFER, ctypes.sizeof(data), data, GL.GL_STREAM_DRAW
+        )
+        stride = COMPOSITE_VERTEX_FLOATS * 4
+        for location, size, offset in zip(self._composite_locs, (2, 2, 1), (0, 8, 16)):
+            if location >= 0:
+                GL.glEnableVertexAttribArray(location)
+                GL.glVertexAttribPointer(
+                    location, size, GL.GL_FLOAT, False, stride, ctypes.c_void_p(offset)
+                )
+        for texture, first, count in batches:
+            GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+            GL.glDrawArrays(GL.GL_TRIANGLES, first, count)
+        for location in self._composite_locs:
+            if location >= 0:
+                GL.glDisableVertexAttribArray(location)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        GL.glUseProgram(0)
+
+    def _upload(self, uploads):
+        """Copy (rect, pixels) pairs into the bound texture."""
+        if not uploads:
+            return
+        if self._pixel_buffers is not None:
+            try:
+                if self._pixel_buffers.upload(uploads):
+                    return
+            except Exception:
+                logger.exception("Pixel buffer upload failed; uploading directly.")
+                self._pixel_buffers = None
+        for (left, top, right, bottom), pixels in uploads:
+            GL.glTexSubImage2D(
+                GL.GL_TEXTURE_2D,
+                0,
+                left,
+                top,
+                right - left,
+                bottom - top,
+                GL.GL_RGBA,
+                GL.GL_UNSIGNED_BYTE,
+                pixels,
+            )
+
     def configure(self, width=None, height=None):
         if width is not None:
             self.width = int(width)
@@ -1,41 +1,504 @@
+import math
+import threading
 import time
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
 from PIL import Image as PILImage
 from PIL import ImageDraw
 
 try:
-    from . import fonts_manager, widget_appearance
+    from . import (
+        display_list,
+        fonts_manager,
+        layer_compositor,
+        opengl_image_display,
+        widget_appearance,
+    )
 except ImportError:
+    import display_list
     import fonts_manager
+    import layer_compositor
+    import opengl_image_display
     import widget_appearance
 
 
+# Extra pixels added around each damage rect before repainting.
+DAMAGE_PADDING = 1
+# Past this many disjoint regions a full repaint is cheaper than many traversals.
+MAX_DAMAGE_REGIONS = 16
+# Fraction of the frame area above which partial repaints fall back to full.
+FULL_REPAINT_DAMAGE_RATIO = 0.6
+# Container children with descendants are cached as tiles of this size.
+SUBTREE_TILE_SIZE = 256
+# Tiles kept per cached subtree; the least recently composited are evicted.
+MAX_SUBTREE_TILES = 64
+# With several render threads, repaints are split into tiles of this size.
+RENDER_TILE_SIZE = 256
+
+
+# Scratch draw context used only to measure text extents.
+_MEASURE_DRAW = ImageDraw.Draw(PILImage.new("RGBA", (1, 1)), "RGBA")
+
+# A cached widget body bitmap, positioned relative to the widget's origin.
+# opaque bitmaps cover every pixel they span, so they can be pasted.
+# PIL blends glyph edges into the pixels they are drawn on, so text over a
+# translucent body comes out differently on a transparent bitmap than on the
+# frame. For such bodies, body is the bitmap without its text and text the
+# (position, text, fill, font, anchor) to draw onto the frame after it;
+# surface still has both, for compositing it as a layer.
+WidgetRaster = namedtuple(
+    "WidgetRaster",
+    "surface offset_x offset_y source opaque body text",
+    defaults=(None, None),
+)
+
+_MISSING = object()
+
+
+class WidgetRasterCache:
+    """Retained widget body bitmaps keyed by each widget's resolved appearance.
+
+    A few variants are kept per widget so hover/active toggles swap between
+    cached bitmaps instead of re-rasterizing fill, image and text.
+    """
+
+    def __init__(self, max_variants=4):
+        self.max_variants = max(1, int(max_variants))
+        self._entries = {}
+
+    def __len__(self):
+        return sum(len(variants) for variants in self._entries.values())
+
+    def get(self, widget, key):
+        variants = self._entries.get(id(widget))
+        if variants is None or key not in variants:
+            return None
+        variants.move_to_end(key)
+        return variants[key]
+
+    def put(self, widget, key, raster):
+        variants = self._entries.setdefault(id(widget), OrderedDict())
+        variants[key] = raster
+        variants.move_to_end(key)
+        while len(variants) > self.max_variants:
+            variants.popitem(last=False)
+
+    def discard(self, widget):
+        self._entries.pop(id(widget), None)
+
+    def prune(self, live_widget_ids):
+        """Drop bitmaps of widgets that are no longer in the display list."""
+        for widget_id in list(self._entries):
+            if widget_id not in live_widget_ids:
+                del self._entries[widget_id]
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SurfacePool:
+    """Recycles transparent RGBA surfaces between frames, keyed by size."""
+
+    # Whether surfaces hold color already scaled by alpha.
+    premultiplied = False
+
+    def __init__(self, max_surfaces=32):
+        self.max_surfaces = max(0, int(max_surfaces))
+        self._free = OrderedDict()
+        self._free_count = 0
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, size):
+        """Return a cleared surface of the given (width, height)."""
+        size = (int(size[0]), int(size[1]))
+        surface = None
+        with self._lock:
+            free = self._free.get(size)
+            if free:
+                surface = free.pop()
+                self._free_count -= 1
+                if not free:
+                    del self._free[size]
+                self.reuses += 1
+            else:
+                self.allocations += 1
+        if surface is None:
+            return self.new_surface(size)
+        self.clear_surface(surface)
+        return surface
+
+    def release(self, surface):
+        """Hand a surface back to the pool once it is no longer referenced."""
+        if surface is None or self.max_surfaces == 0:
+            return
+        size = self.surface_size(surface)
+        with self._lock:
+            self._free.setdefault(size, []).append(surface)
+            self._free.move_to_end(size)
+            self._free_count += 1
+            while self._free_count > self.max_surfaces:
+                # Drop surfaces of the least recently released size first.
+                size, free = next(iter(self._free.items()))
+                free.pop(0)
+                self._free_count -= 1
+                if not free:
+                    del self._free[size]
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+            self._free_count = 0
+
+    def new_surface(self, size):
+        return PILImage.new("RGBA", size, (0, 0, 0, 0))
+
+    def clear_surface(self, surface):
+        surface.paste((0, 0, 0, 0), (0, 0) + surface.size)
+
+    def surface_size(self, surface):
+        return surface.size
+
+    def surface_bytes(self, surface):
+        """RGBA rows of a surface, top to bottom."""
+        return surface.tobytes("raw", "RGBA")
+
+
+class _DeferredReleases:
+    """Holds surfaces released while other render threads may still read them."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.surfaces = []
+
+    def release(self, surface):
+        self.surfaces.append(surface)
+
+    def flush(self):
+        for surface in self.surfaces:
+            self.pool.release(surface)
+        self.surfaces = []
+
+
+class SubtreeTileCache:
+    """Rendered tiles of one container child's subtree in its local coordinates.
+
+    The tiles do not depend on where the subtree sits inside its container, so
+    scrolling only composites them at a new offset. A changed descendant drops
+    only the tiles it covered before and covers now.
+    """
+
+    def __init__(self, tile_size=SUBTREE_TILE_SIZE, max_tiles=MAX_SUBTREE_TILES):
+        self.tile_size = max(1, int(tile_size))
+        self.max_tiles = max(1, int(max_tiles))
+        self.tiles = OrderedDict()
+
+    def get_tile(self, tile_key):
+        if tile_key not in self.tiles:
+            return _MISSING
+        self.tiles.move_to_end(tile_key)
+        return self.tiles[tile_key]
+
+    def put_tile(self, tile_key, surface, pool):
+        self.tiles[tile_key] = surface
+        self.tiles.move_to_end(tile_key)
+        while len(self.tiles) > self.max_tiles:
+            _key, evicted = self.tiles.popitem(last=False)
+            pool.release(evicted)
+
+    def invalidate(self, rects, pool):
+        """Drop tiles intersecting any of the local rects."""
+        tile_size = self.tile_size
+        for tile_key in list(self.tiles):
+            left = tile_key[0] * tile_size
+            top = tile_key[1] * tile_size
+            right = left + tile_size
+            bottom = top + tile_size
+            for rect in rects:
+                if rect[0] < right and rect[2] > left and rect[1] < bottom and rect[3] > top:
+                    pool.release(self.tiles.pop(tile_key))
+                    break
+
+    def clear(self, pool):
+        for surface in self.tiles.values():
+            pool.release(surface)
+        self.tiles.clear()
+
+
 class PILImageRenderer:
-    def __init__(self, window, width, height, fps=60):
+    # Creates, clears and measures the surfaces this renderer draws into.
+    surface_pool_class = SurfacePool
+
+    def __init__(
+        self, window, width, height, fps=60, render_threads=1, render_scale=1.0
+    ):
         self.window = window
-        self.width = int(width)
-        self.height = int(height)
+        # Frames are rasterized at render_scale times the logical canvas size;
+        # width and height are the frame's size in pixels.
+        self.render_scale = opengl_image_display.check_render_scale(render_scale)
+        self.logical_size = (int(width), int(height))
+        self.width, self.height = self._frame_size(width, height)
         self.fps = max(1, int(fps))
+        # Above one thread, repaints are split into RENDER_TILE_SIZE tiles that
+        # are rasterized on a pool; Pillow releases the GIL while compositing.
+        self.render_threads = max(1, int(render_threads))
+        self._executor = None
+        # Guards the raster and subtree caches and op culling across threads.
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._tile_releases = None
         self.frame_interval = 1.0 / self.fps
+        # Frames are paced on clock, a callable returning seconds (None for the
+        # monotonic clock). _last_render is the deadline slot of the last
+        # frame, and _redraw_requested_at is when the pending redraw was first
+        # asked for.
+        self.clock = None
         self._last_render = 0.0
-        self._last_frame = PILImage.new("RGBA", (self.width, self.height), (0, 0, 0, 0))
+        self._redraw_requested_at = None
+        self.surface_pool = self.surface_pool_class()
+        self._last_frame = self.surface_pool.new_surface((self.width, self.height))
+        # Full repaints render into the back buffer and swap it to the front, so
+        # frame-sized surfaces are only allocated again when the canvas resizes.
+        self._back_buffer = None
+        self.raster_cache = WidgetRasterCache()
+        self.subtree_cache = {}
+        # Rendering replays the display list; widgets that report a change are
+        # folded in incrementally, anything else recompiles it.
+        self.display_list = display_list.DisplayList(self)
+        self._display_list_stale = True
+        self._changed_widgets = {}
         self._redraw_requested = True
+        # Damage is accumulated as screen rects between frames. A full repaint is
+        # forced whenever a redraw is requested without rects (or nothing else
+        # is known about what changed).
+        self._damage_rects = []
+        self._full_damage = True
+        # Rects repainted by the last rendered frame; None means the whole frame.
+        self.last_damage = None
+        self.render_stats = {
+            "frames": 0,
+            "full_repaints": 0,
+            "partial_repaints": 0,
+            "repainted_pixels": 0,
+            "raster_cache_hits": 0,
+            "raster_cache_misses": 0,
+            "subtree_tiles_rendered": 0,
+            "subtree_tiles_reused": 0,
+            "occluded_widgets": 0,
+            "occluded_pixels": 0,
+            "render_tiles": 0,
+            "dropped_frames": 0,
+            "compositor_quads": 0,
+            "layer_uploads": 0,
+        }
+        # Builds GPU compositor scenes; created by the first compose_if_due.
+        self.compositor = None
+
+    def request_redraw(self, rects=None, widget=None):
+        """Mark the frame dirty.
 
-    def request_redraw(self):
+        Args:
+            rects (iterable, optional): Damaged (left, top, right, bottom) screen
+                rects. Defaults to None, which repaints the whole frame.
+            widget (optional): The widget that changed. Only that widget is
+                re-read into the display list; without it the whole list is
+                recompiled and cached subtree tiles are dropped.
+        """
+        if widget is None:
+            self._display_list_stale = True
+            self._drop_subtree_cache()
+        else:
+            self._changed_widgets[id(widget)] = widget
+        if rects is None:
+            self._full_damage = True
+            self._set_redraw_requested()
+            return
+        if self._full_damage:
+            return
+        for rect in rects:
+            rect = self._clip_damage_rect(self._device_rect(rect))
+            if rect is not None:
+                self._damage_rects.append(rect)
+                self._set_redraw_requested()
+
+    def request_composite(self, widget):
+        """Mark the frame dirty for a change to a widget's layer transform.
+
+        The widget's cached layer is only composited differently; the damage
+        is worked out from where it was drawn and where it is drawn now.
+        """
+        self._changed_widgets[id(widget)] = widget
+        self._set_redraw_requested()
+
+    def resize(self, width, height):
+        """Resize the canvas to width x height logical pixels.
+
+        The caller requests the redraw.
+        """
+        self.logical_size = (max(1, int(width)), max(1, int(height)))
+        self.width, self.height = self._frame_size(*self.logical_size)
+
+    def set_render_scale(self, render_scale):
+        """Rasterize later frames at render_scale times the logical size."""
+        render_scale = opengl_image_display.check_render_scale(render_scale)
+        if render_scale == self.render_scale:
+            return
+        self.render_scale = render_scale
+        self.raster_cache.clear()
+        self.resize(*self.logical_size)
+        self.request_redraw()
+
+    def _frame_size(self, width, height):
+        """Size of a frame covering a width x height logical canvas."""
+        if self.render_scale == 1.0:
+            return int(width), int(height)
+        return (
+            max(1, int(math.ceil(width * self.render_scale))),
+            max(1, int(math.ceil(height * self.render_scale))),
+        )
+
+    def _device(self, value):
+        """A logical coordinate or length in frame pixels."""
+        if self.render_scale == 1.0:
+            return int(value)
+        return int(round(value * self.render_scale))
+
+    def _device_rect(self, rect):
+        """The frame pixels covering a logical (left, top, right, bottom) rect."""
+        if rect is None or self.render_scale == 1.0:
+            return rect
+        scale = self.render_scale
+        return (
+            int(math.floor(rect[0] * scale)),
+            int(math.floor(rect[1] * scale)),
+            int(math.ceil(rect[2] * scale)),
+            int(math.ceil(rect[3] * scale)),
+        )
+
+    def _device_image(self, image):
+        """A copy of image resampled to the render scale (image itself at 1.0)."""
+        if image is None or self.render_scale == 1.0:
+            return image
+        width, height = image.size
+        return image.resize(
+            (
+                max(1, self._device(width)),
+                max(1, self._device(height)),
+            ),
+            PILImage.BILINEAR,
+        )
+
+    def _widget_position(self, widget):
+        """Widget (x, y) relative to its parent, in frame pixels."""
+        return (
+            self._device(self._safe_attr(widget, "x", 0) or 0),
+            self._device(self._safe_attr(widget, "y", 0) or 0),
+        )
+
+    def _widget_size(self, widget):
+        """Widget (width, height) in frame pixels."""
+        return (
+            self._device(self._safe_attr(widget, "width", 0) or 0),
+            self._device(self._safe_attr(widget, "height", 0) or 0),
+        )
+
+    def _now(self):
+        if self.clock is None:
+            return time.monotonic()
+        return self.clock()
+
+    def _set_redraw_requested(self):
+        if not self._redraw_requested:
+            self._redraw_requested_at = self._now()
         self._redraw_requested = True
 
+    def _clip_damage_rect(self, rect):
+        if rect is None:
+            return None
+        # PIL rectangles include their right/bottom edge and anti-aliased text can
+        # bleed a pixel, so pad the reported rect before clipping to the frame.
+        left = max(0, int(rect[0]) - DAMAGE_PADDING)
+        top = max(0, int(rect[1]) - DAMAGE_PADDING)
+        right = min(self.width, int(rect[2]) + DAMAGE_PADDING + 1)
+        bottom = min(self.height, int(rect[3]) + DAMAGE_PADDING + 1)
+        if right <= left or bottom <= top:
+            return None
+        return (left, top, right, bottom)
+
+    def _merge_damage_rects(self, rects):
+        """Merge overlapping damage rects.
+
+        Returns None when the merged damage is large or fragmented enough that a
+        full repaint is cheaper.
+        """
+        merged = []
+        for rect in rects:
+            pending = rect
+            changed = True
+            while changed:
+                changed = False
+                for index, existing in enumerate(merged):
+                    if self._rects_touch(existing, pending):
+                        pending = self._rect_union(existing, pending)
+                        merged.pop(index)
+                        changed = True
+                        break
+            merged.append(pending)
+
+        if len(merged) > MAX_DAMAGE_REGIONS:
+            return None
+        damaged_area = sum(
+            (rect[2] - rect[0]) * (rect[3] - rect[1]) for rect in merged
+        )
+        if damaged_area >= self.width * self.height * FULL_REPAINT_DAMAGE_RATIO:
+            return None
+        return merged
+
+    def _rects_touch(self, first, second):
+        return not (
+            first[2] < second[0]
+            or second[2] < first[0]
+            or first[3] < second[1]
+            or second[3] < first[1]
+        )
+
+    def _rect_union(self, first, second):
+        return (
+            min(first[0], second[0]),
+            min(first[1], second[1]),
+            max(first[2], second[2]),
+            max(first[3], second[3]),
+        )
+
     def _safe_attr(self, obj, name, default=None):
         return widget_appearance.safe_getattr(obj, name, default)
 
     def _is_widget_visible(self, widget, parent_visible=True):
         return widget_appearance.is_widget_visible(widget, parent_visible=parent_visible)
 
+    def _layer_transform(self, widget):
+        return widget_appearance.layer_transform(widget, self.render_scale)
+
     def _is_container_layer_widget(self, widget):
         if self._safe_attr(widget, "_is_container_layer", False):
             return True
         return getattr(widget.__class__, "__name__", "") == "Container"
 
-    def _composite_image(self, frame, source, dest_x, dest_y, clip_rect=None):
+    def _paste_surface(self, frame, surface, dest_x, dest_y):
+        """Replace the pixels of frame under surface with it."""
+        frame.paste(surface, (dest_x, dest_y))
+
+    def _composite_layer(self, frame, layer, dest_x, dest_y):
+        frame.alpha_composite(layer, (dest_x, dest_y))
+
+    def _is_blank(self, surface):
+        return surface.getbbox() is None
+
+    def _composite_image(
+        self, frame, source, dest_x, dest_y, clip_rect=None, opaque=False, opacity=1.0
+    ):
         if source is None:
             return
         source_width, source_height = source.size
@@ -65,7 +528,19 @@ class PILImageRenderer:
         crop_right = crop_left + (draw_right - draw_left)
         crop_bottom = crop_top + (draw_bottom - draw_top)
         cropped = source.crop((crop_left, crop_top, crop_right, crop_bottom))
-        frame.alpha_composite(cropped, (draw_left, draw_top))
+        if opacity < 1.0:
+            table = [int(value * opacity + 0.5) for value in range(256)]
+            cropped.putalpha(cropped.getchannel("A").point(table))
+            opaque = False
+        if opaque:
+            # Same pixels as alpha_composite, but paste releases the GIL.
+            frame.paste(cropped, (draw_left, draw_top))
+        else:
+            frame.alpha_composite(cropped, (draw_left, draw_top))
+
+    def _scaled(self, surface, size):
+        """A copy of surface resampled to size with bilinear filtering."""
+        return surface.resize(size, PILImage.BILINEAR)
 
     def _is_fully_opaque_color(self, color):
         if color is None:
@@ -89,24 +564,6 @@ class PILImageRenderer:
             return True
         return True
 
-    def _intersects_clip(self, x, y, width, height, clip_rect):
-        if clip_rect is None:
-            return True
-        if width <= 0 or height <= 0:
-            return True
-        left, top, right, bottom = (
-            int(clip_rect[0]),
-            int(clip_rect[1]),
-            int(clip_rect[2]),
-            int(clip_rect[3]),
-        )
-        return not (
-            (x + width) <= left
-            or x >= right
-            or (y + height) <= top
-            or y >= bottom
-        )
-
     def _resolve_image(self, widget):
         return widget_appearance.resolve_image(widget)
 
@@ -116,6 +573,28 @@ class PILImageRenderer:
     def _resolve_text_fill(self, widget):
         return widget_appearance.to_rgba(widget_appearance.resolve_text_fill(widget))
 
+    def _clip_to_frame(self, frame, left, top, right, bottom):
+        left = max(0, int(left))
+        top = max(0, int(top))
+        frame_width, frame_height = self.surface_pool.surface_size(frame)
+        right = min(frame_width, int(right))
+        bottom = min(frame_height, int(bottom))
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right, bottom
+
+    def _composite_bounded_layer(self, frame, region, draw_callback):
+        """Draw into a transparent layer covering only region, then blend it in.
+
+        draw_callback receives (draw_ctx, offset_x, offset_y) and must draw in
+        frame coordinates shifted by the offsets.
+        """
+        left, top, right, bottom = region
+        layer = self.surface_pool.acquire((right - left, bottom - top))
+        draw_callback(ImageDraw.Draw(layer, "RGBA"), -left, -top)
+        frame.alpha_composite(layer, (left, top))
+        self.surface_pool.release(layer)
+
     def _alpha_draw_rectangle(self, frame, bounds, fill=None, outline=None, width=0):
         """Draw rectangle via alpha compositing so transparent colors blend."""
         if self._is_fully_opaque_color(fill) and (
@@ -124,10 +603,21 @@ class PILImageRenderer:
             draw_ctx = ImageDraw.Draw(frame, "RGBA")
             draw_ctx.rectangle(bounds, fill=fill, outline=outline, width=width)
             return
-        layer = PILImage.new("RGBA", frame.size, (0, 0, 0, 0))
-        layer_draw = ImageDraw.Draw(layer, "RGBA")
-        layer_draw.rectangle(bounds, fill=fill, outline=outline, width=width)
-        frame.alpha_composite(layer)
+        x0, y0, x1, y1 = (int(value) for value in bounds)
+        # PIL rectangles include their right/bottom edge.
+        region = self._clip_to_frame(frame, x0, y0, x1 + 1, y1 + 1)
+        if region is None:
+            return
+
+        def draw_rectangle(layer_draw, offset_x, offset_y):
+            layer_draw.rectangle(
+                [x0 + offset_x, y0 + offset_y, x1 + offset_x, y1 + offset_y],
+                fill=fill,
+                outline=outline,
+                width=width,
+            )
+
+        self._composite_bounded_layer(frame, region, draw_rectangle)
 
     def _alpha_draw_text(self, frame, position, text, fill, font, anchor):
         """Draw text via alpha compositing for correct transparency behavior."""
@@ -135,10 +625,24 @@ class PILImageRenderer:
             draw_ctx = ImageDraw.Draw(frame, "RGBA")
             draw_ctx.text(position, text, fill=fill, font=font, anchor=anchor)
             return
-        layer = PILImage.new("RGBA", frame.size, (0, 0, 0, 0))
-        layer_draw = ImageDraw.Draw(layer, "RGBA")
-        layer_draw.text(position, text, fill=fill, font=font, anchor=anchor)
-        frame.alpha_composite(layer)
+        extents = self._text_extents(text, font, position, anchor)
+        if extents is None:
+            region = (0, 0, frame.size[0], frame.size[1])
+        else:
+            region = self._clip_to_frame(frame, *extents)
+            if region is None:
+                return
+
+        def draw_text(layer_draw, offset_x, offset_y):
+            layer_draw.text(
+                (position[0] + offset_x, position[1] + offset_y),
+                text,
+                fill=fill,
+                font=font,
+                anchor=anchor,
+            )
+
+        self._composite_bounded_layer(frame, region, draw_text)
 
     def resolve_widget_font_debug(self, widget):
         """Return renderer-relevant font diagnostics for a text widget."""
@@ -151,168 +655,911 @@ class PILImageRenderer:
         info["text_length"] = len(str(text))
         return info
 
-    def _draw_widget_body(self, frame, widget, abs_x, abs_y, clip_rect=None):
-        width = int(self._safe_attr(widget, "width", 0) or 0)
-        height = int(self._safe_attr(widget, "height", 0) or 0)
+    def _hashable(self, value):
+        if isinstance(value, list):
+            return tuple(self._hashable(item) for item in value)
+        return value
+
+    def _resolve_widget_appearance(self, widget):
+        """Resolve the slot-dependent appearance that determines a body raster.
+
+        Returns (key, image): key is hashable and identifies the raster, image is
+        the resolved PIL image (tracked in the key by identity).
+        """
+        width, height = self._widget_size(widget)
         border_width = int(self._safe_attr(widget, "border_width", 0) or 0)
+        if border_width > 0:
+            # Borders stay at least a pixel wide at small render scales.
+            border_width = max(1, self._device(border_width))
         outline = widget_appearance.to_rgba(self._safe_attr(widget, "border", None))
-
         fill = self._resolve_fill(widget)
-        if (
+        image = self._resolve_image(widget)
+
+        text = self._safe_attr(widget, "text", "")
+        font_spec = self._safe_attr(widget, "font", None)
+        if text in ("", None) or font_spec is None:
+            text, font_spec, justify, text_fill = "", None, None, None
+        else:
+            justify = self._safe_attr(widget, "justify", "center")
+            text_fill = self._resolve_text_fill(widget)
+            if self.render_scale != 1.0:
+                font_spec = fonts_manager.scale_font(font_spec, self.render_scale)
+
+        key = (
+            width,
+            height,
+            border_width,
+            self._hashable(outline),
+            self._hashable(fill),
+            id(image) if image is not None else None,
+            str(text),
+            self._hashable(font_spec),
+            justify,
+            self._hashable(text_fill),
+        )
+        return key, image
+
+    def _text_anchor(self, justify, width):
+        if justify == "left":
+            return 0, "lm"
+        if justify == "right":
+            return width, "rm"
+        return width / 2, "mm"
+
+    def _text_extents(self, text, text_font, position, anchor):
+        try:
+            left, top, right, bottom = _MEASURE_DRAW.textbbox(
+                position, text, font=text_font, anchor=anchor
+            )
+        except Exception:
+            return None
+        return (
+            int(math.floor(left)) - 1,
+            int(math.floor(top)) - 1,
+            int(math.ceil(right)) + 1,
+            int(math.ceil(bottom)) + 1,
+        )
+
+    def _rasterize_widget_body(self, key, image):
+        """Render a widget body into its own bitmap.
+
+        Returns a WidgetRaster, or None when the widget draws nothing.
+        """
+        (
+            width,
+            height,
+            border_width,
+            outline,
+            fill,
+            _image_id,
+            text,
+            font_spec,
+            justify,
+            text_fill,
+        ) = key
+
+        extents = []
+        draw_rect = (
             width > 0
             and height > 0
             and (fill is not None or (outline is not None and border_width > 0))
-        ):
+        )
+        if draw_rect:
+            # PIL rectangles include their right/bottom edge.
+            extents.append((0, 0, width + 1, height + 1))
+
+        if image is not None:
+            if getattr(image, "mode", None) != "RGBA":
+                image = image.convert("RGBA")
+            extents.append(
+                (
+                    border_width,
+                    border_width,
+                    border_width + image.size[0],
+                    border_width + image.size[1],
+                )
+            )
+
+        text_font = None
+        if font_spec is not None:
+            text_font = fonts_manager.resolve_draw_font(font_spec)
+            text_x, anchor = self._text_anchor(justify, width)
+            text_y = height / 2
+            text_extents = self._text_extents(
+                text, text_font, (text_x, text_y), anchor
+            )
+            # Unmeasurable fonts are clipped to the widget rect.
+            extents.append(text_extents or (0, 0, width + 1, height + 1))
+
+        if not extents:
+            return None
+        left = min(rect[0] for rect in extents)
+        top = min(rect[1] for rect in extents)
+        right = max(rect[2] for rect in extents)
+        bottom = max(rect[3] for rect in extents)
+        if right <= left or bottom <= top:
+            return None
+
+        surface = PILImage.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+        origin_x = -left
+        origin_y = -top
+        if draw_rect:
             self._alpha_draw_rectangle(
-                frame,
-                [abs_x, abs_y, abs_x + width, abs_y + height],
+                surface,
+                [origin_x, origin_y, origin_x + width, origin_y + height],
                 fill=fill,
                 outline=outline,
                 width=border_width,
             )
-
-        img = self._resolve_image(widget)
-        if img is not None:
-            if getattr(img, "mode", None) != "RGBA":
-                img = img.convert("RGBA")
+        if image is not None:
             self._composite_image(
-                frame,
-                img,
-                abs_x + border_width,
-                abs_y + border_width,
-                clip_rect=clip_rect,
+                surface, image, origin_x + border_width, origin_y + border_width
             )
+        body = deferred_text = None
+        if text_font is not None:
+            position = (origin_x + text_x, origin_y + text_y)
+            under_text = surface
+            if text_extents is not None:
+                under_text = surface.crop(
+                    (
+                        text_extents[0] + origin_x,
+                        text_extents[1] + origin_y,
+                        text_extents[2] + origin_x,
+                        text_extents[3] + origin_y,
+                    )
+                )
+            if under_text.getextrema()[3][0] < 255:
+                body = surface.copy()
+                deferred_text = (position, text, text_fill, text_font, anchor)
+            self._alpha_draw_text(
+                surface, position, text, text_fill, text_font, anchor
+            )
+        opaque = surface.getextrema()[3][0] == 255
+        # Keep the source image alive so its id() in the key cannot be reused.
+        return WidgetRaster(surface, left, top, image, opaque, body, deferred_text)
 
-        text = self._safe_attr(widget, "text", "")
-        font_spec = self._safe_attr(widget, "font", None)
-        if text not in ("", None) and font_spec is not None:
-            text_font = fonts_manager.resolve_draw_font(font_spec)
-            justify = self._safe_attr(widget, "justify", "center")
-            if justify == "left":
-                text_x = abs_x
-                anchor = "lm"
-            elif justify == "right":
-                text_x = abs_x + width
-                anchor = "rm"
+    def _stats(self):
+        """Counters for the current thread; render threads merge theirs later."""
+        return getattr(self._local, "stats", self.render_stats)
+
+    def _widget_raster(self, widget, appearance=None):
+        if appearance is None:
+            appearance = self._resolve_widget_appearance(widget)
+        key, image = appearance
+        raster = self.raster_cache.get(widget, key)
+        if raster is not None:
+            self._stats()["raster_cache_hits"] += 1
+            return raster
+        self._stats()["raster_cache_misses"] += 1
+        raster = self._rasterize_widget_body(key, self._device_image(image))
+        if raster is not None and raster.source is not image:
+            # Hold the image the key names, not its resampled copy.
+            raster = raster._replace(source=image)
+        self.raster_cache.put(widget, key, raster)
+        return raster
+
+    def _op_raster(self, op):
+        # Fonts are not safe to share between threads, so rasterize one at a time.
+        with self._lock:
+            if op.raster is not None:
+                return op.raster or None
+            raster = self._widget_raster(op.widget, op.appearance)
+            op.raster = raster if raster is not None else False
+            # Its bounds are known now, so let culling see them.
+            op.cull_version = -1
+        return raster
+
+    def _op_bounds(self, op, rasterize=False):
+        """Level-space rect an op draws into, or None when unknown or empty."""
+        if op.kind == display_list.LAYER:
+            return display_list.transform_rect(op, (0, 0, op.width, op.height))
+        if op.kind == display_list.SUBTREE:
+            return None
+        raster = op.raster
+        if raster is None:
+            if rasterize:
+                raster = self._op_raster(op)
             else:
-                text_x = abs_x + (width / 2)
-                anchor = "mm"
-            text_y = abs_y + (height / 2)
+                width, height, border_width, outline, fill, image_id, text = (
+                    op.appearance[0][:7]
+                )
+                if image_id is not None or text:
+                    return None
+                if width <= 0 or height <= 0:
+                    return None
+                if fill is None and (outline is None or border_width <= 0):
+                    return None
+                # PIL rectangles include their right/bottom edge.
+                return (op.x, op.y, op.x + width + 1, op.y + height + 1)
+        if not raster:
+            return None
+        left = op.x + raster.offset_x
+        top = op.y + raster.offset_y
+        width, height = self.surface_pool.surface_size(raster.surface)
+        return (left, top, left + width, top + height)
+
+    def _op_extent(self, op, rasterize=False):
+        """Like _op_bounds, but covering a subtree's whole cached level."""
+        if op.kind != display_list.SUBTREE:
+            return self._op_bounds(op, rasterize=rasterize)
+        extent = self._level_extent(op.child_level)
+        if extent is None:
+            return None
+        return display_list.transform_rect(op, extent)
+
+    def _level_extent(self, level):
+        """Local rect covering everything a level draws, or None when nothing."""
+        with self._lock:
+            if level.extent is None:
+                extent = None
+                for op in level.ops:
+                    rect = self._op_extent(op, rasterize=True)
+                    if rect is not None and level.clip is not None:
+                        rect = display_list._intersect(rect, level.clip)
+                    if rect is None:
+                        continue
+                    if extent is not None:
+                        rect = self._rect_union(extent, rect)
+                    extent = rect
+                level.extent = extent or False
+            return level.extent or None
+
+    def _opaque_rect(self, appearance_key, abs_x, abs_y):
+        """Screen rect a widget body paints fully opaque, or None."""
+        width, height, border_width, outline, fill = appearance_key[:5]
+        if width <= 0 or height <= 0 or not self._is_fully_opaque_color(fill):
+            return None
+        inset = 0
+        if border_width > 0 and outline is not None:
+            if not self._is_fully_opaque_color(outline):
+                # The outline replaces the fill along the edges.
+                inset = border_width
+        rect = (
+            abs_x + inset,
+            abs_y + inset,
+            abs_x + width - inset,
+            abs_y + height - inset,
+        )
+        if rect[2] <= rect[0] or rect[3] <= rect[1]:
+            return None
+        return rect
+
+    def _unoccluded_rect(self, rect, occluders):
+        """Shrink rect past opaque rects that cover whole edges of it.
+
+        Returns None when rect is completely hidden.
+        """
+        left, top, right, bottom = rect
+        for o_left, o_top, o_right, o_bottom in occluders:
+            if o_left <= left and o_right >= right:
+                if o_top <= top < o_bottom:
+                    top = o_bottom
+                if o_top < bottom <= o_bottom:
+                    bottom = o_top
+            elif o_top <= top and o_bottom >= bottom:
+                if o_left <= left < o_right:
+                    left = o_right
+                if o_left < right <= o_right:
+                    right = o_left
+            if right <= left or bottom <= top:
+                return None
+        return left, top, right, bottom
+
+    def _cull_op(self, level, op):
+        """Work out which part of op is left uncovered by the level's occluders."""
+        with self._lock:
+            version = level.cull_version
+            if op.cull_version == version:
+                return
+            bounds = self._op_bounds(op)
+            op.bounds = bounds
+            visible, occluded_area = self._visible_part(level, op, bounds)
+            op.occluded_area = occluded_area
+            op.visible_rect = visible
+            # Published last so other render threads never see half an update.
+            op.cull_version = version
+
+    def _visible_part(self, level, op, bounds):
+        if bounds is None:
+            return None, 0
+        if level.clip is not None:
+            bounds = display_list._intersect(bounds, level.clip)
+            if bounds is None:
+                return False, 0
+        occluders = [
+            occluder.opaque
+            for occluder in level.occluders
+            if occluder.index > op.index
+        ]
+        if not occluders:
+            return bounds, 0
+        visible = self._unoccluded_rect(bounds, occluders)
+        area = display_list._area(bounds)
+        if visible is None:
+            return False, area
+        return visible, area - display_list._area(visible)
+
+    def _replay(self, frame, level, offset_x, offset_y, clip, ops=None):
+        """Draw a display level onto frame.
+
+        Level coordinates are shifted by (offset_x, offset_y); clip is the
+        (left, top, right, bottom) part of frame that may be touched. ops is an
+        already culled subset of the level's ops whose occlusion was counted
+        when it was selected.
+        """
+        clip_left, clip_top, clip_right, clip_bottom = clip
+        if clip_right <= clip_left or clip_bottom <= clip_top:
+            return
+        culls = level.kind != display_list.SUBTREE
+        counts = ops is None
+        stats = self._stats()
+        for op in level.ops if ops is None else ops:
+            if culls and op.cull_version != level.cull_version:
+                self._cull_op(level, op)
+            visible = op.visible_rect
+            if visible is not None:
+                if visible is False:
+                    bounds = op.bounds
+                    if (
+                        counts
+                        and op.occluded_area
+                        and bounds[0] + offset_x < clip_right
+                        and bounds[2] + offset_x > clip_left
+                        and bounds[1] + offset_y < clip_bottom
+                        and bounds[3] + offset_y > clip_top
+                    ):
+                        stats["occluded_widgets"] += 1
+                        stats["occluded_pixels"] += op.occluded_area
+                    continue
+                draw_clip = (
+                    max(visible[0] + offset_x, clip_left),
+                    max(visible[1] + offset_y, clip_top),
+                    min(visible[2] + offset_x, clip_right),
+                    min(visible[3] + offset_y, clip_bottom),
+                )
+                if draw_clip[2] <= draw_clip[0] or draw_clip[3] <= draw_clip[1]:
+                    continue
+                if counts and op.occluded_area:
+                    stats["occluded_pixels"] += op.occluded_area
+            else:
+                draw_clip = clip
+
+            if op.kind == display_list.BODY:
+                raster = op.raster
+                if raster is None:
+                    raster = self._op_raster(op)
+                if not raster:
+                    continue
+                dest_x = op.x + raster.offset_x + offset_x
+                dest_y = op.y + raster.offset_y + offset_y
+                if raster.text is not None:
+                    self._composite_image(
+                        frame, raster.body, dest_x, dest_y, clip_rect=draw_clip
+                    )
+                    self._draw_raster_text(frame, raster, dest_x, dest_y, draw_clip)
+                    continue
+                self._composite_image(
+                    frame,
+                    raster.surface,
+                    dest_x,
+                    dest_y,
+                    clip_rect=draw_clip,
+                    opaque=raster.opaque,
+                )
+            elif op.kind == display_list.LAYER:
+                self._replay_layer(frame, op, offset_x, offset_y, draw_clip)
+            else:
+                self._replay_subtree(frame, level, op, offset_x, offset_y, draw_clip)
+
+    def _draw_raster_text(self, frame, raster, dest_x, dest_y, clip):
+        """Draw a raster's deferred text onto frame, within clip."""
+        width, height = self.surface_pool.surface_size(raster.surface)
+        left, top, right, bottom = dest_x, dest_y, dest_x + width, dest_y + height
+        if clip is not None:
+            left = max(left, clip[0])
+            top = max(top, clip[1])
+            right = min(right, clip[2])
+            bottom = min(bottom, clip[3])
+        region = self._clip_to_frame(frame, left, top, right, bottom)
+        if region is None:
+            return
+        (x, y), text, fill, font, anchor = raster.text
+        part = frame.crop(region)
+        # Fonts are not safe to share between threads.
+        with self._lock:
             self._alpha_draw_text(
-                frame,
-                (text_x, text_y),
+                part,
+                (dest_x + x - region[0], dest_y + y - region[1]),
                 text,
-                self._resolve_text_fill(widget),
-                text_font,
+                fill,
+                font,
                 anchor,
             )
+        frame.paste(part, region[:2])
 
-    def _draw_widget(
-        self, frame, draw_ctx, widget, parent_x, parent_y, parent_visible=True
-    ):
-        if not self._is_widget_visible(widget, parent_visible=parent_visible):
+    def _replay_layer(self, frame, op, offset_x, offset_y, clip):
+        """Render a container into its own layer, then composite it."""
+        if op.transform is not None:
+            self._replay_transformed(frame, op, offset_x, offset_y, clip)
             return
-        abs_x = parent_x + int(self._safe_attr(widget, "x", 0) or 0)
-        abs_y = parent_y + int(self._safe_attr(widget, "y", 0) or 0)
-        self._draw_widget_body(frame, widget, abs_x, abs_y)
-
-    def _render_container_layer(self, widget):
-        width = int(self._safe_attr(widget, "width", 0) or 0)
-        height = int(self._safe_attr(widget, "height", 0) or 0)
-        if width <= 0 or height <= 0:
+        left = op.x + offset_x
+        top = op.y + offset_y
+        part = display_list._intersect(
+            (left, top, left + op.width, top + op.height), clip
+        )
+        if part is None:
+            return
+        # Only the part of the container that ends up on frame is rendered.
+        width = part[2] - part[0]
+        height = part[3] - part[1]
+        layer = self.surface_pool.acquire((width, height))
+        self._replay(
+            layer,
+            op.child_level,
+            left - part[0],
+            top - part[1],
+            (0, 0, width, height),
+        )
+        self._composite_layer(frame, layer, part[0], part[1])
+        self.surface_pool.release(layer)
+
+    def _render_subtree_tile(self, cached, op, tile_x, tile_y):
+        size = cached.tile_size
+        tile = self.surface_pool.acquire((size, size))
+        self._replay(
+            tile,
+            op.child_level,
+            -tile_x * size,
+            -tile_y * size,
+            (0, 0, size, size),
+        )
+        if self._is_blank(tile):
+            self.surface_pool.release(tile)
             return None
+        return tile
+
+    def _replay_transformed(self, frame, op, offset_x, offset_y, clip, cached=None):
+        """Draw a transformed container or subtree, scaled and faded.
+
+        Only the part of its unscaled layer that lands inside clip is drawn
+        (from cached tiles, for a subtree) before it is resampled.
+        """
+        transform = op.transform
+        if transform.opacity <= 0.0 or transform.scale <= 0.0:
+            return
+        if cached is None:
+            extent = (0, 0, op.width, op.height)
+        else:
+            extent = self._level_extent(op.child_level)
+            if extent is None:
+                return
+        scale, origin_x, origin_y = display_list.layer_origin(op)
+        origin_x += offset_x
+        origin_y += offset_y
+        part = display_list._intersect(
+            extent,
+            (
+                int(math.floor((clip[0] - origin_x) / scale)),
+                int(math.floor((clip[1] - origin_y) / scale)),
+                int(math.ceil((clip[2] - origin_x) / scale)),
+                int(math.ceil((clip[3] - origin_y) / scale)),
+            ),
+        )
+        if part is None:
+            return
+        width = part[2] - part[0]
+        height = part[3] - part[1]
+        layer = self.surface_pool.acquire((width, height))
+        if cached is None:
+            self._replay(
+                layer, op.child_level, -part[0], -part[1], (0, 0, width, height)
+            )
+        else:
+            self._composite_tiles(
+                layer, cached, op, -part[0], -part[1], (0, 0, width, height), ()
+            )
+        source = layer
+        if scale != 1.0:
+            source = self._scaled(
+                layer,
+                (max(1, int(round(width * scale))), max(1, int(round(height * scale)))),
+            )
+        self._composite_image(
+            frame,
+            source,
+            int(round(origin_x + part[0] * scale)),
+            int(round(origin_y + part[1] * scale)),
+            clip_rect=clip,
+            opacity=transform.opacity,
+        )
+        self.surface_pool.release(layer)
 
-        container_layer = PILImage.new("RGBA", (width, height), (0, 0, 0, 0))
-        draw_ctx = ImageDraw.Draw(container_layer, "RGBA")
-        self._draw_widget_body(container_layer, widget, 0, 0)
-        self._render_children(
-            container_layer,
-            draw_ctx,
-            self._safe_attr(widget, "children", []),
-            parent_x=0,
-            parent_y=0,
-            parent_visible=True,
-            clip_rect=(0, 0, width, height),
+    def _replay_subtree(self, frame, level, op, offset_x, offset_y, clip):
+        """Composite a container child and its descendants from cached tiles."""
+        with self._lock:
+            cached = self.subtree_cache.get(id(op.widget))
+            if cached is None:
+                cached = SubtreeTileCache(SUBTREE_TILE_SIZE, MAX_SUBTREE_TILES)
+                self.subtree_cache[id(op.widget)] = cached
+        transform = op.transform
+        opacity = 1.0
+        abs_x = op.x + offset_x
+        abs_y = op.y + offset_y
+        if transform is not None:
+            if transform.scale != 1.0:
+                self._replay_transformed(frame, op, offset_x, offset_y, clip, cached)
+                return
+            if transform.opacity <= 0.0:
+                return
+            # Translated and faded tiles are composited straight onto frame.
+            opacity = transform.opacity
+            abs_x += transform.translate_x
+            abs_y += transform.translate_y
+        occluders = [
+            (
+                occluder.opaque[0] + offset_x,
+                occluder.opaque[1] + offset_y,
+                occluder.opaque[2] + offset_x,
+                occluder.opaque[3] + offset_y,
+            )
+            for occluder in level.occluders
+            if occluder.index > op.index
+        ]
+        self._composite_tiles(
+            frame, cached, op, abs_x, abs_y, clip, occluders, opacity
         )
-        return container_layer
-
-    def _render_children(
-        self,
-        frame,
-        draw_ctx,
-        children,
-        parent_x=0,
-        parent_y=0,
-        parent_visible=True,
-        clip_rect=None,
+
+    def _composite_tiles(
+        self, frame, cached, op, abs_x, abs_y, clip, occluders, opacity=1.0
     ):
-        # Widget lists are kept front-to-back for hit testing (index 0 is topmost).
-        # Rendering must be back-to-front so lower layers are painted first.
-        for child in reversed(children):
-            child_visible = self._is_widget_visible(child, parent_visible=parent_visible)
-            if not child_visible:
-                continue
-
-            child_x = parent_x + int(self._safe_attr(child, "x", 0) or 0)
-            child_y = parent_y + int(self._safe_attr(child, "y", 0) or 0)
-            child_width = int(self._safe_attr(child, "width", 0) or 0)
-            child_height = int(self._safe_attr(child, "height", 0) or 0)
-            child_children = self._safe_attr(child, "children", [])
-            if (
-                clip_rect is not None
-                and not self._intersects_clip(
-                    child_x, child_y, child_width, child_height, clip_rect
+        """Composite the tiles of a subtree whose origin is at (abs_x, abs_y)."""
+        stats = self._stats()
+        size = cached.tile_size
+        first_x = (clip[0] - abs_x) // size
+        last_x = (clip[2] - abs_x - 1) // size
+        first_y = (clip[1] - abs_y) // size
+        last_y = (clip[3] - abs_y - 1) // size
+        for tile_y in range(first_y, last_y + 1):
+            for tile_x in range(first_x, last_x + 1):
+                tile_left = abs_x + tile_x * size
+                tile_top = abs_y + tile_y * size
+                tile_clip = display_list._intersect(
+                    (tile_left, tile_top, tile_left + size, tile_top + size), clip
                 )
-                and not child_children
-            ):
-                continue
-            if self._is_container_layer_widget(child):
-                container_layer = self._render_container_layer(child)
-                if container_layer is not None:
+                if tile_clip is None:
+                    continue
+                if occluders:
+                    visible = self._unoccluded_rect(tile_clip, occluders)
+                    if visible is None:
+                        stats["occluded_pixels"] += display_list._area(tile_clip)
+                        continue
+                    tile_clip = visible
+                with self._lock:
+                    tile = cached.get_tile((tile_x, tile_y))
+                if tile is _MISSING:
+                    rendered = self._render_subtree_tile(cached, op, tile_x, tile_y)
+                    with self._lock:
+                        # Another render thread may have rendered it meanwhile.
+                        tile = cached.get_tile((tile_x, tile_y))
+                        if tile is _MISSING:
+                            cached.put_tile(
+                                (tile_x, tile_y),
+                                rendered,
+                                self._tile_releases or self.surface_pool,
+                            )
+                            tile = rendered
+                            rendered = None
+                    self.surface_pool.release(rendered)
+                    stats["subtree_tiles_rendered"] += 1
+                else:
+                    stats["subtree_tiles_reused"] += 1
+                if tile is not None:
                     self._composite_image(
                         frame,
-                        container_layer,
-                        child_x,
-                        child_y,
-                        clip_rect=clip_rect,
+                        tile,
+                        tile_left,
+                        tile_top,
+                        clip_rect=tile_clip,
+                        opacity=opacity,
+                    )
+
+    def _prune_subtree_cache(self, live_widget_ids):
+        for root_id in list(self.subtree_cache):
+            if root_id not in live_widget_ids:
+                self.subtree_cache.pop(root_id).clear(self.surface_pool)
+
+    def _drop_subtree_cache(self):
+        for cached in self.subtree_cache.values():
+            cached.clear(self.surface_pool)
+        self.subtree_cache.clear()
+
+    def _sync_display_list(self):
+        """Apply the widget changes reported since the last frame."""
+        changed = self._changed_widgets
+        self._changed_widgets = {}
+        if self._display_list_stale:
+            if changed:
+                # Where the changed widgets were drawn goes with the old list.
+                self._full_damage = True
+            self.display_list.compile()
+            self._display_list_stale = False
+        else:
+            for widget in changed.values():
+                self.display_list.update(widget)
+        screen_damage = self.display_list.screen_damage
+        self.display_list.screen_damage = []
+        if screen_damage is None:
+            self._full_damage = True
+        elif not self._full_damage:
+            for rect in screen_damage:
+                rect = self._clip_damage_rect(rect)
+                if rect is not None:
+                    self._damage_rects.append(rect)
+
+        for level in self.display_list.damaged_levels:
+            cached = self.subtree_cache.get(id(level.owner.widget))
+            if cached is not None:
+                if level.damage is None:
+                    cached.clear(self.surface_pool)
+                else:
+                    cached.invalidate(level.damage, self.surface_pool)
+            level.damage = []
+        self.display_list.damaged_levels.clear()
+        self._prune_subtree_cache(self.display_list.subtrees)
+
+    def _acquire_back_buffer(self):
+        size = (self.width, self.height)
+        pool = self.surface_pool
+        frame = self._back_buffer
+        self._back_buffer = None
+        if frame is None or pool.surface_size(frame) != size:
+            return pool.new_surface(size)
+        pool.clear_surface(frame)
+        return frame
+
+    def _swap_buffers(self, frame):
+        previous = self._last_frame
+        size = self.surface_pool.surface_size(frame)
+        if previous is not frame and self.surface_pool.surface_size(previous) == size:
+            self._back_buffer = previous
+        self._last_frame = frame
+
+    def _render_full_frame(self):
+        frame = self._acquire_back_buffer()
+        bounds = (0, 0, self.width, self.height)
+        if self.render_threads > 1:
+            self._render_tiled(frame, [bounds])
+        else:
+            self._replay(frame, self.display_list.root, 0, 0, bounds)
+        self.raster_cache.prune(self.display_list.widget_ids())
+        self.render_stats["full_repaints"] += 1
+        self.render_stats["repainted_pixels"] += self.width * self.height
+        return frame
+
+    def _repaint_region(self, frame, rect):
+        """Re-render the widgets intersecting rect onto the persistent frame."""
+        left, top, right, bottom = rect
+        width = right - left
+        height = bottom - top
+        region = self.surface_pool.acquire((width, height))
+        self._replay(region, self.display_list.root, -left, -top, (0, 0, width, height))
+        # paste (not alpha_composite) so the region fully replaces stale pixels.
+        self._paste_surface(frame, region, left, top)
+        self.surface_pool.release(region)
+        self.render_stats["repainted_pixels"] += width * height
+
+    def _repaint_regions(self, frame, regions):
+        if self.render_threads > 1:
+            self._render_tiled(frame, regions)
+            self.render_stats["repainted_pixels"] += sum(
+                display_list._area(rect) for rect in regions
+            )
+            return
+        for rect in regions:
+            self._repaint_region(frame, rect)
+
+    def _split_into_tiles(self, regions):
+        """Cut regions along the RENDER_TILE_SIZE grid.
+
+        Returns the tiles and a map from grid cell to the indices of its tiles.
+        """
+        size = RENDER_TILE_SIZE
+        tiles = []
+        cells = {}
+        for left, top, right, bottom in regions:
+            for cell_y in range(top // size, (bottom - 1) // size + 1):
+                for cell_x in range(left // size, (right - 1) // size + 1):
+                    cells.setdefault((cell_x, cell_y), []).append(len(tiles))
+                    tiles.append(
+                        (
+                            max(left, cell_x * size),
+                            max(top, cell_y * size),
+                            min(right, (cell_x + 1) * size),
+                            min(bottom, (cell_y + 1) * size),
+                        )
                     )
+        return tiles, cells
+
+    def _bin_root_ops(self, tiles, cells):
+        """Hand each tile the culled window-level ops that touch it."""
+        size = RENDER_TILE_SIZE
+        root = self.display_list.root
+        tile_ops = [[] for _tile in tiles]
+        everywhere = range(len(tiles))
+        stats = self.render_stats
+        for op in root.ops:
+            if op.cull_version != root.cull_version:
+                self._cull_op(root, op)
+            if op.kind == display_list.BODY:
+                if op.raster is None and op.visible_rect is None:
+                    # Text and images only know their extent once rasterized.
+                    self._op_raster(op)
+                    self._cull_op(root, op)
+                if op.raster is False:
+                    continue
+            visible = op.visible_rect
+            if visible is None:
+                targets = everywhere
+            else:
+                rect = op.bounds if visible is False else visible
+                targets = []
+                for cell_y in range(rect[1] // size, (rect[3] - 1) // size + 1):
+                    for cell_x in range(rect[0] // size, (rect[2] - 1) // size + 1):
+                        for index in cells.get((cell_x, cell_y), ()):
+                            if display_list._intersect(rect, tiles[index]):
+                                targets.append(index)
+                if not targets:
+                    continue
+                if visible is False:
+                    stats["occluded_widgets"] += 1
+                    stats["occluded_pixels"] += op.occluded_area
                     continue
+                if op.occluded_area:
+                    stats["occluded_pixels"] += op.occluded_area
+            for index in targets:
+                tile_ops[index].append(op)
+        return tile_ops
 
-            self._draw_widget_body(frame, child, child_x, child_y, clip_rect=clip_rect)
-            if child_children:
-                self._render_children(
-                    frame,
-                    draw_ctx,
-                    child_children,
-                    child_x,
-                    child_y,
-                    parent_visible=child_visible,
-                    clip_rect=clip_rect,
-                )
+    def _render_tile(self, rect, ops):
+        left, top, right, bottom = rect
+        self._local.stats = stats = Counter()
+        try:
+            surface = self.surface_pool.acquire((right - left, bottom - top))
+            self._replay(
+                surface,
+                self.display_list.root,
+                -left,
+                -top,
+                (0, 0, right - left, bottom - top),
+                ops=ops,
+            )
+        finally:
+            del self._local.stats
+        return surface, stats
 
-    def render_if_due(self):
-        now = time.time()
+    def _render_tiled(self, frame, regions):
+        """Repaint regions of frame tile by tile on the render threads."""
+        tiles, cells = self._split_into_tiles(regions)
+        tile_ops = self._bin_root_ops(tiles, cells)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.render_threads, thread_name_prefix="ntk-render"
+            )
+        # Cached subtree tiles evicted mid-frame may still be composited elsewhere.
+        self._tile_releases = _DeferredReleases(self.surface_pool)
+        futures = {
+            self._executor.submit(self._render_tile, rect, ops): rect
+            for rect, ops in zip(tiles, tile_ops)
+        }
+        try:
+            for future in as_completed(futures):
+                surface, stats = future.result()
+                rect = futures[future]
+                # paste (not alpha_composite) so the tile replaces stale pixels.
+                self._paste_surface(frame, surface, rect[0], rect[1])
+                self.surface_pool.release(surface)
+                for name, value in stats.items():
+                    self.render_stats[name] += value
+        finally:
+            wait(futures)
+            self._tile_releases.flush()
+            self._tile_releases = None
+        self.render_stats["render_tiles"] += len(tiles)
+
+    def close(self):
+        """Stop the render threads, if any were started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @property
+    def redraw_pending(self):
+        return self._redraw_requested
+
+    def next_frame_delay(self):
+        """Seconds until render_if_due may draw the next frame (0 when due)."""
+        return max(0.0, self._last_render + self.frame_interval - self._now())
+
+    def _begin_frame(self):
+        """Return the frame time when a frame is due and needed, else None."""
+        now = self._now()
         if now - self._last_render < self.frame_interval:
             return None
         if not self._redraw_requested:
             self._last_render = now
+            self._redraw_requested_at = None
             return None
+        self._sync_display_list()
+        return now
 
-        frame = PILImage.new("RGBA", (self.width, self.height), (0, 0, 0, 0))
-        draw_ctx = ImageDraw.Draw(frame, "RGBA")
-        self._render_children(
-            frame,
-            draw_ctx,
-            self.window.children,
-            parent_x=0,
-            parent_y=0,
-            parent_visible=True,
-        )
-        self._last_render = now
-        self._last_frame = frame
+    def _finish_frame(self, now):
+        self.render_stats["frames"] += 1
+        self._damage_rects = []
+        self._full_damage = False
+        self._advance_frame_deadline(now)
         self._redraw_requested = False
+        self._redraw_requested_at = None
+
+    def render_if_due(self):
+        now = self._begin_frame()
+        if now is None:
+            return None
+
+        frame = self._last_frame
+        regions = None
+        if (
+            not self._full_damage
+            and self._damage_rects
+            and self.surface_pool.surface_size(frame) == (self.width, self.height)
+        ):
+            regions = self._merge_damage_rects(self._damage_rects)
+
+        if regions is None:
+            frame = self._render_full_frame()
+        else:
+            self._repaint_regions(frame, regions)
+            self.render_stats["partial_repaints"] += 1
+
+        self.last_damage = regions
+        self._swap_buffers(frame)
+        self._finish_frame(now)
         return frame
 
+    def compose_if_due(self):
+        """Build a layer_compositor.CompositorScene when a frame is due.
+
+        Widget bodies are rasterized into cached layers as usual, but nothing
+        is painted into a frame; the GL side composites the scene's quads.
+        """
+        now = self._begin_frame()
+        if now is None:
+            return None
+        if self.compositor is None:
+            self.compositor = layer_compositor.LayerCompositor(self)
+        scene = self.compositor.compose()
+        self.raster_cache.prune(self.display_list.widget_ids())
+        self.last_damage = None
+        self._finish_frame(now)
+        return scene
+
+    def _advance_frame_deadline(self, now):
+        """Record the slot this frame was drawn for.
+
+        On-time frames keep the fixed cadence so timer rounding does not drift.
+        When whole intervals were missed under load they are dropped and the
+        cadence restarts from now instead of bursting to catch up.
+        """
+        requested_at = self._redraw_requested_at
+        if requested_at is None:
+            requested_at = now
+        deadline = max(self._last_render + self.frame_interval, requested_at)
+        missed = int((now - deadline) / self.frame_interval)
+        if missed > 0:
+            self.render_stats["dropped_frames"] += missed
+            self._last_render = now
+        else:
+            self._last_render = deadline
+
     @property
     def last_frame(self):
         return self._last_frame
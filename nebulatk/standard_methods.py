@@ -195,6 +195,10 @@ def _resolve_text_fill_for_slot(_object, slot):
 
 
 def _request_redraw(_object):
+    # Widgets report their own damage rects; anything else redraws in full.
+    if hasattr(_object, "_request_redraw"):
+        _object._request_redraw()
+        return
     requester = getattr(_object, "master", None)
     if requester is not None and hasattr(requester, "request_redraw"):
         requester.request_redraw()
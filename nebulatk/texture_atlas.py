@@ -0,0 +1,353 @@
+"""Packs compositor layers into shared GL texture pages.
+
+Layers are keyed by a hash of their pixels, so widgets that rasterize to the
+same bitmap (a grid of identical image buttons, say) share one region, and
+quads from any number of layers on a page can be drawn with one texture
+bound. Regions are reference counted. Unreferenced ones stay resident until
+space is needed, and a page whose live regions fill too little of it is
+repacked before another page is created.
+
+The atlas only does bookkeeping; a backend object owns the textures:
+
+    backend.create_page(width, height) -> page
+    backend.upload(page, uploads)  # [((left, top, right, bottom), pixels)]
+    backend.delete_page(page)
+"""
+
+import hashlib
+from collections import OrderedDict
+
+# Width and height of a shared atlas page, in pixels.
+ATLAS_PAGE_SIZE = 2048
+# Transparent pixels kept around each region so filtering never samples a
+# neighbour.
+ATLAS_PADDING = 1
+# A page whose live regions cover less than this share of it is repacked
+# when an allocation does not fit, instead of opening another page.
+DEFRAG_FILL_RATIO = 0.5
+# New shelves are rounded up to this many pixels so similar heights share.
+SHELF_ROUNDING = 4
+
+
+def content_key(width, height, pixels):
+    """Key identifying a layer by its size and RGBA pixels."""
+    return (int(width), int(height), hashlib.blake2b(pixels, digest_size=16).digest())
+
+
+class _Shelf:
+    __slots__ = ("y", "height", "spans")
+
+    def __init__(self, y, height, width):
+        self.y = y
+        self.height = height
+        # Free (x, width) runs, sorted by x.
+        self.spans = [(0, width)]
+
+
+class ShelfPacker:
+    """Allocates rects on a page in horizontal shelves.
+
+    A rect goes on the lowest-waste shelf that is tall enough and has a free
+    run wide enough, otherwise on a new shelf below the others. Freed runs
+    are merged and reused; empty shelves at the bottom are given back.
+    """
+
+    def __init__(self, width, height):
+        self.width = int(width)
+        self.height = int(height)
+        self.shelves = []
+        self.used_area = 0
+
+    @property
+    def fill(self):
+        return self.used_area / float(self.width * self.height)
+
+    def allocate(self, width, height):
+        """Return the (x, y) of a free width x height rect, or None."""
+        if width <= 0 or height <= 0 or width > self.width or height > self.height:
+            return None
+        best = None
+        for shelf in self.shelves:
+            if shelf.height < height:
+                continue
+            if best is not None and shelf.height >= best.height:
+                continue
+            if any(span_width >= width for _x, span_width in shelf.spans):
+                best = shelf
+        # Open a new shelf rather than waste most of a much taller one.
+        if best is None or best.height > height * 2:
+            bottom = self.shelves[-1].y + self.shelves[-1].height if self.shelves else 0
+            shelf_height = min(
+                self.height - bottom,
+                -(-height // SHELF_ROUNDING) * SHELF_ROUNDING,
+            )
+            if shelf_height >= height:
+                best = _Shelf(bottom, shelf_height, self.width)
+                self.shelves.append(best)
+        if best is None:
+            return None
+        for index, (x, span_width) in enumerate(best.spans):
+            if span_width >= width:
+                if span_width == width:
+                    del best.spans[index]
+                else:
+                    best.spans[index] = (x + width, span_width - width)
+                self.used_area += width * height
+                return x, best.y
+        return None
+
+    def free(self, x, y, width, height):
+        for shelf in self.shelves:
+            if shelf.y == y:
+                break
+        else:
+            return
+        spans = shelf.spans
+        spans.append((x, width))
+        spans.sort()
+        merged = [spans[0]]
+        for span_x, span_width in spans[1:]:
+            last_x, last_width = merged[-1]
+            if last_x + last_width == span_x:
+                merged[-1] = (last_x, last_width + span_width)
+            else:
+                merged.append((span_x, span_width))
+        shelf.spans = merged
+        self.used_area -= width * height
+        while self.shelves and self.shelves[-1].spans == [(0, self.width)]:
+            self.shelves.pop()
+
+
+class _Region:
+    __slots__ = ("key", "page", "x", "y", "width", "height", "pixels", "refs", "uv")
+
+    def __init__(self, key, page, x, y, width, height, pixels):
+        self.key = key
+        self.page = page
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        # Kept so the page can be repacked without reading texture memory.
+        self.pixels = pixels
+        self.refs = 1
+        self.uv = None
+
+
+class _Page:
+    __slots__ = ("texture", "packer", "regions", "shared")
+
+    def __init__(self, texture, width, height, shared=True):
+        self.texture = texture
+        self.packer = ShelfPacker(width, height)
+        self.regions = set()
+        # False for a page sized to one layer too large for a shared page.
+        self.shared = shared
+
+
+class TextureAtlas:
+    """Reference-counted, content-keyed layer regions on shared texture pages.
+
+    Layers too large for a page get a page of their own.
+    """
+
+    def __init__(
+        self,
+        backend,
+        page_size=ATLAS_PAGE_SIZE,
+        padding=ATLAS_PADDING,
+        defrag_fill=DEFRAG_FILL_RATIO,
+    ):
+        self.backend = backend
+        self.page_size = int(page_size)
+        self.padding = max(0, int(padding))
+        self.defrag_fill = float(defrag_fill)
+        self.pages = []
+        self._regions = {}
+        # Unreferenced regions, least recently released first.
+        self._idle = OrderedDict()
+        self._uploads = {}
+        self.stats = {"uploads": 0, "shared": 0, "evictions": 0, "defrags": 0}
+
+    def __len__(self):
+        return len(self._regions)
+
+    def __contains__(self, key):
+        return key in self._regions
+
+    def acquire(self, key, width, height, pixels=None):
+        """Take a reference to the region holding key, adding it if needed.
+
+        pixels may be None when key is known to be resident already.
+
+        Returns:
+            tuple: (page, u0, v0, u1, v1), or None when key is not resident
+                and no pixels were given.
+        """
+        region = self._regions.get(key)
+        if region is not None:
+            if region.refs == 0:
+                del self._idle[key]
+            region.refs += 1
+            self.stats["shared"] += 1
+            return region.uv
+        if pixels is None:
+            return None
+        region = self._place(key, int(width), int(height), pixels)
+        self._regions[key] = region
+        self.stats["uploads"] += 1
+        return region.uv
+
+    def release(self, key):
+        """Drop a reference; unreferenced regions stay until space is needed."""
+        region = self._regions.get(key)
+        if region is None or region.refs == 0:
+            return
+        region.refs -= 1
+        if region.refs == 0:
+            self._idle[key] = region
+
+    def region(self, key):
+        """The (page, u0, v0, u1, v1) of a resident key, or None."""
+        region = self._regions.get(key)
+        return None if region is None else region.uv
+
+    def flush(self):
+        """Hand the uploads queued since the last flush to the backend."""
+        uploads = self._uploads
+        self._uploads = {}
+        for page, page_uploads in uploads.items():
+            self.backend.upload(page.texture, page_uploads)
+
+    def clear(self):
+        for page in self.pages:
+            self.backend.delete_page(page.texture)
+        self.pages = []
+        self._regions.clear()
+        self._idle.clear()
+        self._uploads = {}
+
+    def _place(self, key, width, height, pixels):
+        padded_width = width + 2 * self.padding
+        padded_height = height + 2 * self.padding
+        if padded_width > self.page_size or padded_height > self.page_size:
+            page = self._add_page(padded_width, padded_height, shared=False)
+            return self._try_put(page, key, width, height, pixels)
+        for page in self.pages:
+            region = self._try_put(page, key, width, height, pixels)
+            if region is not None:
+                return region
+        # Make room: drop unreferenced regions, then repack sparse pages.
+        while self._idle:
+            _key, idle = self._idle.popitem(last=False)
+            self._evict(idle)
+            region = self._try_put(idle.page, key, width, height, pixels)
+            if region is not None:
+                return region
+        for page in self.pages:
+            if not page.shared or page.packer.fill >= self.defrag_fill:
+                continue
+            if self._repack(page):
+                region = self._try_put(page, key, width, height, pixels)
+                if region is not None:
+                    return region
+        page = self._add_page(self.page_size, self.page_size)
+        return self._try_put(page, key, width, height, pixels)
+
+    def _add_page(self, width, height, shared=True):
+        page = _Page(self.backend.create_page(width, height), width, height, shared)
+        self.pages.append(page)
+        return page
+
+    def _try_put(self, page, key, width, height, pixels):
+        if page not in self.pages or (page.regions and not page.shared):
+            return None
+        place = page.packer.allocate(
+            width + 2 * self.padding, height + 2 * self.padding
+        )
+        if place is None:
+            return None
+        region = _Region(key, page, place[0], place[1], width, height, pixels)
+        self._position(region)
+        page.regions.add(region)
+        return region
+
+    def _position(self, region):
+        page = region.page
+        padding = self.padding
+        left = region.x + padding
+        top = region.y + padding
+        page_width = float(page.packer.width)
+        page_height = float(page.packer.height)
+        region.uv = (
+            page.texture,
+            left / page_width,
+            top / page_height,
+            (left + region.width) / page_width,
+            (top + region.height) / page_height,
+        )
+        self._uploads.setdefault(page, []).append(
+            (
+                (
+                    region.x,
+                    region.y,
+                    region.x + region.width + 2 * padding,
+                    region.y + region.height + 2 * padding,
+                ),
+                _pad(region.pixels, region.width, region.height, padding),
+            )
+        )
+
+    def _evict(self, region):
+        page = region.page
+        page.regions.discard(region)
+        del self._regions[region.key]
+        page.packer.free(
+            region.x,
+            region.y,
+            region.width + 2 * self.padding,
+            region.height + 2 * self.padding,
+        )
+        self.stats["evictions"] += 1
+        if not page.regions and (not page.shared or len(self.pages) > 1):
+            self.pages.remove(page)
+            self._uploads.pop(page, None)
+            self.backend.delete_page(page.texture)
+
+    def _repack(self, page):
+        """Re-place a page's regions tallest first; False if they no longer fit."""
+        packer = ShelfPacker(page.packer.width, page.packer.height)
+        regions = sorted(page.regions, key=lambda region: -region.height)
+        places = []
+        for region in regions:
+            place = packer.allocate(
+                region.width + 2 * self.padding, region.height + 2 * self.padding
+            )
+            if place is None:
+                return False
+            places.append(place)
+        page.packer = packer
+        self._uploads[page] = []
+        for region, (x, y) in zip(regions, places):
+            region.x = x
+            region.y = y
+            self._position(region)
+        self.stats["defrags"] += 1
+        return True
+
+
+def _pad(pixels, width, height, padding):
+    """RGBA rows of pixels with a transparent border padding pixels wide."""
+    if padding == 0:
+        return pixels
+    pixels = memoryview(pixels).cast("B")
+    row_bytes = width * 4
+    side = bytes(padding * 4)
+    blank = bytes((width + 2 * padding) * 4)
+    rows = [blank] * padding
+    for row in range(height):
+        rows.append(side)
+        rows.append(pixels[row * row_bytes : (row + 1) * row_bytes])
+        rows.append(side)
+    rows.extend([blank] * padding)
+    return b"".join(rows)
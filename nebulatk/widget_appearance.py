@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from collections import namedtuple
+
 
 IMAGE_SLOT_FALLBACKS = {
     "hover_object_active": [
@@ -28,6 +30,11 @@ BG_SLOT_FALLBACKS = {
 }
 
 
+# Compositor-only placement of a widget's cached layer: shifted by whole
+# pixels, scaled about its center and faded by opacity (0.0 - 1.0).
+LayerTransform = namedtuple("LayerTransform", "translate_x translate_y scale opacity")
+
+
 def safe_getattr(obj, name, default=None):
     try:
         return getattr(obj, name)
@@ -43,6 +50,24 @@ def is_widget_visible(widget, parent_visible=True):
     )
 
 
+def layer_transform(widget, render_scale=1.0):
+    """Return the widget's LayerTransform, or None when it is the identity.
+
+    The translation is in frame pixels of a frame rasterized at render_scale.
+    """
+    translate_x = safe_getattr(widget, "translate_x", 0) or 0
+    translate_y = safe_getattr(widget, "translate_y", 0) or 0
+    translate_x = int(round(translate_x * render_scale))
+    translate_y = int(round(translate_y * render_scale))
+    scale = safe_getattr(widget, "scale", 1.0)
+    scale = 1.0 if scale is None else max(0.0, float(scale))
+    opacity = safe_getattr(widget, "opacity", 1.0)
+    opacity = 1.0 if opacity is None else min(1.0, max(0.0, float(opacity)))
+    if not translate_x and not translate_y and scale == 1.0 and opacity == 1.0:
+        return None
+    return LayerTransform(translate_x, translate_y, scale, opacity)
+
+
 def resolve_slot_value(widget, slot, fallback_map, default_attrs):
     attrs = fallback_map.get(slot, list(default_attrs))
     for attr in attrs:
@@ -22,6 +22,9 @@ class Component:
     def __init__(self, width=0, height=0, x=0, y=0, **kwargs):
         self._position = [x, y]
         self._size = [width, height]
+        self._translate = [0, 0]
+        self._scale = 1.0
+        self._opacity = 1.0
 
     def _update_children(self, children=None, command="update"):
         if children is None:
@@ -104,6 +107,58 @@ class Component:
 
         self.resize(self.width, height)
 
+    # Compositor properties: they move, scale or fade the widget's cached
+    # layer (with its children) without re-rendering it. Layout and hit
+    # testing keep using x, y, width and height.
+    _COMPOSITOR_PROPERTIES = frozenset(
+        ("translate_x", "translate_y", "scale", "opacity")
+    )
+
+    @property
+    def translate_x(self):
+        return self._translate[0]
+
+    @translate_x.setter
+    def translate_x(self, value):
+        self._translate[0] = value
+        self._request_composite()
+
+    @property
+    def translate_y(self):
+        return self._translate[1]
+
+    @translate_y.setter
+    def translate_y(self, value):
+        self._translate[1] = value
+        self._request_composite()
+
+    @property
+    def scale(self):
+        """Scale factor about the widget's center."""
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._scale = value
+        self._request_composite()
+
+    @property
+    def opacity(self):
+        """Opacity from 0.0 (invisible) to 1.0 (opaque)."""
+        return self._opacity
+
+    @opacity.setter
+    def opacity(self, value):
+        self._opacity = value
+        self._request_composite()
+
+    def _request_composite(self):
+        master = getattr(self, "master", None)
+        if getattr(self, "initialized", False) and hasattr(
+            master, "request_composite"
+        ):
+            master.request_composite(self)
+
 
 # Initialize base methods for all widgets.
 # This is largely so we don't ever need to initialize methods that will never be used (e.g. hovered on a frame)
@@ -1029,9 +1084,31 @@ class _widget(_widget_properties, Component):
             x, y = standard_methods.abs_position_to_rel(self, x, y)
             self.dragging_command(x, y)
 
+    def _damage_rect(self):
+        """Return the widget's absolute (left, top, right, bottom) screen rect."""
+        try:
+            abs_x, abs_y = standard_methods.rel_position_to_abs(self, self.x, self.y)
+            width = int(self.width or 0)
+            height = int(self.height or 0)
+        except (AttributeError, TypeError, ValueError):
+            return None
+        return (int(abs_x), int(abs_y), int(abs_x) + width, int(abs_y) + height)
+
+    def _collect_damage_rects(self):
+        """Return the rect this widget covers now.
+
+        Where it was drawn before is damaged by the renderer, from its display
+        list, since only that knows where the widget last ended up on screen.
+        """
+        current = self._damage_rect()
+        return [current] if current is not None else []
+
     def _request_redraw(self):
         if hasattr(self.master, "request_redraw"):
-            self.master.request_redraw()
+            # Fall back to a full redraw if the widget has no usable geometry.
+            self.master.request_redraw(
+                self._collect_damage_rects() or None, widget=self
+            )
 
     def _input_owner(self):
         return getattr(self.master, "_window", self.master)
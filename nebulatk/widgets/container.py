@@ -141,15 +141,27 @@ class Container(Component):
     def typing_up(self, event):
         pass
 
-    def request_redraw(self):
-        self._window.request_redraw()
+    def request_redraw(self, rects=None, widget=None):
+        self._window.request_redraw(rects, widget=widget)
+
+    def request_composite(self, widget):
+        self._window.request_composite(widget)
+
+    def _damage_rect(self):
+        abs_x, abs_y = standard_methods.rel_position_to_abs(self, self.x, self.y)
+        return (
+            int(abs_x),
+            int(abs_y),
+            int(abs_x) + int(self.width or 0),
+            int(abs_y) + int(self.height or 0),
+        )
 
     def configure(self, _object=None, **kwargs):
         if _object is not None:
             return
         for key, value in kwargs.items():
             setattr(self, key, value)
-        self.request_redraw()
+        self.request_redraw(widget=self)
 
     def _show(self, root):
         pass
@@ -158,9 +170,10 @@ class Container(Component):
         pass
 
     def place(self, x, y):
+        previous_rect = self._damage_rect()
         self._container_x = x
         self._container_y = y
-        self.request_redraw()
+        self.request_redraw([previous_rect, self._damage_rect()], widget=self)
         return self
 
     def hovered(self):
@@ -222,10 +235,11 @@ class Container(Component):
             child.destroy()
         self.children.clear()
 
+        damage_rect = self._damage_rect()
         if hasattr(self._root, "children") and self in self._root.children:
             self._root.children.remove(self)
 
-        self.request_redraw()
+        self.request_redraw([damage_rect], widget=self)
 
     def begin_render_batch(self):
         if hasattr(self._window, "begin_render_batch"):
@@ -1,5 +1,6 @@
 import os
 import sys
+from types import SimpleNamespace
 
 import pytest
 
@@ -10,6 +11,53 @@ sys.path.insert(
 import nebulatk as ntk
 
 
+def make_widget(
+    x,
+    y,
+    width,
+    height,
+    fill,
+    visible=True,
+    root=None,
+    border=None,
+    border_width=0,
+):
+    """A bare widget stand-in carrying just what the renderers read."""
+    return SimpleNamespace(
+        x=x,
+        y=y,
+        width=width,
+        height=height,
+        fill=fill,
+        visible=visible,
+        _render_visible=True,
+        border_width=border_width,
+        border=border,
+        text="",
+        font=None,
+        children=[],
+        root=root,
+    )
+
+
+def make_layered_scene():
+    """A scrolled container of rows under a bordered overlay, over a background.
+
+    Returns the window's children and the container's content widget.
+    """
+    container = make_widget(3, 5, 12, 10, None)
+    container._is_container_layer = True
+    content = make_widget(0, 0, 12, 24, None, root=container)
+    container.children = [content]
+    colors = ["#ff0000ff", "#00ff00ff", "#0000ffff"]
+    for index in range(6):
+        row = make_widget(0, index * 4, 12, 4, colors[index % 3], root=content)
+        content.children.append(row)
+    overlay = make_widget(6, 2, 9, 7, "#00ff0080", border="#000000ff", border_width=1)
+    background = make_widget(0, 0, 20, 20, "#0000ffff")
+    return [overlay, container, background], content
+
+
 class _ClipboardRoot:
     def __init__(self):
         self._clipboard = ""
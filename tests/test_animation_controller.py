@@ -250,3 +250,29 @@ def test_animation_group_stop_is_idempotent():
     group.stop()
     group.stop()
     assert group not in group.widget.master.active_animations
+
+
+def test_compositor_property_animation_skips_widget_updates():
+    class LayerWidget(DummyWidget):
+        _COMPOSITOR_PROPERTIES = frozenset(("translate_x", "opacity"))
+
+        def __init__(self):
+            super().__init__()
+            self.translate_x = 0.0
+            self.opacity = 1.0
+
+    widget = LayerWidget()
+    animation = animation_controller.Animation(
+        widget=widget,
+        target_attributes={"translate_x": 40.0, "opacity": 0.0},
+        duration=1.0,
+        steps=10,
+        threadless=True,
+    )
+    animation.start()
+    for _ in range(2):
+        animation.tick()
+
+    assert widget.translate_x == pytest.approx(4.0)
+    assert widget.update_calls == 0
+    assert widget.place_calls == 0
@@ -0,0 +1,114 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
+)
+
+import display_list
+import pil_image_renderer
+from conftest import make_widget
+
+
+def _compiled(children):
+    window = SimpleNamespace(children=children)
+    renderer = pil_image_renderer.PILImageRenderer(
+        window=window, width=40, height=40, fps=1
+    )
+    renderer.display_list.compile()
+    return renderer, renderer.display_list
+
+
+def test_compile_flattens_widgets_back_to_front_with_subtree_spans():
+    front = make_widget(0, 0, 4, 4, "#ff0000ff")
+    back = make_widget(10, 10, 20, 20, "#0000ffff")
+    child = make_widget(2, 3, 4, 4, "#00ff00ff", root=back)
+    back.children = [child]
+    _, compiled = _compiled([front, back])
+
+    ops = compiled.root.ops
+    assert [op.widget for op in ops] == [back, child, front]
+    assert [op.span for op in ops] == [2, 1, 1]
+    assert (ops[1].x, ops[1].y) == (12, 13)
+    assert ops[1].parent is ops[0]
+
+
+def test_update_re_resolves_only_the_changed_widget(monkeypatch):
+    widgets = [make_widget(index * 5, 0, 4, 4, "#ff0000ff") for index in range(4)]
+    renderer, compiled = _compiled(widgets)
+
+    resolved = []
+    original = renderer._resolve_widget_appearance
+    monkeypatch.setattr(
+        renderer,
+        "_resolve_widget_appearance",
+        lambda widget: resolved.append(widget) or original(widget),
+    )
+    widgets[2].fill = "#00ff00ff"
+    compiled.update(widgets[2])
+
+    assert resolved == [widgets[2]]
+    op = compiled.ops_by_widget[id(widgets[2])]
+    assert op.appearance[0] == original(widgets[2])[0]
+    assert op.raster.surface.getpixel((1, 1)) == (0, 255, 0, 255)
+
+
+def test_moving_a_widget_shifts_its_descendants():
+    parent = make_widget(0, 0, 20, 20, "#0000ffff")
+    child = make_widget(2, 2, 4, 4, "#ff0000ff", root=parent)
+    grandchild = make_widget(1, 1, 2, 2, "#00ff00ff", root=child)
+    child.children = [grandchild]
+    parent.children = [child]
+    _, compiled = _compiled([parent])
+
+    parent.x = 5
+    parent.y = 7
+    compiled.update(parent)
+
+    positions = [(op.x, op.y) for op in compiled.root.ops]
+    assert positions == [(5, 7), (7, 9), (8, 10)]
+
+
+def test_adding_and_removing_children_rebuilds_the_sibling_slice():
+    parent = make_widget(0, 0, 20, 20, "#0000ffff")
+    first = make_widget(0, 0, 4, 4, "#ff0000ff", root=parent)
+    parent.children = [first]
+    sibling = make_widget(30, 30, 4, 4, "#ffffffff")
+    _, compiled = _compiled([sibling, parent])
+    kept_op = compiled.ops_by_widget[id(first)]
+
+    second = make_widget(5, 5, 4, 4, "#00ff00ff", root=parent)
+    parent.children = [second, first]
+    compiled.update(second)
+
+    assert [op.widget for op in compiled.root.ops] == [parent, first, second, sibling]
+    assert compiled.root.ops[0].span == 3
+    assert compiled.ops_by_widget[id(first)] is kept_op
+
+    parent.children = [second]
+    compiled.update(parent)
+
+    assert [op.widget for op in compiled.root.ops] == [parent, second, sibling]
+    assert id(first) not in compiled.ops_by_widget
+
+
+def test_container_children_compile_into_nested_levels():
+    container = make_widget(4, 4, 30, 30, None)
+    container._is_container_layer = True
+    content = make_widget(0, -6, 30, 60, None, root=container)
+    row = make_widget(0, 10, 30, 5, "#ff0000ff", root=content)
+    content.children = [row]
+    container.children = [content]
+    _, compiled = _compiled([container])
+
+    layer_op = compiled.root.ops[0]
+    assert layer_op.kind == display_list.LAYER
+    assert layer_op.child_level.clip == (0, 0, 30, 30)
+
+    subtree_op = layer_op.child_level.ops[1]
+    assert subtree_op.kind == display_list.SUBTREE
+    assert compiled.subtrees == {id(content): subtree_op}
+    assert (subtree_op.x, subtree_op.y) == (0, -6)
+    assert [op.widget for op in subtree_op.child_level.ops] == [content, row]
+    assert (subtree_op.child_level.ops[1].x, subtree_op.child_level.ops[1].y) == (0, 10)
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
+)
+
+import frame_ring
+
+
+@pytest.fixture
+def ring():
+    ring = frame_ring.SharedFrameRing(16, slots=3)
+    yield ring
+    ring.close()
+
+
+def test_reader_sees_frames_written_by_the_owner(ring):
+    reader = frame_ring.SharedFrameRing.attach(ring.name, 16, 3)
+    try:
+        slot, seq, nbytes = ring.write(b"abcdefgh")
+        assert (seq, nbytes) == (1, 8)
+
+        view = reader.view(slot, nbytes)
+        assert bytes(view) == b"abcdefgh"
+        view.release()
+    finally:
+        reader.close()
+
+
+def test_slots_are_reused_only_after_release(ring):
+    written = [ring.write(bytes([index]) * 4) for index in range(3)]
+    assert [seq for _, seq, _ in written] == [1, 2, 3]
+    assert len({slot for slot, _, _ in written}) == 3
+
+    assert ring.write(b"late") is None
+
+    ring.release(1)
+    slot, seq, _ = ring.write(b"next")
+    assert seq == 4
+    assert slot == written[0][0]
+    assert ring.consumed == 1
+
+
+def test_release_never_moves_backwards(ring):
+    ring.release(5)
+    ring.release(2)
+    assert ring.consumed == 5
+
+
+def test_frames_larger_than_a_slot_are_rejected(ring):
+    assert ring.write(b"x" * 17) is None
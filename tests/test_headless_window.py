@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from PIL import Image as PILImage
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
+)
+
+import headless_window
+import nebulatk as ntk
+import numpy_renderer
+import pil_image_renderer
+from conftest import make_widget
+
+
+def test_timers_run_in_virtual_time_order():
+    window = headless_window.HeadlessWindow(20, 10)
+    calls = []
+    window.after(500, lambda: calls.append(("late", window.clock())))
+    cancelled = window.after(100, lambda: calls.append("cancelled"))
+    window.after(
+        200,
+        lambda: window.after(100, lambda: calls.append(("chained", window.clock()))),
+    )
+    window.after_cancel(cancelled)
+
+    window.advance(0.25)
+    assert calls == []
+    window.advance(1.0)
+
+    assert [(name, round(when, 6)) for name, when in calls] == [
+        ("chained", 0.3),
+        ("late", 0.5),
+    ]
+    assert window.clock() == 1.25
+
+
+def test_mainloop_skips_idle_time_and_quits_from_other_threads():
+    window = headless_window.HeadlessWindow(20, 10)
+    fired = threading.Event()
+    window.after(60_000, fired.set)
+    thread = threading.Thread(target=window.mainloop)
+    started = time.monotonic()
+    thread.start()
+
+    assert fired.wait(5.0)
+    assert time.monotonic() - started < 5.0
+    assert window.clock() == 60.0
+
+    window.quit()
+    thread.join(5.0)
+    assert not thread.is_alive()
+    assert not window.available
+
+
+def test_submitted_frames_and_damaged_rects_are_kept():
+    window = headless_window.HeadlessWindow(4, 2)
+    presented = []
+    window.bind("<<FramePresented>>", presented.append)
+    frame = PILImage.new("RGBA", (4, 2), (255, 0, 0, 255))
+
+    window.submit_frame(frame.tobytes(), 4, 2)
+    # Premultiplied half-transparent white, for the right half.
+    window.submit_frame(
+        bytes([128] * 16), 4, 2, premultiplied=True, rects=[(2, 0, 4, 2)]
+    )
+
+    shown = window.frame
+    assert shown.getpixel((0, 0)) == (255, 0, 0, 255)
+    assert shown.getpixel((3, 1)) == (255, 255, 255, 128)
+    assert window.frame_count == len(presented) == 2
+
+
+def test_compositor_scenes_are_composited_like_frames():
+    panel = make_widget(3, 2, 10, 8, "#0000ffff")
+    label = make_widget(1, 1, 4, 3, "#ff000080")
+    label.root = panel
+    panel.children = [label]
+    children = [panel, make_widget(0, 0, 20, 20, "#ffffffff")]
+    for renderer_class in (
+        pil_image_renderer.PILImageRenderer,
+        numpy_renderer.NumpyRenderer,
+    ):
+        window = headless_window.HeadlessWindow(20, 20)
+        renderer = renderer_class(SimpleNamespace(children=children), 20, 20, fps=1)
+        renderer.clock = window.clock
+        window.advance(1.0)
+        window.submit_scene(renderer.compose_if_due())
+
+        reference = pil_image_renderer.PILImageRenderer(
+            SimpleNamespace(children=children), 20, 20, fps=1
+        )
+        reference._last_render = -100.0
+        expected = reference.render_if_due()
+        for pixel in ((2, 2), (4, 3), (8, 6)):
+            assert window.frame.getpixel(pixel) == expected.getpixel(pixel)
+
+
+def test_headless_window_renders_and_handles_input():
+    window = ntk.Window(
+        width=120, height=80, backend="headless", closing_command=lambda: None
+    )
+    try:
+        clicks = []
+        button = ntk.Button(
+            window,
+            width=40,
+            height=20,
+            fill="#ff0000",
+            command=lambda: clicks.append(True),
+        ).place(10, 10)
+        root = window.root
+        presented = threading.Condition()
+
+        def on_presented(_event):
+            with presented:
+                presented.notify_all()
+
+        root.bind("<<FramePresented>>", on_presented)
+
+        def frame_after(change, left):
+            # Waits for a frame presented after the change that shows it.
+            count = root.frame_count
+            change()
+            with presented:
+                assert presented.wait_for(
+                    lambda: root.frame_count > count
+                    and root.frame.getpixel((left, 20)) == (255, 0, 0, 255)
+                    and root.frame.getpixel((left - 1, 20)) != (255, 0, 0, 255),
+                    5.0,
+                )
+            return root.frame
+
+        frame = frame_after(lambda: button.place(8, 10), 8)
+        assert frame.size == (120, 80)
+        assert frame.getpixel((20, 20)) == (255, 0, 0, 255)
+
+        # Frames are paced on the virtual clock, not wall time.
+        start = root.clock()
+        for step in range(30):
+            frame_after(lambda: button.place(12 + step, 10), 12 + step)
+        assert root.clock() - start >= 29 / window.fps
+        assert root.frame.getpixel((70, 20)) == (255, 0, 0, 255)
+
+        root.event_generate("<Button-1>", x=60, y=20)
+        root.event_generate("<ButtonRelease-1>", x=60, y=20)
+        window._execute_in_window_thread(lambda: None)
+        assert clicks == [True]
+    finally:
+        window.close()
+    assert not window.is_alive()
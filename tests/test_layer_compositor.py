@@ -0,0 +1,141 @@
+import os
+import sys
+from types import SimpleNamespace
+
+from PIL import Image as PILImage
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
+)
+
+import layer_compositor
+import pil_image_renderer
+from conftest import make_layered_scene, make_widget
+
+
+def _make_renderer(children):
+    renderer = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=children), width=20, height=20, fps=1
+    )
+    renderer._last_render = -100.0
+    return renderer
+
+
+def _next_scene(renderer):
+    renderer._last_render = -100.0
+    return renderer.compose_if_due()
+
+
+def _composite(scene, layers):
+    """Draw a scene on the CPU the way the GL compositor does."""
+    for layer_id, width, height, pixels, key in scene.layers:
+        if pixels is None:
+            # Shares the pixels of a live layer with the same content.
+            pixels = next(
+                image.tobytes()
+                for image, image_key in layers.values()
+                if image_key == key
+            )
+        image = PILImage.frombytes("RGBA", (width, height), pixels)
+        layers[layer_id] = (image, key)
+    for layer_id in scene.release:
+        del layers[layer_id]
+    frame = PILImage.new("RGBA", (scene.width, scene.height), (0, 0, 0, 0))
+    for quad in scene.quads:
+        left = max(quad.x, quad.clip[0])
+        top = max(quad.y, quad.clip[1])
+        right = min(quad.x + quad.width, quad.clip[2])
+        bottom = min(quad.y + quad.height, quad.clip[3])
+        part = layers[quad.layer][0].crop(
+            (left - quad.x, top - quad.y, right - quad.x, bottom - quad.y)
+        )
+        frame.alpha_composite(part, (left, top))
+    return frame
+
+
+def test_composited_scene_matches_cpu_rendered_frame():
+    children, _content = make_layered_scene()
+    scene = _make_renderer(children).compose_if_due()
+    frame = _make_renderer(children).render_if_due()
+
+    assert not scene.premultiplied
+    assert _composite(scene, {}).tobytes() == frame.tobytes()
+
+
+def test_scrolling_only_moves_quads_without_new_layers():
+    children, content = make_layered_scene()
+    renderer = _make_renderer(children)
+    layers = {}
+    _composite(_next_scene(renderer), layers)
+    misses = renderer.render_stats["raster_cache_misses"]
+
+    content.y = -2
+    renderer.request_redraw([(3, 5, 15, 15)], widget=content)
+    scene = _next_scene(renderer)
+
+    assert scene.layers == []
+    assert renderer.render_stats["raster_cache_misses"] == misses
+    reference = _make_renderer(children).render_if_due()
+    assert _composite(scene, layers).tobytes() == reference.tobytes()
+
+
+def test_container_children_are_clipped_per_quad():
+    children, _content = make_layered_scene()
+    scene = _make_renderer(children).compose_if_due()
+
+    rows = [quad for quad in scene.quads if quad.width == 13 and quad.height == 5]
+    # Rows past the container's bottom edge are not drawn at all.
+    assert len(rows) == 3
+    assert all(quad.clip[3] <= 15 and quad.clip[1] >= 5 for quad in rows)
+
+
+def test_unused_layers_are_released_after_retention():
+    widget = make_widget(2, 2, 4, 4, "#ff0000ff")
+    renderer = _make_renderer([widget])
+    renderer.compositor = layer_compositor.LayerCompositor(renderer, retain_scenes=2)
+    first = _next_scene(renderer)
+    (red_layer,) = [layer[0] for layer in first.layers]
+
+    widget.fill = "#00ff00ff"
+    renderer.request_redraw(widget=widget)
+    second = _next_scene(renderer)
+    assert len(second.layers) == 1
+    assert second.release == []
+    renderer.request_redraw()
+    assert _next_scene(renderer).release == [red_layer]
+    assert len(renderer.compositor) == 1
+
+
+def test_identical_widget_bitmaps_send_their_pixels_once():
+    button_image = PILImage.new("RGBA", (6, 4), (200, 40, 40, 255))
+    buttons = []
+    for index in range(100):
+        button = make_widget((index % 10) * 2, (index // 10) * 2, 6, 4, None)
+        # Like image_manager.Image, every widget holds its own copy.
+        button.image = button_image.copy()
+        buttons.append(button)
+    renderer = _make_renderer(buttons)
+
+    scene = renderer.compose_if_due()
+
+    assert len(scene.layers) == len({quad.layer for quad in scene.quads})
+    assert len({layer[4] for layer in scene.layers}) == 1
+    assert sum(1 for layer in scene.layers if layer[3] is not None) == 1
+    assert renderer.render_stats["layer_uploads"] == 1
+
+
+def test_layer_transforms_are_folded_into_quads():
+    label = make_widget(1, 1, 3, 2, "#ff0000ff")
+    panel = make_widget(2, 2, 8, 6, "#0000ffff")
+    panel.children = [label]
+    label.root = panel
+    panel.translate_y = 4
+    panel.scale = 2.0
+    panel.opacity = 0.25
+
+    scene = _make_renderer([panel]).compose_if_due()
+
+    body, child = scene.quads
+    assert (body.x, body.y, body.width, body.height) == (-2, 3, 18, 14)
+    assert (child.x, child.y, child.width, child.height) == (0, 5, 8, 6)
+    assert body.opacity == child.opacity == 0.25
@@ -0,0 +1,138 @@
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
+)
+
+import native_protocol
+
+RUN_PERF_TESTS = os.environ.get("NTK_RUN_PERF_TESTS") == "1"
+WINDOW_ID = 140234567890
+
+
+def _event(name, x=0, y=0, **fields):
+    message = {"type": "event", "window_id": WINDOW_ID, "name": name, "x": x, "y": y}
+    message.update(fields)
+    return message
+
+
+def _command(**command):
+    return {"type": "command", "window_id": WINDOW_ID, "command": command}
+
+
+def test_hot_messages_round_trip_through_fixed_records():
+    messages = [
+        _event("<Motion>", 10, -4),
+        _event("<Button-1>", 1, 2),
+        _event("<ButtonRelease-1>", 1, 2),
+        _event("<Leave>", 0, 0),
+        _event("<MouseWheel>", 3, 4, delta=-120, delta_x=0, delta_y=-120),
+        _event("<Key>", 5, 6, keysym="BackSpace", char=""),
+        _event("<KeyRelease>", 5, 6, keysym="eacute", char="é"),
+        _command(op="wake"),
+        _command(
+            op="frame",
+            ring=2,
+            slot=1,
+            seq=99,
+            nbytes=64,
+            width=8,
+            height=2,
+            premultiplied=True,
+            rects=[(0, 0, 4, 1), (4, 1, 8, 2)],
+            frame=12,
+        ),
+        {"type": "presented", "window_id": WINDOW_ID, "frame": 12},
+    ]
+
+    decoded = native_protocol.decode_batch(native_protocol.encode_batch(messages))
+
+    assert decoded[0] == messages[0]
+    for original, result in zip(messages[:7], decoded[:7]):
+        for key, value in original.items():
+            assert result[key] == value
+    assert decoded[7] == messages[7]
+    frame = decoded[8]["command"]
+    assert frame.pop("rects") == [(0, 0, 4, 1), (4, 1, 8, 2)]
+    assert frame == {
+        key: value for key, value in messages[8]["command"].items() if key != "rects"
+    }
+    assert decoded[9] == messages[9]
+    assert native_protocol.encode(messages[9])[0] == native_protocol.PRESENTED
+
+
+def test_motion_records_are_small():
+    record = native_protocol.encode(_event("<Motion>", 100, 200))
+    assert record[0] == native_protocol.MOTION
+    assert len(record) == 17
+
+
+def test_rare_messages_fall_back_to_pickled_records():
+    messages = [
+        {"type": "size", "window_id": WINDOW_ID, "width": 3, "height": 4},
+        {"type": "response", "window_id": WINDOW_ID, "request_id": "r", "value": "x"},
+        _command(op="frame", width=1, height=1, frame_rgba=b"\x00" * 4),
+        _command(op="title", value="ntk"),
+        _event("<Motion>", 1, 1) | {"window_id": "not-an-int"},
+    ]
+
+    data = native_protocol.encode_batch(messages)
+
+    assert native_protocol.decode_batch(data) == messages
+
+
+def _send_events(conn, transport, count, batch):
+    motion = _event("<Motion>", 100, 200)
+    motion.update(keysym="", char="", delta=0, delta_x=0, delta_y=0, num=0)
+    for start in range(0, count, batch):
+        chunk = [motion] * min(batch, count - start)
+        if transport == "queue":
+            for message in chunk:
+                conn.put(message)
+        else:
+            conn.send_bytes(native_protocol.encode_batch(chunk))
+
+
+@pytest.mark.skipif(
+    not RUN_PERF_TESTS,
+    reason="Set NTK_RUN_PERF_TESTS=1 to run the protocol micro-benchmark.",
+)
+def test_protocol_micro_benchmark_against_pickled_queue():
+    ctx = mp.get_context("spawn")
+    count = 50000
+    rates = {}
+    for transport, batch in (("queue", 1), ("pipe", 1), ("pipe", 32)):
+        if transport == "queue":
+            receiver = sender = ctx.Queue()
+        else:
+            receiver, sender = ctx.Pipe(duplex=False)
+        process = ctx.Process(
+            target=_send_events, args=(sender, transport, count, batch)
+        )
+        process.start()
+
+        def receive():
+            if transport == "queue":
+                receiver.get()
+                return 1
+            return len(native_protocol.decode_batch(receiver.recv_bytes()))
+
+        # Start timing at the first message so process startup is excluded.
+        received = receive()
+        start = time.perf_counter()
+        timed = 0
+        while received < count:
+            got = receive()
+            received += got
+            timed += got
+        elapsed = time.perf_counter() - start
+        process.join()
+        rates[(transport, batch)] = timed / elapsed
+        print(f"[perf] {transport} batch={batch}: {timed / elapsed:,.0f} messages/s")
+
+    assert rates[("pipe", 1)] > rates[("queue", 1)]
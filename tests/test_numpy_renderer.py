@@ -0,0 +1,105 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
+)
+
+np = pytest.importorskip("numpy")
+
+import numpy_renderer
+import pil_image_renderer
+from conftest import make_widget
+
+
+def _make_scene():
+    container = make_widget(3, 4, 12, 10, "#ffffff40")
+    container._is_container_layer = True
+    row = make_widget(-2, 2, 10, 3, "#ff000080")
+    row.root = container
+    container.children = [row]
+    overlay = make_widget(8, 1, 9, 7, "#00ff0080", border="#000000ff", border_width=1)
+    background = make_widget(0, 0, 19, 19, "#0000ffff")
+    return [overlay, container, background]
+
+
+def _render(renderer_class, children, **kwargs):
+    renderer = renderer_class(
+        window=SimpleNamespace(children=children), width=20, height=20, fps=1, **kwargs
+    )
+    renderer._last_render = -100.0
+    return renderer, renderer.render_if_due()
+
+
+def test_numpy_frames_match_pil_frames_up_to_rounding():
+    children = _make_scene()
+    _, expected = _render(pil_image_renderer.PILImageRenderer, children)
+    _, frame = _render(numpy_renderer.NumpyRenderer, children)
+
+    assert frame.shape == (20, 20, 4)
+    expected = numpy_renderer.premultiply(np.asarray(expected)).astype(int)
+    assert np.abs(expected - frame.astype(int)).max() <= 1
+
+
+def test_widget_bodies_are_rasterized_premultiplied():
+    renderer = numpy_renderer.NumpyRenderer(
+        window=SimpleNamespace(children=[]), width=10, height=10
+    )
+    raster = renderer._widget_raster(
+        make_widget(0, 0, 4, 3, "#00ff0080", border="#ff0000ff", border_width=1)
+    )
+
+    assert raster.surface.shape == (4, 5, 4)
+    assert tuple(raster.surface[0, 0]) == (255, 0, 0, 255)
+    assert tuple(raster.surface[1, 1]) == (0, 128, 0, 128)
+    assert raster.opaque is False
+
+
+def test_partial_repaint_matches_full_repaint():
+    moving = make_widget(2, 2, 4, 4, "#ff0000c0")
+    background = make_widget(0, 0, 19, 19, "#0000ffff")
+    renderer, _ = _render(numpy_renderer.NumpyRenderer, [moving, background])
+
+    moving.x = 10
+    renderer.request_redraw([(2, 2, 7, 7), (10, 2, 15, 7)], widget=moving)
+    renderer._last_render = -100.0
+    frame = renderer.render_if_due()
+
+    assert renderer.last_damage is not None
+    _, expected = _render(numpy_renderer.NumpyRenderer, [moving, background])
+    assert np.array_equal(frame, expected)
+
+
+def test_threaded_numpy_render_matches_single_threaded(monkeypatch):
+    monkeypatch.setattr(pil_image_renderer, "RENDER_TILE_SIZE", 8)
+    children = _make_scene()
+    _, expected = _render(numpy_renderer.NumpyRenderer, children)
+    renderer, frame = _render(numpy_renderer.NumpyRenderer, children, render_threads=3)
+    renderer.close()
+
+    assert np.array_equal(frame, expected)
+
+
+def test_frame_to_image_restores_straight_alpha():
+    frame = np.array([[[0, 128, 0, 128], [0, 0, 0, 0]]], dtype=np.uint8)
+
+    image = numpy_renderer.frame_to_image(frame)
+
+    assert image.getpixel((0, 0)) == (0, 255, 0, 128)
+    assert image.getpixel((1, 0)) == (0, 0, 0, 0)
+
+
+def test_transformed_layers_match_pil_frames():
+    children = _make_scene()
+    overlay, container = children[0], children[1]
+    overlay.translate_x = 3
+    overlay.opacity = 0.5
+    container.scale = 0.5
+    _, expected = _render(pil_image_renderer.PILImageRenderer, children)
+    _, frame = _render(numpy_renderer.NumpyRenderer, children)
+
+    expected = numpy_renderer.premultiply(np.asarray(expected)).astype(int)
+    assert np.abs(frame.astype(int) - expected).max() <= 2
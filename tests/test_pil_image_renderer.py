@@ -2,28 +2,14 @@ import os
 import sys
 from types import SimpleNamespace
 
+import pytest
+
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
 )
 
 import pil_image_renderer
-
-
-def _make_widget(x, y, width, height, fill, visible=True):
-    return SimpleNamespace(
-        x=x,
-        y=y,
-        width=width,
-        height=height,
-        fill=fill,
-        visible=visible,
-        _render_visible=True,
-        border_width=0,
-        border=None,
-        text="",
-        font=None,
-        children=[],
-    )
+from conftest import make_layered_scene, make_widget
 
 
 def _make_renderer(children, fps=10):
@@ -33,7 +19,7 @@ def _make_renderer(children, fps=10):
 
 def test_render_if_due_returns_none_before_frame_interval(monkeypatch):
     now = [10.0]
-    monkeypatch.setattr(pil_image_renderer.time, "time", lambda: now[0])
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
 
     renderer = _make_renderer(children=[])
     renderer._last_render = now[0]
@@ -45,7 +31,7 @@ def test_render_if_due_returns_none_before_frame_interval(monkeypatch):
 
 def test_render_if_due_updates_last_render_without_redraw(monkeypatch):
     now = [20.0]
-    monkeypatch.setattr(pil_image_renderer.time, "time", lambda: now[0])
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
 
     renderer = _make_renderer(children=[])
     renderer._last_render = 0.0
@@ -57,12 +43,37 @@ def test_render_if_due_updates_last_render_without_redraw(monkeypatch):
     assert renderer.last_frame.size == (20, 20)
 
 
+def test_render_if_due_keeps_cadence_and_drops_missed_frames(monkeypatch):
+    now = [10.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+
+    renderer = _make_renderer(children=[], fps=10)
+    renderer._last_render = 10.0
+    renderer._redraw_requested = False
+
+    now[0] = 10.05
+    renderer.request_redraw()
+    now[0] = 10.13
+    assert renderer.render_if_due() is not None
+    assert renderer._last_render == pytest.approx(10.1)
+    assert renderer.next_frame_delay() == pytest.approx(0.07)
+    assert renderer.render_stats["dropped_frames"] == 0
+
+    now[0] = 10.14
+    renderer.request_redraw()
+    now[0] = 10.45
+    assert renderer.render_if_due() is not None
+    assert renderer._last_render == 10.45
+    assert renderer.render_stats["dropped_frames"] == 2
+    assert renderer.redraw_pending is False
+
+
 def test_render_if_due_draws_frame_and_clears_redraw(monkeypatch):
-    widget = _make_widget(2, 2, 6, 6, "#2244ccff")
+    widget = make_widget(2, 2, 6, 6, "#2244ccff")
     renderer = _make_renderer(children=[widget])
 
     now = [30.0]
-    monkeypatch.setattr(pil_image_renderer.time, "time", lambda: now[0])
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
     renderer._last_render = 0.0
     renderer._redraw_requested = True
 
@@ -81,12 +92,12 @@ def test_render_if_due_draws_frame_and_clears_redraw(monkeypatch):
 def test_render_children_respects_front_to_back_order(monkeypatch):
     # children[0] is top-most for hit testing; renderer draws reversed(children),
     # so the first child should win in overlap regions.
-    top = _make_widget(4, 4, 10, 10, "#ff0000ff")
-    bottom = _make_widget(0, 0, 12, 12, "#0000ffff")
+    top = make_widget(4, 4, 10, 10, "#ff0000ff")
+    bottom = make_widget(0, 0, 12, 12, "#0000ffff")
     renderer = _make_renderer(children=[top, bottom], fps=1)
 
     now = [40.0]
-    monkeypatch.setattr(pil_image_renderer.time, "time", lambda: now[0])
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
     renderer._last_render = 0.0
     renderer._redraw_requested = True
 
@@ -100,12 +111,12 @@ def test_render_children_respects_front_to_back_order(monkeypatch):
 
 
 def test_render_children_skips_invisible_widgets(monkeypatch):
-    hidden_top = _make_widget(0, 0, 12, 12, "#ff0000ff", visible=False)
-    visible_bottom = _make_widget(0, 0, 12, 12, "#00ff00ff", visible=True)
+    hidden_top = make_widget(0, 0, 12, 12, "#ff0000ff", visible=False)
+    visible_bottom = make_widget(0, 0, 12, 12, "#00ff00ff", visible=True)
     renderer = _make_renderer(children=[hidden_top, visible_bottom], fps=1)
 
     now = [50.0]
-    monkeypatch.setattr(pil_image_renderer.time, "time", lambda: now[0])
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
     renderer._last_render = 0.0
     renderer._redraw_requested = True
 
@@ -133,14 +144,14 @@ def test_container_layers_clip_children_and_overlay_in_order(monkeypatch):
     container.text = ""
     container.font = None
 
-    clipped_child = _make_widget(-4, 1, 8, 8, "#ff0000ff")
+    clipped_child = make_widget(-4, 1, 8, 8, "#ff0000ff")
     container.children = [clipped_child]
 
-    background = _make_widget(0, 0, 20, 20, "#0000ffff")
+    background = make_widget(0, 0, 20, 20, "#0000ffff")
     renderer = _make_renderer(children=[container, background], fps=1)
 
     now = [60.0]
-    monkeypatch.setattr(pil_image_renderer.time, "time", lambda: now[0])
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
     renderer._last_render = 0.0
     renderer._redraw_requested = True
 
@@ -154,7 +165,7 @@ def test_container_layers_clip_children_and_overlay_in_order(monkeypatch):
 
 
 def test_renderer_uses_public_font_resolver(monkeypatch):
-    widget = _make_widget(1, 1, 16, 10, None)
+    widget = make_widget(1, 1, 16, 10, None)
     widget.text = "Hi"
     widget.font = ("Arial", 12)
     widget.text_color = "#000000ff"
@@ -176,3 +187,653 @@ def test_renderer_uses_public_font_resolver(monkeypatch):
 
     assert frame is not None
     assert captured["font_spec"] == ("Arial", 12)
+
+
+def test_request_redraw_with_rects_repaints_only_damaged_region(monkeypatch):
+    left = make_widget(0, 0, 8, 8, "#ff0000ff")
+    right = make_widget(12, 0, 8, 8, "#ff0000ff")
+    renderer = _make_renderer(children=[left, right], fps=1)
+
+    now = [80.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    first = renderer.render_if_due()
+    assert first is not None
+    assert renderer.last_damage is None
+
+    # Both widgets change, but only the left one reports damage.
+    left.fill = "#00ff00ff"
+    right.fill = "#00ff00ff"
+    renderer.request_redraw([(0, 0, 8, 8)])
+    now[0] += 10.0
+    frame = renderer.render_if_due()
+
+    assert frame is first
+    assert frame.getpixel((4, 4)) == (0, 255, 0, 255)
+    assert frame.getpixel((16, 4)) == (255, 0, 0, 255)
+    assert renderer.last_damage == [(0, 0, 10, 10)]
+    assert renderer.render_stats["partial_repaints"] == 1
+
+
+def test_partial_repaint_clears_pixels_left_behind_by_moved_widget(monkeypatch):
+    widget = make_widget(0, 0, 4, 4, "#0000ffff")
+    renderer = _make_renderer(children=[widget], fps=1)
+
+    now = [90.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    renderer.render_if_due()
+
+    widget.x = 10
+    renderer.request_redraw([(0, 0, 4, 4), (10, 0, 14, 4)])
+    now[0] += 10.0
+    frame = renderer.render_if_due()
+
+    assert frame.getpixel((2, 2)) == (0, 0, 0, 0)
+    assert frame.getpixel((12, 2)) == (0, 0, 255, 255)
+    assert len(renderer.last_damage) == 2
+
+
+def test_first_move_repaints_where_the_widget_was_drawn():
+    widget = make_widget(0, 0, 4, 3, "#ff0000ff")
+    children = [widget, make_widget(0, 0, 20, 20, "#ffffff80")]
+    renderer = _make_renderer(children=children, fps=1)
+    _next_frame(renderer)
+
+    # Widgets only report the rect they cover now.
+    widget.x = widget.y = 12
+    renderer.request_redraw([(12, 12, 16, 15)], widget=widget)
+    frame = _next_frame(renderer)
+
+    assert renderer.last_damage is not None
+    assert frame.tobytes() == _render_fresh(children).tobytes()
+
+
+def test_child_of_moved_container_repaints_where_it_was_drawn():
+    container = make_widget(2, 2, 16, 16, "#0000ffff")
+    container._is_container_layer = True
+    child = make_widget(1, 1, 6, 4, "#00ff00ff", root=container)
+    container.children = [child]
+    children = [container, make_widget(0, 0, 20, 20, "#ffffff80")]
+    renderer = _make_renderer(children=children, fps=1)
+    _next_frame(renderer)
+
+    container.x = 4
+    renderer.request_redraw([(2, 2, 18, 18), (4, 2, 20, 18)], widget=container)
+    _next_frame(renderer)
+    child.y = 10
+    renderer.request_redraw([(5, 12, 11, 16)], widget=child)
+    frame = _next_frame(renderer)
+
+    assert renderer.last_damage is not None
+    assert frame.tobytes() == _render_fresh(children).tobytes()
+
+
+def test_request_redraw_without_rects_forces_full_repaint(monkeypatch):
+    renderer = _make_renderer(children=[make_widget(0, 0, 4, 4, "#0000ffff")], fps=1)
+
+    now = [100.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    renderer.render_if_due()
+
+    renderer.request_redraw([(0, 0, 2, 2)])
+    renderer.request_redraw()
+    now[0] += 10.0
+    renderer.render_if_due()
+
+    assert renderer.last_damage is None
+    assert renderer.render_stats["full_repaints"] == 2
+
+
+def test_offscreen_damage_does_not_schedule_redraw():
+    renderer = _make_renderer(children=[], fps=1)
+    renderer._full_damage = False
+    renderer._redraw_requested = False
+
+    renderer.request_redraw([(100, 100, 120, 120)])
+
+    assert renderer._redraw_requested is False
+
+
+def test_full_repaints_reuse_double_buffered_frames(monkeypatch):
+    widget = make_widget(0, 0, 4, 4, "#0000ffff")
+    renderer = _make_renderer(children=[widget], fps=1)
+
+    now = [110.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+
+    frames = []
+    for _ in range(4):
+        renderer.request_redraw()
+        now[0] += 10.0
+        frames.append(renderer.render_if_due())
+
+    assert frames[0] is frames[2]
+    assert frames[1] is frames[3]
+    assert frames[0] is not frames[1]
+    assert frames[3].getpixel((2, 2)) == (0, 0, 255, 255)
+
+
+def test_resize_reallocates_frame_buffers(monkeypatch):
+    renderer = _make_renderer(children=[], fps=1)
+    now = [120.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    renderer.render_if_due()
+
+    renderer.width = 30
+    renderer.request_redraw()
+    now[0] += 10.0
+    frame = renderer.render_if_due()
+
+    assert frame.size == (30, 20)
+
+
+def test_surface_pool_reuses_and_clears_released_surfaces():
+    pool = pil_image_renderer.SurfacePool(max_surfaces=2)
+    surface = pool.acquire((3, 3))
+    surface.putpixel((1, 1), (255, 0, 0, 255))
+    pool.release(surface)
+
+    reused = pool.acquire((3, 3))
+
+    assert reused is surface
+    assert reused.getpixel((1, 1)) == (0, 0, 0, 0)
+    assert pool.allocations == 1
+    assert pool.reuses == 1
+
+    for size in ((1, 1), (2, 2), (4, 4)):
+        pool.release(pool.acquire(size))
+    assert pool._free_count == 2
+    assert (1, 1) not in pool._free
+
+
+def test_raster_cache_reuses_widget_bitmaps_across_frames(monkeypatch):
+    widget = make_widget(2, 2, 10, 8, "#2244ccff")
+    widget.text = "Hi"
+    widget.font = ("Arial", 8)
+    widget.text_color = "#ffffffff"
+    widget.justify = "center"
+    renderer = _make_renderer(children=[widget], fps=1)
+
+    now = [130.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    first = renderer.render_if_due().copy()
+
+    calls = []
+    original_rasterize = renderer._rasterize_widget_body
+    monkeypatch.setattr(
+        renderer,
+        "_rasterize_widget_body",
+        lambda *args: calls.append(args) or original_rasterize(*args),
+    )
+    renderer.request_redraw()
+    now[0] += 10.0
+    second = renderer.render_if_due()
+
+    assert calls == []
+    assert second.tobytes() == first.tobytes()
+    assert renderer.render_stats["raster_cache_misses"] == 1
+    assert renderer.render_stats["raster_cache_hits"] == 1
+
+
+def test_raster_cache_swaps_between_hover_variants_without_rerasterizing(monkeypatch):
+    widget = make_widget(0, 0, 8, 8, "#ff0000ff")
+    widget.hover_fill = "#00ff00ff"
+    renderer = _make_renderer(children=[widget], fps=1)
+
+    now = [140.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+
+    pixels = []
+    for slot in ("bg_object", "bg_object_hover", "bg_object", "bg_object_hover"):
+        widget._active_bg_slot = slot
+        renderer.request_redraw()
+        now[0] += 10.0
+        pixels.append(renderer.render_if_due().getpixel((4, 4)))
+
+    assert pixels == [
+        (255, 0, 0, 255),
+        (0, 255, 0, 255),
+        (255, 0, 0, 255),
+        (0, 255, 0, 255),
+    ]
+    assert renderer.render_stats["raster_cache_misses"] == 2
+    assert renderer.render_stats["raster_cache_hits"] == 2
+
+
+def test_text_over_translucent_fill_matches_drawing_it_on_the_frame():
+    widget = make_widget(1, 2, 18, 14, "#2060a080")
+    widget.text = "Hi"
+    widget.font = ("Arial", 12)
+    widget.text_color = "#101010ff"
+    widget.justify = "center"
+    background = make_widget(0, 0, 20, 20, "#ffcc00ff")
+    renderer = _make_renderer(children=[widget, background], fps=1)
+    renderer._last_render = -100.0
+    frame = renderer.render_if_due()
+
+    # What drawing the fill, then the text, straight onto the frame gives.
+    key = renderer._resolve_widget_appearance(widget)[0]
+    text, font_spec, justify, text_fill = key[6:10]
+    text_x, anchor = renderer._text_anchor(justify, widget.width)
+    expected = pil_image_renderer.PILImage.new("RGBA", (20, 20), (255, 204, 0, 255))
+    renderer._alpha_draw_rectangle(expected, [1, 2, 19, 16], fill=key[4])
+    renderer._alpha_draw_text(
+        expected,
+        (widget.x + text_x, widget.y + widget.height / 2),
+        text,
+        text_fill,
+        pil_image_renderer.fonts_manager.resolve_draw_font(font_spec),
+        anchor,
+    )
+    assert frame.tobytes() == expected.tobytes()
+
+    # Cached bodies keep their text over the fill from frame to frame.
+    renderer.request_redraw()
+    renderer._last_render = -100.0
+    assert renderer.render_if_due().tobytes() == expected.tobytes()
+    assert renderer.render_stats["raster_cache_misses"] == 2
+
+
+def test_raster_cache_drops_widgets_missing_from_full_repaint(monkeypatch):
+    widget = make_widget(0, 0, 4, 4, "#0000ffff")
+    window = SimpleNamespace(children=[widget])
+    renderer = pil_image_renderer.PILImageRenderer(window=window, width=20, height=20, fps=1)
+
+    now = [150.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    renderer.render_if_due()
+    assert len(renderer.raster_cache) == 1
+
+    window.children = []
+    renderer.request_redraw()
+    now[0] += 10.0
+    renderer.render_if_due()
+
+    assert len(renderer.raster_cache) == 0
+
+
+def test_alpha_draw_rectangle_blends_within_bounded_layer():
+    renderer = _make_renderer(children=[])
+    frame = pil_image_renderer.PILImage.new("RGBA", (20, 20), (0, 0, 255, 255))
+    acquired = []
+    original_acquire = renderer.surface_pool.acquire
+
+    def spy_acquire(size):
+        acquired.append(size)
+        return original_acquire(size)
+
+    renderer.surface_pool.acquire = spy_acquire
+    renderer._alpha_draw_rectangle(frame, [2, 3, 6, 8], fill=(255, 0, 0, 128))
+
+    assert acquired == [(5, 6)]
+    blended = frame.getpixel((4, 5))
+    assert blended[0] > 100 and blended[2] > 100
+    assert frame.getpixel((7, 5)) == (0, 0, 255, 255)
+    assert frame.getpixel((4, 9)) == (0, 0, 255, 255)
+
+
+def test_alpha_draw_rectangle_clips_layer_to_frame():
+    renderer = _make_renderer(children=[])
+    frame = pil_image_renderer.PILImage.new("RGBA", (20, 20), (0, 0, 0, 0))
+    acquired = []
+    original_acquire = renderer.surface_pool.acquire
+
+    def spy_acquire(size):
+        acquired.append(size)
+        return original_acquire(size)
+
+    renderer.surface_pool.acquire = spy_acquire
+    renderer._alpha_draw_rectangle(frame, [-5, 15, 4, 30], fill=(255, 0, 0, 128))
+    renderer._alpha_draw_rectangle(frame, [30, 30, 40, 40], fill=(255, 0, 0, 128))
+
+    assert acquired == [(5, 5)]
+    assert frame.getpixel((0, 19))[3] == 128
+    assert frame.getpixel((5, 19)) == (0, 0, 0, 0)
+
+
+def _make_scroll_container(row_count, row_height=4):
+    container = make_widget(0, 0, 20, 20, None)
+    container._is_container_layer = True
+    content = make_widget(0, 0, 20, row_count * row_height, None)
+    content.root = container
+    container.children = [content]
+    colors = ["#ff0000ff", "#00ff00ff", "#0000ffff"]
+    for index in range(row_count):
+        row = make_widget(0, index * row_height, 20, row_height, colors[index % 3])
+        row.root = content
+        content.children.append(row)
+    return container, content
+
+
+def _render_fresh(children):
+    renderer = _make_renderer(children=children, fps=1)
+    renderer._last_render = -100.0
+    return renderer.render_if_due()
+
+
+def test_scrolling_container_reuses_cached_content_tiles(monkeypatch):
+    monkeypatch.setattr(pil_image_renderer, "SUBTREE_TILE_SIZE", 8)
+    container, content = _make_scroll_container(row_count=20)
+    renderer = _make_renderer(children=[container], fps=1)
+
+    now = [170.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    renderer.render_if_due()
+    assert renderer.render_stats["subtree_tiles_rendered"] == 9
+
+    calls = []
+    original_render_tile = renderer._render_subtree_tile
+    monkeypatch.setattr(
+        renderer,
+        "_render_subtree_tile",
+        lambda *args: calls.append(args[1:]) or original_render_tile(*args),
+    )
+    content.y = -8
+    renderer.request_redraw([(0, 0, 20, 20)], widget=content)
+    now[0] += 10.0
+    frame = renderer.render_if_due()
+
+    # Only the newly exposed row of tiles is rendered.
+    assert sorted(call[1:] for call in calls) == [(0, 3), (1, 3), (2, 3)]
+    expected_container, expected_content = _make_scroll_container(row_count=20)
+    expected_content.y = -8
+    assert frame.tobytes() == _render_fresh([expected_container]).tobytes()
+
+
+def test_changed_row_invalidates_only_its_content_tile(monkeypatch):
+    monkeypatch.setattr(pil_image_renderer, "SUBTREE_TILE_SIZE", 8)
+    container, content = _make_scroll_container(row_count=5)
+    renderer = _make_renderer(children=[container], fps=1)
+
+    now = [180.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    renderer.render_if_due()
+    rendered_before = renderer.render_stats["subtree_tiles_rendered"]
+
+    content.children[0].fill = "#ffffffff"
+    renderer.request_redraw([(0, 0, 20, 5)], widget=content.children[0])
+    now[0] += 10.0
+    frame = renderer.render_if_due()
+
+    # Row 0 spans local y 0..4 (plus its inclusive edge), i.e. tile row 0.
+    assert renderer.render_stats["subtree_tiles_rendered"] - rendered_before == 3
+    assert frame.getpixel((5, 1)) == (255, 255, 255, 255)
+    assert frame.getpixel((5, 9)) == (0, 0, 255, 255)
+
+    # A redraw that does not name a widget cannot be attributed to any tiles.
+    renderer.request_redraw()
+    assert renderer.subtree_cache == {}
+
+
+def test_opaque_overlay_culls_widgets_hidden_behind_it(monkeypatch):
+    overlay = make_widget(0, 0, 20, 20, "#00ff00ff")
+    hidden = make_widget(4, 4, 6, 6, "#ff0000ff")
+    background = make_widget(0, 0, 20, 20, "#0000ffff")
+    renderer = _make_renderer(children=[overlay, hidden, background], fps=1)
+
+    now = [190.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    frame = renderer.render_if_due()
+
+    assert frame.getpixel((5, 5)) == (0, 255, 0, 255)
+    assert renderer.render_stats["occluded_widgets"] == 2
+
+
+def test_partially_covered_widget_only_draws_its_exposed_part(monkeypatch):
+    header = make_widget(0, 0, 20, 8, "#00ff00ff")
+    background = make_widget(0, 0, 19, 19, "#0000ffff")
+    renderer = _make_renderer(children=[header, background], fps=1)
+
+    now = [200.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    frame = renderer.render_if_due()
+
+    assert frame.getpixel((5, 4)) == (0, 255, 0, 255)
+    assert frame.getpixel((5, 12)) == (0, 0, 255, 255)
+    assert renderer.render_stats["occluded_widgets"] == 0
+    assert renderer.render_stats["occluded_pixels"] == 20 * 8
+
+
+def test_translucent_overlay_does_not_cull_widgets_behind_it(monkeypatch):
+    overlay = make_widget(0, 0, 20, 20, "#00ff0080")
+    background = make_widget(0, 0, 20, 20, "#0000ffff")
+    renderer = _make_renderer(children=[overlay, background], fps=1)
+
+    now = [210.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    renderer._last_render = 0.0
+    frame = renderer.render_if_due()
+
+    blended = frame.getpixel((5, 5))
+    assert blended[1] > 100 and blended[2] > 100
+    assert renderer.render_stats["occluded_widgets"] == 0
+
+
+def test_threaded_render_matches_single_threaded_frames(monkeypatch):
+    monkeypatch.setattr(pil_image_renderer, "RENDER_TILE_SIZE", 8)
+    monkeypatch.setattr(pil_image_renderer, "SUBTREE_TILE_SIZE", 8)
+    children, content = make_layered_scene()
+    single = _make_renderer(children=children, fps=1)
+    threaded = pil_image_renderer.PILImageRenderer(
+        window=single.window, width=20, height=20, fps=1, render_threads=3
+    )
+
+    now = [220.0]
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
+    try:
+        for renderer in (single, threaded):
+            renderer._last_render = 0.0
+        assert single.render_if_due().tobytes() == threaded.render_if_due().tobytes()
+
+        content.y = -3
+        for renderer in (single, threaded):
+            renderer.request_redraw([(3, 5, 11, 13)], widget=content)
+        now[0] += 10.0
+        assert single.render_if_due().tobytes() == threaded.render_if_due().tobytes()
+        assert threaded.last_damage is not None
+    finally:
+        threaded.close()
+
+
+def test_threaded_render_gives_each_tile_only_the_ops_that_touch_it(monkeypatch):
+    monkeypatch.setattr(pil_image_renderer, "RENDER_TILE_SIZE", 8)
+    corner = make_widget(1, 1, 4, 4, "#ff0000ff")
+    renderer = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=[corner]),
+        width=20,
+        height=20,
+        fps=1,
+        render_threads=2,
+    )
+    tile_ops = {}
+    original_render_tile = renderer._render_tile
+
+    def record_tile(rect, ops):
+        tile_ops[rect] = list(ops)
+        return original_render_tile(rect, ops)
+
+    monkeypatch.setattr(renderer, "_render_tile", record_tile)
+
+    renderer._last_render = -100.0
+    try:
+        frame = renderer.render_if_due()
+    finally:
+        renderer.close()
+
+    assert renderer.render_stats["render_tiles"] == 9
+    assert [rect for rect, ops in tile_ops.items() if ops] == [(0, 0, 8, 8)]
+    assert frame.getpixel((2, 2)) == (255, 0, 0, 255)
+    assert frame.getpixel((12, 12)) == (0, 0, 0, 0)
+
+
+def test_opaque_widget_rasters_are_marked_for_pasting():
+    renderer = _make_renderer(children=[])
+    opaque = renderer._widget_raster(make_widget(0, 0, 4, 4, "#ff0000ff"))
+    translucent = renderer._widget_raster(make_widget(0, 0, 4, 4, "#ff000080"))
+
+    assert opaque.opaque is True
+    assert translucent.opaque is False
+
+
+def _make_panel():
+    label = make_widget(1, 1, 3, 2, "#ff0000ff")
+    panel = make_widget(2, 2, 8, 6, "#0000ffff")
+    panel.children = [label]
+    label.root = panel
+    background = make_widget(0, 0, 30, 30, "#ffffffff")
+    return panel, [panel, background]
+
+
+def _next_frame(renderer):
+    renderer._last_render = -100.0
+    return renderer.render_if_due()
+
+
+def test_translated_layer_is_composited_from_cached_tiles():
+    panel, children = _make_panel()
+    renderer = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=children), width=30, height=30, fps=1
+    )
+    _next_frame(renderer)
+    panel.translate_x = 5
+    renderer.request_composite(panel)
+    _next_frame(renderer)
+    misses = renderer.render_stats["raster_cache_misses"]
+    tiles = renderer.render_stats["subtree_tiles_rendered"]
+
+    panel.translate_x = 9
+    renderer.request_composite(panel)
+    frame = _next_frame(renderer)
+
+    # Only where the layer was and is now is repainted, from cached pixels.
+    assert renderer.last_damage == [(6, 1, 22, 11)]
+    assert renderer.render_stats["raster_cache_misses"] == misses
+    assert renderer.render_stats["subtree_tiles_rendered"] == tiles
+    moved, moved_children = _make_panel()
+    moved.x = 11
+    reference = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=moved_children), width=30, height=30, fps=1
+    )
+    assert frame.tobytes() == _next_frame(reference).tobytes()
+
+
+@pytest.mark.parametrize("transform", [{"translate_x": 12}, {"scale": 2.0}])
+@pytest.mark.parametrize("change", ["hide", "show", "place", "restack"])
+def test_transformed_layer_changes_repaint_where_it_was_drawn(transform, change):
+    panel, children = _make_panel()
+    other = make_widget(14, 4, 6, 4, "#00ff00ff")
+    children.insert(1, other)
+    for name, value in transform.items():
+        setattr(panel, name, value)
+    panel.visible = change != "show"
+    renderer = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=children), width=40, height=40, fps=1
+    )
+    _next_frame(renderer)
+
+    if change == "place":
+        panel.x, panel.y = 10, 18
+    elif change == "restack":
+        children[:2] = [other, panel]
+    else:
+        panel.visible = change == "show"
+    # The widget reports its untransformed rect, as widgets do.
+    renderer.request_redraw(
+        [(panel.x, panel.y, panel.x + 8, panel.y + 6)], widget=panel
+    )
+    frame = _next_frame(renderer)
+
+    assert renderer.last_damage is not None
+    reference = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=children), width=40, height=40, fps=1
+    )
+    assert frame.tobytes() == _next_frame(reference).tobytes()
+
+
+def test_layer_opacity_and_scale_are_applied_when_compositing():
+    panel, children = _make_panel()
+    renderer = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=children), width=30, height=30, fps=1
+    )
+    panel.opacity = 0.5
+    frame = _next_frame(renderer)
+    assert frame.getpixel((8, 7)) == (127, 127, 255, 255)
+    assert frame.getpixel((4, 4)) == (255, 127, 127, 255)
+
+    panel.opacity = 1.0
+    panel.scale = 2.0
+    renderer.request_composite(panel)
+    frame = _next_frame(renderer)
+
+    # The 9x7 body grows about the panel's center to cover (-2, -1)-(16, 13).
+    assert frame.getpixel((15, 12)) == (0, 0, 255, 255)
+    assert frame.getpixel((16, 13)) == (255, 255, 255, 255)
+    assert frame.getpixel((3, 4)) == (255, 0, 0, 255)
+
+
+def _make_scaled_panel(factor=1.0):
+    def scaled(x, y, width, height, fill):
+        return make_widget(
+            int(x * factor),
+            int(y * factor),
+            int(width * factor),
+            int(height * factor),
+            fill,
+        )
+
+    label = scaled(2, 2, 6, 4, "#ff0000ff")
+    panel = scaled(4, 6, 12, 8, "#0000ffff")
+    panel.children = [label]
+    label.root = panel
+    background = scaled(0, 0, 30, 30, "#ffffffff")
+    return panel, [panel, background]
+
+
+def _reference_frame(factor, panel_x=4):
+    panel, children = _make_scaled_panel(factor)
+    panel.x = int(panel_x * factor)
+    size = int(30 * factor)
+    reference = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=children), width=size, height=size, fps=1
+    )
+    return _next_frame(reference)
+
+
+def test_render_scale_rasterizes_frames_at_a_fraction_of_the_canvas():
+    panel, children = _make_scaled_panel()
+    renderer = pil_image_renderer.PILImageRenderer(
+        window=SimpleNamespace(children=children),
+        width=30,
+        height=30,
+        fps=1,
+        render_scale=0.5,
+    )
+    frame = _next_frame(renderer)
+    assert frame.size == (15, 15)
+    assert frame.tobytes() == _reference_frame(0.5).tobytes()
+
+    # Logical damage rects are mapped to frame pixels.
+    panel.x = 8
+    renderer.request_redraw([(4, 6, 16, 14), (8, 6, 20, 14)], widget=panel)
+    frame = _next_frame(renderer)
+    assert renderer.last_damage == [(1, 2, 13, 10)]
+    assert frame.tobytes() == _reference_frame(0.5, panel_x=8).tobytes()
+
+    renderer.set_render_scale(2.0)
+    frame = _next_frame(renderer)
+    assert (renderer.width, renderer.height) == (60, 60)
+    assert frame.tobytes() == _reference_frame(2.0, panel_x=8).tobytes()
+
+    with pytest.raises(ValueError):
+        renderer.set_render_scale(0)
@@ -1,7 +1,9 @@
 import os
+import random
 import sys
 import time
 from statistics import mean, pstdev
+from types import SimpleNamespace
 
 import pytest
 from PIL import Image as PILImage
@@ -11,7 +13,10 @@ sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
 )
 
+import native_gl_window
 import nebulatk as ntk
+import numpy_renderer
+import pil_image_renderer
 
 RUN_PERF_TESTS = os.environ.get("NTK_RUN_PERF_TESTS") == "1"
 pytestmark = pytest.mark.skipif(
@@ -242,3 +247,135 @@ def test_image_gl_creation_with_pil_assets():
         assert len(buttons) == 4
     finally:
         _close_window_safe(window)
+
+
+def _build_dashboard_widgets(count, width, height):
+    rng = random.Random(7)
+    fills = ["#2d2d2dff", "#3355ccff", "#ffffff30", "#b13f3f80"]
+    widgets = [
+        SimpleNamespace(
+            x=rng.randint(0, width - 40),
+            y=rng.randint(0, height - 20),
+            width=rng.randint(40, 240),
+            height=rng.randint(20, 120),
+            fill=rng.choice(fills),
+            visible=True,
+            _render_visible=True,
+            border_width=1,
+            border="#000000ff",
+            text="",
+            font=None,
+            children=[],
+        )
+        for _ in range(count)
+    ]
+    return SimpleNamespace(children=widgets)
+
+
+def _time_full_frames(renderer, present, runs=5):
+    renderer._last_render = -1.0
+    present(renderer.render_if_due())
+    times = []
+    for _ in range(runs):
+        renderer.request_redraw()
+        renderer._last_render = -1.0
+        start = time.perf_counter()
+        present(renderer.render_if_due())
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def test_numpy_renderer_full_frame_benchmark_against_pil():
+    if not numpy_renderer.available():
+        pytest.skip("numpy is not installed.")
+    window = _build_dashboard_widgets(2000, 1920, 1080)
+    backends = {
+        "pil": (
+            pil_image_renderer.PILImageRenderer,
+            lambda frame: frame.convert("RGBA").tobytes("raw", "RGBA"),
+        ),
+        "numpy": (numpy_renderer.NumpyRenderer, lambda frame: frame.tobytes()),
+    }
+    results = {}
+    for name, (renderer_class, present) in backends.items():
+        renderer = renderer_class(window, 1920, 1080, fps=1000)
+        times = _time_full_frames(renderer, present)
+        results[name] = min(times)
+        _log_perf(
+            f"{name} full frame",
+            min_s=f"{min(times):.6f}",
+            avg_s=f"{mean(times):.6f}",
+        )
+
+    _log_perf("numpy speedup", ratio=f"{results['pil'] / results['numpy']:.2f}x")
+    # Loose bound; the point is to log the comparison without machine flakes.
+    assert results["numpy"] < results["pil"] * 2.0
+
+
+def _time_native_backend(window_class, round_trips=200):
+    start = time.perf_counter()
+    try:
+        window = window_class(320, 240)
+    except RuntimeError as exc:
+        pytest.skip(f"{window_class.__name__} unavailable: {exc}")
+    startup = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        for _ in range(round_trips):
+            window._send_native_command(
+                {"op": "clipboard_get"}, expect_response=True, timeout=1.0
+            )
+        latency = (time.perf_counter() - start) / round_trips
+    finally:
+        window.destroy()
+    return startup, latency
+
+
+def test_inprocess_backend_startup_and_latency_against_process():
+    results = {}
+    for name, window_class in (
+        ("process", native_gl_window.NativeGLWindow),
+        ("inprocess", native_gl_window.InProcessGLWindow),
+    ):
+        startup, latency = _time_native_backend(window_class)
+        results[name] = (startup, latency)
+        _log_perf(
+            f"{name} backend",
+            startup_s=f"{startup:.4f}",
+            round_trip_us=f"{latency * 1e6:.1f}",
+        )
+
+    assert results["inprocess"][0] < results["process"][0]
+
+
+def _time_to_first_frame(timeout_s=10.0):
+    start = time.perf_counter()
+    try:
+        window = native_gl_window.NativeGLWindow(320, 240)
+    except RuntimeError as exc:
+        pytest.skip(f"Native window unavailable: {exc}")
+    try:
+        window.submit_frame(bytes(320 * 240 * 4), 320, 240)
+        deadline = time.perf_counter() + timeout_s
+        while window._frames_presented < 1 and time.perf_counter() < deadline:
+            window._poll_messages(0.005)
+            window._process_events()
+        assert window._frames_presented >= 1
+        return time.perf_counter() - start
+    finally:
+        window.destroy()
+
+
+def test_prewarmed_window_time_to_first_frame_against_cold():
+    cold = _time_to_first_frame()
+    native_gl_window.prewarm(1)
+    # Give the standby time to finish importing and creating its window.
+    time.sleep(3.0)
+    warm = _time_to_first_frame()
+    _log_perf(
+        "time to first frame",
+        cold_s=f"{cold:.4f}",
+        warm_s=f"{warm:.4f}",
+        speedup=f"{cold / warm:.2f}x",
+    )
+    assert warm < cold
@@ -15,9 +15,9 @@ def _make_window(fps=60):
     window = _window_internal(width=320, height=200, render_mode="image_gl", fps=fps)
     window.root = MagicMock()
     window.root.after = MagicMock()
+    window.root.frame_backlogged = False
     window.renderer = MagicMock()
     window.display = MagicMock()
-    window._sync_window_size_from_native = MagicMock()
     return window
 
 
@@ -27,38 +27,93 @@ def test_render_tick_skips_rendering_while_batching():
 
     window._render_tick()
 
-    window._sync_window_size_from_native.assert_called_once()
     window.renderer.render_if_due.assert_not_called()
     window.display.show_frame.assert_not_called()
-    window.root.after.assert_called_once_with(20, window._render_tick)
+    window.root.after.assert_not_called()
 
 
-def test_render_tick_shows_frame_and_clears_redraw_flag():
+def test_end_render_batch_arms_pending_redraw():
+    window = _make_window(fps=50)
+    window.renderer.next_frame_delay.return_value = 0.0
+    window._render_batch_depth = 1
+    window._redraw_needed = True
+
+    window.end_render_batch()
+
+    window.root.after.assert_called_once_with(0, window._render_tick)
+
+
+def test_render_tick_shows_frame_and_goes_idle():
     window = _make_window(fps=40)
     window._render_batch_depth = 0
     window._redraw_needed = True
     frame = object()
     window.renderer.render_if_due.return_value = frame
+    window.renderer.redraw_pending = False
 
     window._render_tick()
 
-    window._sync_window_size_from_native.assert_called_once()
     window.renderer.render_if_due.assert_called_once()
-    window.display.show_frame.assert_called_once_with(frame)
+    window.display.show_frame.assert_called_once_with(
+        frame, rects=window.renderer.last_damage
+    )
     assert window._redraw_needed is False
-    window.root.after.assert_called_once_with(25, window._render_tick)
+    window.root.after.assert_not_called()
 
 
-def test_render_tick_reschedules_when_no_frame_ready():
+def test_render_tick_rearms_at_deadline_when_no_frame_ready():
     window = _make_window(fps=30)
     window._render_batch_depth = 0
     window._redraw_needed = True
     window.renderer.render_if_due.return_value = None
+    window.renderer.redraw_pending = True
+    window.renderer.next_frame_delay.return_value = 0.0121
 
     window._render_tick()
 
-    window._sync_window_size_from_native.assert_called_once()
-    window.renderer.render_if_due.assert_called_once()
     window.display.show_frame.assert_not_called()
     assert window._redraw_needed is True
-    window.root.after.assert_called_once_with(33, window._render_tick)
+    window.root.after.assert_called_once_with(13, window._render_tick)
+
+
+def test_redraw_requests_arm_a_single_tick():
+    window = _make_window()
+    window.renderer.next_frame_delay.return_value = 0.0
+
+    window._mark_redraw_needed()
+    window._mark_redraw_needed(rects=[(0, 0, 4, 4)])
+
+    assert window.renderer.request_redraw.call_count == 2
+    window.root.after.assert_called_once_with(0, window._render_tick)
+
+
+def test_render_tick_waits_for_presented_frames_when_backlogged():
+    window = _make_window()
+    window._render_batch_depth = 0
+    window.root.frame_backlogged = True
+    window.renderer.redraw_pending = True
+    window.renderer.next_frame_delay.return_value = 0.0
+
+    window._render_tick()
+
+    window.renderer.render_if_due.assert_not_called()
+    window.root.after.assert_not_called()
+
+    window.root.frame_backlogged = False
+    window._on_frame_presented(None)
+    window.root.after.assert_called_once_with(0, window._render_tick)
+
+
+def test_render_tick_shows_compositor_scene_in_gpu_mode():
+    window = _make_window()
+    window.compositor = "gpu"
+    window._render_batch_depth = 0
+    scene = object()
+    window.renderer.compose_if_due.return_value = scene
+    window.renderer.redraw_pending = False
+
+    window._render_tick()
+
+    window.renderer.render_if_due.assert_not_called()
+    window.display.show_scene.assert_called_once_with(scene)
+    assert window._redraw_needed is False
@@ -1,3 +1,4 @@
+import ctypes
 import os
 import sys
 from types import SimpleNamespace
@@ -9,8 +10,11 @@ sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
 )
 
+import layer_compositor
 import native_gl_window
+import native_protocol
 import opengl_image_display
+import texture_atlas
 
 
 class _FakeGlfw:
@@ -98,6 +102,86 @@ def test_opengl_image_display_proxy_show_frame_submits_bytes():
     assert frame_rgba[:4] == bytes([10, 20, 30, 40])
 
 
+def test_opengl_image_display_proxy_submits_premultiplied_arrays():
+    np = pytest.importorskip("numpy")
+    calls = []
+    # submit_frame must copy the pixels before returning.
+    root = SimpleNamespace(
+        submit_frame=lambda frame_rgba, width, height, premultiplied=False: calls.append(
+            (bytes(frame_rgba), width, height, premultiplied)
+        )
+    )
+    display = opengl_image_display.OpenGLImageDisplay(root=root, width=1, height=1)
+
+    pixels = np.zeros((2, 3, 4), dtype=np.uint8)
+    pixels[0, 0] = (5, 10, 15, 40)
+    display.show_frame(pixels)
+
+    frame_rgba, width, height, premultiplied = calls[0]
+    assert (width, height, premultiplied) == (3, 2, True)
+    assert frame_rgba[:4] == bytes([5, 10, 15, 40])
+
+
+def test_opengl_image_display_proxy_sends_only_damaged_rects():
+    calls = []
+    root = SimpleNamespace(
+        submit_frame=lambda frame_rgba, width, height, premultiplied=False, rects=None: calls.append(
+            (bytes(frame_rgba), width, height, rects)
+        )
+    )
+    display = opengl_image_display.OpenGLImageDisplay(root=root, width=1, height=1)
+    frame = PILImage.new("RGBA", (8, 6), (0, 0, 0, 255))
+    frame.putpixel((2, 1), (9, 8, 7, 255))
+
+    # The first frame has nothing to update, so it is always sent whole.
+    display.show_frame(frame, rects=[(2, 1, 4, 2)])
+    display.show_frame(frame, rects=[(2, 1, 4, 2), (0, 5, 1, 6)])
+
+    assert calls[0][3] is None and len(calls[0][0]) == 8 * 6 * 4
+    pixels, width, height, rects = calls[1]
+    assert (width, height, rects) == (8, 6, [(2, 1, 4, 2), (0, 5, 1, 6)])
+    assert pixels == bytes([9, 8, 7, 255, 0, 0, 0, 255, 0, 0, 0, 255])
+
+    # Large damage and size changes fall back to whole frames.
+    display.show_frame(frame, rects=[(0, 0, 8, 4)])
+    display.show_frame(PILImage.new("RGBA", (4, 4)), rects=[(0, 0, 1, 1)])
+    assert [call[3] for call in calls[2:]] == [None, None]
+
+
+def test_opengl_image_display_packs_damaged_rects_from_arrays():
+    np = pytest.importorskip("numpy")
+    pixels = np.arange(4 * 3 * 4, dtype=np.uint8).reshape(3, 4, 4)
+
+    packed = opengl_image_display._pack_rects(pixels, [(1, 1, 3, 2)])
+
+    assert packed == pixels[1, 1:3].tobytes()
+
+
+def test_opengl_image_display_queues_sub_image_uploads():
+    display = opengl_image_display.OpenGLImageDisplay.__new__(
+        opengl_image_display.OpenGLImageDisplay
+    )
+    display._proxy_mode = False
+    display._frame_rgba = None
+    display._needs_texture_upload = False
+    display._dirty_uploads = []
+
+    display.show_frame_rects(
+        [(0, 0, 1, 1), (2, 2, 4, 3)], bytes(range(12)), 5, 5, premultiplied=True
+    )
+
+    assert display.upload_pending is True
+    assert [rect for rect, _ in display._dirty_uploads] == [(0, 0, 1, 1), (2, 2, 4, 3)]
+    assert [bytes(data) for _, data in display._dirty_uploads] == [
+        bytes(range(4)),
+        bytes(range(4, 12)),
+    ]
+
+    # A whole frame supersedes sub-image updates that were not uploaded yet.
+    display.show_frame_bytes(b"\x00" * 100, 5, 5)
+    assert display._dirty_uploads == []
+
+
 def test_opengl_image_display_show_frame_sets_local_upload_state():
     display = opengl_image_display.OpenGLImageDisplay.__new__(
         opengl_image_display.OpenGLImageDisplay
@@ -134,6 +218,186 @@ def test_opengl_image_display_draw_is_noop_in_proxy_mode():
     assert display.draw() is None
 
 
+def test_opengl_image_display_stretches_scaled_frames_over_the_canvas(monkeypatch):
+    calls = []
+    root = SimpleNamespace(
+        submit_frame=lambda *_args, **_kwargs: None,
+        set_render_scale=lambda *args: calls.append(args),
+        handle="window",
+    )
+    display = opengl_image_display.OpenGLImageDisplay(root=root, width=1, height=1)
+
+    display.set_render_scale(0.5, "nearest")
+    display.set_render_scale(0.5, "nearest")
+    with pytest.raises(ValueError):
+        display.set_render_scale(0.5, "cubic")
+    assert calls == [(0.5, "nearest")]
+
+    # A 100x80 window on a 2x framebuffer: a half-scale frame is 50x40.
+    monkeypatch.setattr(
+        opengl_image_display,
+        "glfw",
+        SimpleNamespace(get_window_size=lambda _handle: (100, 80)),
+    )
+    display.width, display.height = 50, 40
+    assert display._viewport_size(200, 160) == (200, 160)
+    display.render_scale = 1.0
+    display.width, display.height = 100, 80
+    assert display._viewport_size(200, 160) == (200, 160)
+
+
+class _FakePixelBufferGL:
+    GL_PIXEL_UNPACK_BUFFER = "unpack"
+    GL_STREAM_DRAW = "stream"
+    GL_WRITE_ONLY = "write"
+    GL_TEXTURE_2D = "tex2d"
+    GL_RGBA = "rgba"
+    GL_UNSIGNED_BYTE = "ubyte"
+    GL_VERSION = "version"
+    GL_EXTENSIONS = "extensions"
+
+    def __init__(self, version=b"2.1 Mesa", extensions=b""):
+        self.strings = {"version": version, "extensions": extensions}
+        self.glMapBuffer = self._map_buffer
+        self.memory = None
+        self.calls = []
+
+    def glGetString(self, name):
+        return self.strings[name]
+
+    def glGenBuffers(self, count):
+        return list(range(1, count + 1))
+
+    def glBindBuffer(self, target, buffer_id):
+        self.calls.append(("bind", buffer_id))
+
+    def glBufferData(self, target, size, data, usage):
+        self.memory = (ctypes.c_char * size)()
+
+    def _map_buffer(self, target, access):
+        return ctypes.addressof(self.memory)
+
+    def glUnmapBuffer(self, target):
+        return True
+
+    def glTexSubImage2D(self, target, level, x, y, width, height, fmt, kind, data):
+        self.calls.append(("sub", (x, y, width, height), data.value or 0))
+
+
+def test_pixel_buffers_supported_from_gl_21_or_extension(monkeypatch):
+    monkeypatch.setattr(opengl_image_display, "GL", _FakePixelBufferGL(b"4.6.0 NVIDIA"))
+    assert opengl_image_display._pixel_buffers_supported() is True
+    monkeypatch.setattr(opengl_image_display, "GL", _FakePixelBufferGL(b"2.0 Mesa"))
+    assert opengl_image_display._pixel_buffers_supported() is False
+    monkeypatch.setattr(
+        opengl_image_display,
+        "GL",
+        _FakePixelBufferGL(b"2.0", b"GL_ARB_multitexture GL_ARB_pixel_buffer_object"),
+    )
+    assert opengl_image_display._pixel_buffers_supported() is True
+
+
+def test_pixel_upload_buffers_stage_rects_back_to_back(monkeypatch):
+    gl = _FakePixelBufferGL()
+    monkeypatch.setattr(opengl_image_display, "GL", gl)
+    buffers = opengl_image_display.PixelUploadBuffers(count=2)
+
+    assert buffers.upload([((0, 0, 1, 1), b"abcd"), ((2, 1, 4, 2), bytes(8))])
+    assert gl.memory.raw == b"abcd" + bytes(8)
+    assert gl.calls == [
+        ("bind", 1),
+        ("sub", (0, 0, 1, 1), 0),
+        ("sub", (2, 1, 2, 1), 4),
+        ("bind", 0),
+    ]
+
+    gl.calls.clear()
+    buffers.upload([((0, 0, 1, 1), b"wxyz")])
+    buffers.upload([((0, 0, 1, 1), b"wxyz")])
+    assert [call[1] for call in gl.calls if call[0] == "bind"] == [2, 0, 1, 0]
+
+
+def test_scene_batches_clip_quads_and_merge_draws_per_texture():
+    regions = {
+        1: (10, 0.0, 0.0, 1.0, 1.0),
+        2: (10, 0.5, 0.0, 1.0, 0.5),
+        3: (11, 0.0, 0.0, 1.0, 1.0),
+    }
+    quads = [
+        (1, 0, 0, 4, 4, (0, 0, 8, 8), 1.0),
+        # Half of it lies left of its clip.
+        (2, 2, 4, 4, 2, (4, 0, 8, 8), 0.5),
+        (3, 0, 0, 8, 8, (0, 0, 8, 8), 1.0),
+        (3, 0, 0, 2, 2, (4, 4, 8, 8), 1.0),
+        (9, 0, 0, 2, 2, (0, 0, 8, 8), 1.0),
+    ]
+
+    vertices, batches = opengl_image_display._scene_batches(quads, regions, 8, 8)
+
+    assert batches == [(10, 0, 12), (11, 12, 6)]
+    second = vertices[30:60]
+    # Top-left corner: x 4 px -> NDC 0, y 4 px -> NDC 0, u halfway into region.
+    assert list(second[:5]) == [0.0, 0.0, 0.75, 0.0, 0.5]
+    # Bottom-right corner of the clipped quad.
+    assert list(second[20:25]) == [0.5, -0.5, 1.0, 0.5, 0.5]
+
+
+class _FakeAtlasPages:
+    def __init__(self):
+        self.uploads = []
+
+    def create_page(self, width, height):
+        return 40
+
+    def upload(self, page, uploads):
+        self.uploads.extend(uploads)
+
+    def delete_page(self, page):
+        pass
+
+
+def test_opengl_image_display_places_scene_layers_in_atlas():
+    root = SimpleNamespace(submit_frame=lambda *_args, **_kwargs: None)
+    display = opengl_image_display.OpenGLImageDisplay(root=root, width=1, height=1)
+    display._atlas = texture_atlas.TextureAtlas(_FakeAtlasPages(), page_size=16)
+    display.show_frame_bytes(b"\x00" * 4, 1, 1)
+
+    display.apply_scene(8, 6, [(1, 1, 1, b"a" * 4, "A"), (2, 1, 1, None, "A")], [], [])
+    display._update_layers()
+    # Layer 3 takes over key "A" in the same batch that releases 1 and 2.
+    display.apply_scene(8, 6, [(3, 1, 1, None, "A")], [1, 2], [])
+    display._update_layers()
+
+    assert display._layer_keys == {3: "A"}
+    assert len(display._atlas.pages[0].regions) == 1
+    assert len(display._atlas.backend.uploads) == 1
+    assert display.upload_pending is False
+    assert (display.width, display.height) == (8, 6)
+    regions = opengl_image_display._LayerRegions(display._layer_keys, display._atlas)
+    assert regions.get(3) == (40, 1 / 16, 1 / 16, 2 / 16, 2 / 16)
+    assert regions.get(1) is None
+
+
+def test_submit_scene_sends_plain_quads_and_counts_frame():
+    window = _make_frame_sender()
+    scene = SimpleNamespace(
+        width=4,
+        height=3,
+        premultiplied=False,
+        layers=[(1, 1, 1, b"\x00" * 4)],
+        release=[],
+        quads=[layer_compositor.Quad(1, 0, 0, 1, 1, (0, 0, 4, 3), 1.0)],
+    )
+
+    window.submit_scene(scene)
+
+    (command,) = window.sent
+    assert command["op"] == "scene"
+    assert command["frame"] == 1
+    assert type(command["quads"][0]) is tuple
+    assert window._frames_submitted == 1
+
+
 def test_handle_process_message_records_startup_error():
     window = native_gl_window.NativeGLWindow.__new__(native_gl_window.NativeGLWindow)
     window._window_id = "native-test"
@@ -154,3 +418,366 @@ def test_wait_for_process_ready_raises_with_startup_error():
 
     with pytest.raises(RuntimeError, match="glfw.create_window\\(\\) failed\\."):
         window._wait_for_process_ready()
+
+
+def _make_frame_sender():
+    window = native_gl_window.NativeGLWindow.__new__(native_gl_window.NativeGLWindow)
+    window._window = object()
+    window._frame_ring = None
+    window._frame_ring_generation = 0
+    window._frame_ring_failed = False
+    window._frames_submitted = 0
+    window._frames_presented = 0
+    window.sent = []
+    window._send_native_command = window.sent.append
+    return window
+
+
+def test_submit_frame_sends_slot_numbers_through_shared_memory():
+    window = _make_frame_sender()
+    try:
+        window.submit_frame(bytes([1, 2, 3, 4]) * 6, 3, 2, premultiplied=True)
+
+        ring_command, frame_command = window.sent
+        assert ring_command["op"] == "frame_ring"
+        assert ring_command["slot_size"] == 24
+        assert "frame_rgba" not in frame_command
+        assert frame_command["ring"] == ring_command["generation"]
+        assert (frame_command["seq"], frame_command["nbytes"]) == (1, 24)
+        assert frame_command["premultiplied"] is True
+
+        view = window._frame_ring.view(frame_command["slot"], 24)
+        assert bytes(view[:4]) == bytes([1, 2, 3, 4])
+        view.release()
+    finally:
+        window._close_frame_ring()
+
+
+def test_submit_frame_falls_back_to_inline_bytes_while_slots_are_busy():
+    window = _make_frame_sender()
+    try:
+        window_slots = 3
+        for _ in range(window_slots):
+            window.submit_frame(b"\x00" * 8, 2, 1)
+        window.submit_frame(b"\x07" * 8, 2, 1)
+
+        assert len(window.sent) == 1 + window_slots + 1
+        assert window.sent[-1]["frame_rgba"] == b"\x07" * 8
+
+        window._frame_ring.release(window_slots)
+        window.submit_frame(b"\x00" * 8, 2, 1)
+        assert "frame_rgba" not in window.sent[-1]
+    finally:
+        window._close_frame_ring()
+
+
+def test_size_messages_update_cached_size_and_dispatch_configure():
+    window = native_gl_window.NativeGLWindow.__new__(native_gl_window.NativeGLWindow)
+    window._window = object()
+    window._window_id = "native-test"
+    window._bindings = {}
+    window._event_lock = native_gl_window.threading.Lock()
+    window._mouse_x, window._mouse_y = 3, 4
+    window._size = (10, 10)
+    window._framebuffer_size = (10, 10)
+    window._send_native_command = lambda *_args, **_kwargs: pytest.fail(
+        "size queries must not round-trip to the native process"
+    )
+    events = []
+    window.bind("<Configure>", events.append)
+
+    window._handle_process_message(
+        {
+            "type": "size",
+            "window_id": "native-test",
+            "width": 300,
+            "height": 200,
+            "framebuffer_width": 600,
+            "framebuffer_height": 400,
+        }
+    )
+
+    assert (window.winfo_width(), window.winfo_height()) == (300, 200)
+    assert window.framebuffer_size == (600, 400)
+    assert [(event.width, event.height, event.x) for event in events] == [(300, 200, 3)]
+
+
+def _event(name, x=0, y=0, **fields):
+    return dict(type="event", window_id=7, name=name, x=x, y=y, **fields)
+
+
+def test_coalesce_events_keeps_latest_motion_and_sums_scrolls():
+    messages = [
+        _event("<Motion>", 1, 1),
+        _event("<Motion>", 2, 2),
+        _event("<Button-1>", 2, 2),
+        _event("<Motion>", 3, 3),
+        _event("<Motion>", 4, 4),
+        _event("<MouseWheel>", 4, 4, delta=120, delta_x=0, delta_y=120),
+        _event("<MouseWheel>", 5, 5, delta=-240, delta_x=0, delta_y=-240),
+        _event("<Key>", 5, 5, keysym="a"),
+        _event("<Motion>", 6, 6),
+    ]
+
+    coalesced = native_gl_window.coalesce_events(messages)
+
+    assert [(m["name"], m["x"]) for m in coalesced] == [
+        ("<Motion>", 2),
+        ("<Button-1>", 2),
+        ("<Motion>", 4),
+        ("<MouseWheel>", 5),
+        ("<Key>", 5),
+        ("<Motion>", 6),
+    ]
+    assert coalesced[3]["delta"] == -120
+    assert coalesced[3]["delta_y"] == -120
+    # Inputs are not mutated.
+    assert messages[6]["delta"] == -240
+
+
+def test_process_events_dispatches_one_motion_per_drain():
+    window = native_gl_window.NativeGLWindow.__new__(native_gl_window.NativeGLWindow)
+    window._window_id = 7
+    window._bindings = {}
+    window._event_lock = native_gl_window.threading.Lock()
+    pending = [_event("<Motion>", index, index) for index in range(50)]
+    pending.insert(10, _event("<Button-1>", 9, 9))
+    window._event_conn, writer = native_gl_window.mp.Pipe(duplex=False)
+    writer.send_bytes(native_protocol.encode_batch(pending[:20]))
+    writer.send_bytes(native_protocol.encode_batch(pending[20:]))
+    seen = []
+    window.bind("<Motion>", lambda event: seen.append(("motion", event.x)))
+    window.bind("<Button-1>", lambda event: seen.append(("click", event.x)))
+
+    window._process_events()
+
+    assert seen == [("motion", 9), ("click", 9), ("motion", 49)]
+
+
+def _make_inprocess_window():
+    window = native_gl_window.InProcessGLWindow.__new__(
+        native_gl_window.InProcessGLWindow
+    )
+    window._window = object()
+    window._window_id = 7
+    window._bindings = {}
+    window._event_lock = native_gl_window.threading.Lock()
+    window._inbox = native_gl_window.collections.deque()
+    window._inbox_ready = native_gl_window.threading.Event()
+    window._pending_commands = native_gl_window.std_queue.Queue()
+    window._loop_waker = native_gl_window._LoopWaker()
+    window._wake_reader, window._wake_writer = native_gl_window.mp.Pipe(duplex=False)
+    window._frames_submitted = 0
+    window._frames_presented = 0
+    return window
+
+
+def test_inprocess_window_wakes_owner_once_per_drain():
+    window = _make_inprocess_window()
+    seen = []
+    window.bind("<Motion>", lambda event: seen.append(event.x))
+
+    window._post_messages([_event("<Motion>", 1, 1)])
+    window._post_messages([_event("<Motion>", 2, 2)])
+
+    assert window._poll_messages(0) is True
+    window._wake_reader.recv_bytes()
+    assert not window._wake_reader.poll()
+    window._process_events()
+    assert seen == [2]
+    assert window._poll_messages(0) is False
+
+    window._post_messages([_event("<Motion>", 3, 3)])
+    assert window._wake_reader.poll()
+
+
+def test_inprocess_submit_frame_hands_over_bytes_without_copying():
+    window = _make_inprocess_window()
+    pixels = bytes(4 * 2 * 2)
+
+    window.submit_frame(pixels, 2, 2, premultiplied=True)
+    window.submit_frame(bytearray(16), 2, 2, rects=[(0, 0, 2, 2)])
+
+    first = window._pending_commands.get_nowait()["command"]
+    second = window._pending_commands.get_nowait()["command"]
+    assert first["frame_rgba"] is pixels
+    assert first["premultiplied"] is True
+    assert isinstance(second["frame_rgba"], bytes)
+    assert second["rects"] == [(0, 0, 2, 2)]
+
+
+def test_inprocess_window_allows_one_glfw_owner():
+    window = _make_inprocess_window()
+    native_gl_window._inprocess_host_lock.acquire()
+    try:
+        with pytest.raises(RuntimeError, match="one in-process"):
+            window._start_native_host(10, 10, "ntk", False)
+    finally:
+        native_gl_window._inprocess_host_lock.release()
+
+
+def test_frame_mailbox_keeps_latest_frame_and_its_rect_updates():
+    mailbox = native_gl_window.FrameMailbox()
+    mailbox.put({"frame": 1, "rects": [(0, 0, 1, 1)]})
+    mailbox.put({"frame": 2})
+    mailbox.put({"frame": 3, "rects": [(0, 0, 1, 1)]})
+    mailbox.put({"frame": 4})
+    mailbox.put({"frame": 5, "rects": [(1, 1, 2, 2)]})
+
+    assert [command["frame"] for command in mailbox.take()] == [4, 5]
+    assert mailbox.dropped == 3
+    assert len(mailbox) == 0
+    assert mailbox.take_presented() == 5
+    assert mailbox.take_presented() is None
+
+
+def test_presented_acks_release_frame_backlog():
+    window = _make_frame_sender()
+    window._window_id = 7
+    window._bindings = {}
+    presented = []
+    window.bind("<<FramePresented>>", presented.append)
+    window._frame_ring_failed = True
+
+    for _ in range(native_gl_window.MAX_FRAMES_IN_FLIGHT):
+        window.submit_frame(b"\x00" * 4, 1, 1)
+
+    assert [command["frame"] for command in window.sent] == [1, 2]
+    assert window.frame_backlogged is True
+    window._handle_process_message(
+        {"type": "presented", "window_id": 7, "frame": 2}
+    )
+    assert window.frame_backlogged is False
+    assert len(presented) == 1
+
+
+def test_failed_present_still_acks_the_frame(monkeypatch):
+    monkeypatch.setattr(
+        native_gl_window,
+        "glfw",
+        SimpleNamespace(make_context_current=lambda _window: None),
+    )
+    monkeypatch.setattr(native_gl_window.traceback, "print_exc", lambda: None)
+
+    def draw():
+        raise RuntimeError("lost context")
+
+    hosted = native_gl_window._HostedWindow.__new__(native_gl_window._HostedWindow)
+    hosted.window = "window"
+    hosted.window_id = 7
+    hosted.host = SimpleNamespace(outbox=[])
+    hosted.display = SimpleNamespace(draw=draw)
+    hosted.frame_mailbox = native_gl_window.FrameMailbox()
+    hosted.frame_mailbox.put({"frame": 3})
+
+    hosted.present()
+
+    assert hosted.host.outbox == [{"type": "presented", "window_id": 7, "frame": 3}]
+
+
+def test_native_window_claims_a_live_standby_process(monkeypatch):
+    dead_command, dead_event = native_gl_window.mp.Pipe(duplex=False)
+    command_reader, command_conn = native_gl_window.mp.Pipe(duplex=False)
+    event_conn, _event_writer = native_gl_window.mp.Pipe(duplex=False)
+    live = SimpleNamespace(is_alive=lambda: True)
+    monkeypatch.setattr(
+        native_gl_window,
+        "_standby_hosts",
+        [
+            (SimpleNamespace(is_alive=lambda: False), dead_command, dead_event),
+            (live, command_conn, event_conn),
+        ],
+    )
+    window = native_gl_window.NativeGLWindow.__new__(native_gl_window.NativeGLWindow)
+    window._window_id = 7
+    window._resizable = (True, False)
+
+    window._start_native_host(320, 200, "Tools", False)
+
+    assert window._process is live
+    assert native_gl_window._standby_hosts == []
+    assert dead_command.closed
+    (message,) = native_protocol.decode_batch(command_reader.recv_bytes())
+    assert message == {
+        "type": "open",
+        "window_id": 7,
+        "width": 320,
+        "height": 200,
+        "title": "Tools",
+        "resizable": (True, False),
+        "override": False,
+    }
+
+
+def test_native_window_ids_are_not_reused(monkeypatch):
+    monkeypatch.setattr(native_gl_window, "glfw", _FakeGlfw)
+    monkeypatch.setattr(native_gl_window, "GL", SimpleNamespace())
+    cls = native_gl_window.NativeGLWindow
+    monkeypatch.setattr(cls, "_start_native_host", lambda *args: None)
+    monkeypatch.setattr(cls, "_wait_for_process_ready", lambda self: None)
+
+    ids = set()
+    for _ in range(3):
+        window = cls(20, 10)
+        ids.add(window._window_id)
+        window._wake_reader.close()
+        window._wake_writer.close()
+        del window
+
+    assert len(ids) == 3
+
+
+def _make_shared_window(window_id):
+    window = native_gl_window.SharedProcessGLWindow.__new__(
+        native_gl_window.SharedProcessGLWindow
+    )
+    window._window_id = window_id
+    window._init_inbox()
+    window._wake_reader, window._wake_writer = native_gl_window.mp.Pipe(duplex=False)
+    return window
+
+
+def test_shared_native_host_routes_messages_by_window_id(monkeypatch):
+    host = native_gl_window._SharedNativeHost.__new__(
+        native_gl_window._SharedNativeHost
+    )
+    host._event_conn, event_writer = native_gl_window.mp.Pipe(duplex=False)
+    command_reader, host._command_conn = native_gl_window.mp.Pipe(duplex=False)
+    host._send_lock = native_gl_window.threading.Lock()
+    host._closed = False
+    first, second = _make_shared_window(1), _make_shared_window(2)
+    host._windows = {1: first, 2: second}
+    monkeypatch.setattr(native_gl_window, "_shared_host", host)
+    router = native_gl_window.threading.Thread(target=host._route_messages)
+    router.start()
+
+    event_writer.send_bytes(
+        native_protocol.encode_batch(
+            [
+                {"type": "event", "window_id": 1, "name": "<Motion>", "x": 1, "y": 1},
+                {"type": "event", "window_id": 2, "name": "<Motion>", "x": 2, "y": 2},
+                {"type": "event", "window_id": 1, "name": "<Leave>", "x": 3, "y": 3},
+                {"type": "error", "window_id": None, "reason": "glfw.init() failed."},
+            ]
+        )
+    )
+    assert first._poll_messages(2.0) and second._poll_messages(2.0)
+    received = []
+    first._receive_messages(received)
+    assert [message.get("x") for message in received] == [1, 3, None]
+    # Host-wide errors reach every window under its own id.
+    assert received[-1]["window_id"] == 1
+    received = []
+    second._receive_messages(received)
+    assert [message["type"] for message in received] == ["event", "error"]
+
+    host.release(first)
+    assert not host._closed
+    host.release(second)
+    assert host._closed
+    assert native_gl_window._shared_host is None
+    with pytest.raises(EOFError):
+        command_reader.recv_bytes()
+    event_writer.close()
+    router.join(timeout=2.0)
+    assert not router.is_alive()
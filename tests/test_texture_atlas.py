@@ -0,0 +1,126 @@
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../nebulatk"))
+)
+
+import texture_atlas
+
+
+class _FakePages:
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+        self.uploads = []
+
+    def create_page(self, width, height):
+        self.created.append((width, height))
+        return len(self.created)
+
+    def upload(self, page, uploads):
+        self.uploads.extend((page, rect, bytes(pixels)) for rect, pixels in uploads)
+
+    def delete_page(self, page):
+        self.deleted.append(page)
+
+
+def _pixels(width, height, value=255):
+    return bytes([value]) * (width * height * 4)
+
+
+def test_content_key_depends_on_size_and_pixels():
+    key = texture_atlas.content_key(2, 1, _pixels(2, 1))
+    assert key == texture_atlas.content_key(2, 1, _pixels(2, 1))
+    assert key != texture_atlas.content_key(1, 2, _pixels(2, 1))
+    assert key != texture_atlas.content_key(2, 1, _pixels(2, 1, value=7))
+
+
+def test_shelf_packer_reuses_freed_runs_and_drops_empty_shelves():
+    packer = texture_atlas.ShelfPacker(8, 8)
+    assert packer.allocate(4, 3) == (0, 0)
+    assert packer.allocate(4, 3) == (4, 0)
+    assert packer.allocate(2, 2) == (0, 4)
+    assert packer.allocate(8, 8) is None
+
+    packer.free(0, 0, 4, 3)
+    assert packer.allocate(3, 3) == (0, 0)
+    packer.free(0, 4, 2, 2)
+    assert len(packer.shelves) == 1
+    assert packer.used_area == 3 * 3 + 4 * 3
+
+
+def test_identical_content_shares_one_padded_region():
+    pages = _FakePages()
+    atlas = texture_atlas.TextureAtlas(pages, page_size=64)
+    key = texture_atlas.content_key(2, 2, _pixels(2, 2))
+
+    regions = [atlas.acquire(key, 2, 2, _pixels(2, 2)) for _ in range(100)]
+    atlas.flush()
+
+    assert len(set(regions)) == 1
+    assert regions[0] == (1, 1 / 64, 1 / 64, 3 / 64, 3 / 64)
+    ((page, rect, padded),) = pages.uploads
+    assert rect == (0, 0, 4, 4)
+    # A transparent border surrounds the layer's own pixels.
+    assert padded[:16] == bytes(16)
+    assert padded[16:28] == bytes(4) + _pixels(2, 1)
+    assert atlas.stats["shared"] == 99
+
+
+def test_released_regions_stay_until_space_is_needed():
+    pages = _FakePages()
+    atlas = texture_atlas.TextureAtlas(pages, page_size=8, padding=0)
+    atlas.acquire("a", 8, 4, _pixels(8, 4))
+    atlas.release("a")
+
+    # Reacquired while idle: no new upload.
+    atlas.acquire("a", 8, 4)
+    atlas.release("a")
+    assert atlas.stats["uploads"] == 1
+
+    atlas.acquire("b", 8, 4, _pixels(8, 4))
+    atlas.acquire("c", 8, 4, _pixels(8, 4))
+    assert "a" not in atlas
+    assert atlas.stats["evictions"] == 1
+    assert len(pages.created) == 1
+    assert atlas.acquire("a", 8, 4) is None
+
+
+def test_sparse_page_is_repacked_before_adding_a_page():
+    pages = _FakePages()
+    atlas = texture_atlas.TextureAtlas(pages, page_size=8, padding=0, defrag_fill=0.5)
+    atlas.acquire("tall", 2, 8, _pixels(2, 8))
+    for name in "abc":
+        atlas.acquire(name, 2, 4, _pixels(2, 4))
+    atlas.release("tall")
+    atlas.acquire("keep", 2, 4, _pixels(2, 4))
+    atlas.release("a")
+    atlas.release("c")
+    atlas.flush()
+    pages.uploads.clear()
+
+    # No idle region frees a 6-wide run, but live regions fill only 1/4.
+    atlas.acquire("wide", 6, 4, _pixels(6, 4))
+    atlas.flush()
+
+    assert atlas.stats["defrags"] == 1
+    assert len(pages.created) == 1
+    assert {atlas.region(name)[0] for name in ("b", "keep", "wide")} == {1}
+    assert len(pages.uploads) == 3
+
+
+def test_oversized_layers_get_a_page_of_their_own():
+    pages = _FakePages()
+    atlas = texture_atlas.TextureAtlas(pages, page_size=8, padding=1)
+    atlas.acquire("small", 2, 2, _pixels(2, 2))
+    region = atlas.acquire("big", 10, 3, _pixels(10, 3))
+
+    assert pages.created == [(8, 8), (12, 5)]
+    assert region == (2, 1 / 12, 1 / 5, 11 / 12, 4 / 5)
+
+    # Evicting its only region gives the dedicated page back.
+    atlas.release("big")
+    atlas.acquire("other", 6, 6, _pixels(6, 6))
+    assert pages.deleted == [2]
+    assert "big" not in atlas
@@ -168,7 +168,7 @@ def test_final_composited_frame_bytes_match_expected_pixels(monkeypatch) -> None
     )
 
     now = [70.0]
-    monkeypatch.setattr(pil_image_renderer.time, "time", lambda: now[0])
+    monkeypatch.setattr(pil_image_renderer.time, "monotonic", lambda: now[0])
     renderer._last_render = 0.0
     renderer._redraw_requested = True
     frame = renderer.render_if_due()
@@ -9,6 +9,7 @@ sys.path.insert(
 )
 
 import nebulatk as ntk
+import native_gl_window
 
 _window_internal = ntk._window_internal
 
@@ -103,6 +104,22 @@ def test_configure_updates_title_resizable_and_background():
     assert window.background_color == "#112233"
 
 
+def test_native_configure_event_resizes_without_querying_the_window():
+    window = _window_internal(width=800, height=600, canvas_width=800, canvas_height=600)
+    window.root = MagicMock()
+    window.renderer = MagicMock()
+    window.renderer.next_frame_delay.return_value = 0.0
+    window.display = MagicMock()
+    window._apply_resizable_widgets = MagicMock()
+
+    window._on_native_configure(native_gl_window.NativeEvent(width=640, height=480))
+
+    assert (window.width, window.height) == (640, 480)
+    window.renderer.request_redraw.assert_called()
+    window.root.winfo_width.assert_not_called()
+    window.root.after.assert_called_once_with(0, window._render_tick)
+
+
 def test_resize_updates_renderer_and_canvas_dimensions():
     window = _window_internal(width=800, height=600, canvas_width=800, canvas_height=600)
     window.root = MagicMock()
@@ -120,6 +137,23 @@ def test_resize_updates_renderer_and_canvas_dimensions():
     window.renderer.request_redraw.assert_called()
 
 
+def test_set_render_scale_updates_renderer_and_display():
+    window = _window_internal(width=800, height=600)
+    window.root = MagicMock()
+    window.renderer = MagicMock()
+    window.display = MagicMock()
+    window._window_thread_id = threading.get_ident()
+
+    window.set_render_scale(0.5, "nearest")
+
+    assert (window.render_scale, window.render_filter) == (0.5, "nearest")
+    window.renderer.set_render_scale.assert_called_once_with(0.5)
+    window.display.set_render_scale.assert_called_once_with(0.5, "nearest")
+    with pytest.raises(ValueError):
+        window.set_render_scale(0)
+    assert window.render_scale == 0.5
+
+
 def test_debug_font_resolution_reports_widget_fonts(monkeypatch):
     window = _window_internal(width=800, height=600)
     widget = MagicMock()
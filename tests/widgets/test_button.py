@@ -43,3 +43,15 @@ def test_image_button_functionality(canvas: ntk.Window) -> None:
         assert image_button.state
         image_button.state = False
         assert not image_button.state
+
+
+def test_button_place_reports_its_new_damage_rect(canvas: ntk.Window) -> None:
+    """Moving a button reports the rect it now covers; the renderer adds the old one."""
+    button = ntk.Button(canvas, text="Move", width=40, height=20).place(10, 10)
+    reported = []
+    canvas.request_redraw = lambda rects=None, widget=None: reported.append(rects)
+
+    button.place(100, 50)
+
+    assert reported
+    assert reported[-1] == [(100, 50, 140, 70)]
@@ -8,3 +8,18 @@ def test_children(canvas: ntk.Window) -> None:
     assert len(canvas.children) == baseline_count + 1
     button.destroy()
     assert len(canvas.children) == baseline_count
+
+
+def test_compositor_properties_request_composite_only(canvas: ntk.Window) -> None:
+    button = ntk.Button(canvas, text="Button").place()
+    composited = []
+    redrawn = []
+    canvas.request_composite = composited.append
+    canvas.request_redraw = lambda rects=None, widget=None: redrawn.append(widget)
+
+    button.translate_x = 12
+    button.opacity = 0.5
+
+    assert composited == [button, button]
+    assert redrawn == []
+    assert (button.x, button.translate_x, button.opacity) == (0, 12, 0.5)